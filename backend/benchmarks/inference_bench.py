@@ -0,0 +1,221 @@
+from __future__ import annotations
+from pathlib import Path
+from unittest.mock import patch
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+from benchmarks.synthetic import Scale, make_artifact, make_candidates
+from candidate_cache import COURSE_CACHE
+from ml import inference
+from ml.artifact_v2 import write_svm_artifact_v2
+
+
+# ---------------------------------------------------------------------------
+# Inference microbenchmarks
+# ---------------------------------------------------------------------------
+#
+#   cd backend && python -m benchmarks.inference_bench --courses 200 --output bench.json
+#
+# Times each scoring stage on a synthetic artifact (benchmarks/synthetic.py)
+# and prints p50/p95/p99 latency plus the allocations of one call as JSON.
+# generate_v2 runs end to end with its DB helpers replaced by the synthetic
+# candidates, so nothing needs MySQL.  With --baseline, stages whose p50 got
+# more than --max-regression slower than in that earlier JSON report make the
+# run exit 1.
+
+STAGES = (
+    "lookup_count",
+    "build_svm_row",
+    "candidate_groups",
+    "build_feature_matrix",
+    "predict_proba",
+    "score_candidates",
+    "generate_v2",
+    "generate_v2_cached",
+)
+
+
+def measure(fn, iterations: int, warmup: int) -> dict:
+    """Latency percentiles of fn() over `iterations` calls plus the allocations of one call."""
+    for _ in range(warmup):
+        fn()
+    samples = np.empty(iterations, dtype=np.float64)
+    for i in range(iterations):
+        start = time.perf_counter_ns()
+        fn()
+        samples[i] = time.perf_counter_ns() - start
+    samples /= 1000.0
+
+    # One more call under tracemalloc (kept out of the timed loop: tracing
+    # slows allocation-heavy code several times over).
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    fn()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "p50_us": round(float(np.percentile(samples, 50)), 2),
+        "p95_us": round(float(np.percentile(samples, 95)), 2),
+        "p99_us": round(float(np.percentile(samples, 99)), 2),
+        "mean_us": round(float(samples.mean()), 2),
+        "min_us": round(float(samples.min()), 2),
+        "peak_alloc_kib": round((peak - before) / 1024.0, 2),
+        "retained_kib": round((after - before) / 1024.0, 2),
+    }
+
+
+def _stage_functions(art: dict, by_course: dict[str, list[dict]], request_courses: int) -> dict:
+    courses = list(by_course)[:request_courses]
+    request = [c for course in courses for c in by_course[course]]
+    one = request[0]
+    index = inference.get_lookup_index(art)
+    target_term = art["max_train_term"] + 1
+    groups = inference.candidate_groups(request)
+    combo = {
+        "CourseCode": one["course_number"],
+        "Instructor": one["instructor_name"],
+        "Slot": next(iter(groups["Slot"])),
+        "Type": "LEC",
+    }
+    matrix = inference.build_feature_matrix(groups, art)
+    model = inference.get_serving_model(art)
+
+    import schedules
+
+    loop = asyncio.new_event_loop()
+    payload = {"courses": courses}
+
+    def generate(clear_cache: bool):
+        if clear_cache:
+            COURSE_CACHE.clear()
+        return loop.run_until_complete(schedules.generate_schedule_v2(None, payload))
+
+    return {
+        "lookup_count": lambda: inference._lookup_count(index, "combo_prior_count", combo, target_term),
+        "build_svm_row": lambda: inference.build_svm_row(one, art),
+        "candidate_groups": lambda: inference.candidate_groups(request),
+        "build_feature_matrix": lambda: inference.build_feature_matrix(groups, art),
+        "predict_proba": lambda: model.predict_proba(matrix),
+        "score_candidates": lambda: inference.score_candidates(request, art),
+        "generate_v2": lambda: generate(True),
+        "generate_v2_cached": lambda: generate(False),
+    }, loop, len(request)
+
+
+def _offline_schedules(art: dict, by_course: dict[str, list[dict]]):
+    """Patch generate_v2's DB helpers with the synthetic candidates."""
+    # schedules imports jwt_verify, which refuses to load without a secret;
+    # generate_v2 runs with DEV_BYPASS here, so no token is ever checked.
+    os.environ.setdefault("JWT_SECRET", "benchmark-only")
+    import schedules
+
+    top = {
+        course: [{"instructor_name": n, "teach_count": 1, "probability": 1.0 / 3}
+                 for n in dict.fromkeys(c["instructor_name"] for c in cands)][:3]
+        for course, cands in by_course.items()
+    }
+    return patch.multiple(
+        schedules,
+        load_svm_artifact=lambda tenant=None: art,
+        get_batcher=lambda: None,
+        generate_professor_slot_candidates=lambda course: by_course.get(course, []),
+        top_instructors_last4_semesters=lambda course, limit=5: top.get(course, []),
+        schedule_flat_data_version=lambda: "synthetic",
+    )
+
+
+def run(scale: Scale, iterations: int, warmup: int, request_courses: int,
+        artifact_format: str = "v1", stages=STAGES) -> dict:
+    art = make_artifact(scale)
+    by_course = make_candidates(scale)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if artifact_format == "v2":
+            art = inference.open_svm_artifact_path(write_svm_artifact_v2(art, Path(tmp) / "svm_v2"))
+            art["artifact_version"] = "synthetic-v2"
+
+        env = {"DEV_BYPASS": "1", "SCORING_WORKERS": "0", "SCORING_BATCH_WINDOW_MS": "0"}
+        with patch.dict(os.environ, env), _offline_schedules(art, by_course):
+            fns, loop, request_rows = _stage_functions(art, by_course, request_courses)
+            try:
+                results = {name: measure(fns[name], iterations, warmup) for name in stages}
+            finally:
+                loop.close()
+                COURSE_CACHE.clear()
+
+    return {
+        "scale": {**scale.__dict__, "request_courses": request_courses, "request_candidates": request_rows},
+        "artifact_format": artifact_format,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "stages": results,
+    }
+
+
+def regressions(report: dict, baseline: dict, max_regression: float) -> list[str]:
+    """Stages whose p50 grew by more than max_regression (a fraction) over the baseline report."""
+    out = []
+    for name, stats in report["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base or not base.get("p50_us"):
+            continue
+        ratio = stats["p50_us"] / base["p50_us"]
+        if ratio > 1.0 + max_regression:
+            out.append(f"{name}: p50 {base['p50_us']}us -> {stats['p50_us']}us (x{ratio:.2f})")
+    return out
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline inference microbenchmarks.")
+    parser.add_argument("--courses", type=int, default=Scale.courses)
+    parser.add_argument("--instructors", type=int, default=Scale.instructors)
+    parser.add_argument("--terms", type=int, default=Scale.terms)
+    parser.add_argument("--candidates-per-course", type=int, default=Scale.candidates_per_course)
+    parser.add_argument("--request-courses", type=int, default=5, help="courses per generate_v2 request")
+    parser.add_argument("--format", choices=("v1", "v2"), default="v1", help="artifact format to score with")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--output", type=Path, help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", type=Path, help="earlier JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="allowed p50 slowdown vs --baseline, as a fraction (default 0.25)")
+    args = parser.parse_args(argv)
+
+    scale = Scale(
+        courses=args.courses,
+        instructors=args.instructors,
+        terms=args.terms,
+        candidates_per_course=args.candidates_per_course,
+        seed=args.seed,
+    )
+    report = run(scale, args.iterations, args.warmup, min(args.request_courses, args.courses), args.format, args.stages)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+        print(f"Wrote {args.output}")
+    else:
+        print(text)
+
+    if args.baseline:
+        slower = regressions(report, json.loads(args.baseline.read_text()), args.max_regression)
+        for line in slower:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
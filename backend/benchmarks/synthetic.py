@@ -0,0 +1,149 @@
+from __future__ import annotations
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+from ml.compiled_model import CompiledLinearModel
+from ml.inference import COUNT_DEFS, RECENCY_DEFS
+
+
+# ---------------------------------------------------------------------------
+# Synthetic SVM artifacts and candidate sets (no CSVs, no MySQL)
+# ---------------------------------------------------------------------------
+#
+# make_history() fakes a timetable: every term, every course is taught by a
+# few of its department's instructors in a few of its usual slots.  The
+# lookup tables are then built the way train_ant.py builds them (cumulative
+# counts / last term per group and term), so table sizes and key
+# cardinalities scale like real ones.  Model weights are random: the
+# benchmark measures cost, not accuracy.
+
+DAYS = ["MW", "TR", "M", "T", "W", "R", "F", "MWF"]
+STARTS = [450, 540, 630, 720, 810, 900, 990, 1080]      # 07:30AM .. 06:00PM
+DURATION = 75
+SECTION_TYPES = ["LEC", "LAB", "SEM"]
+
+
+@dataclass(frozen=True)
+class Scale:
+    courses: int = 100
+    instructors: int = 300
+    terms: int = 8
+    candidates_per_course: int = 24
+    departments: int = 10
+    seed: int = 0
+
+
+def _clock(minutes: int) -> str:
+    hour, minute = divmod(int(minutes), 60)
+    return f"{(hour - 1) % 12 + 1:02d}:{minute:02d}{'AM' if hour < 12 else 'PM'}"
+
+
+def _universe(scale: Scale) -> dict:
+    depts = [f"D{d:02d}" for d in range(scale.departments)]
+    courses = [f"{depts[i % len(depts)]} {100 + i}" for i in range(scale.courses)]
+    instructors = [f"Instructor {i:04d}" for i in range(scale.instructors)]
+    slots = [(days, start, start + DURATION) for days in DAYS for start in STARTS]
+    return {"depts": depts, "courses": courses, "instructors": instructors, "slots": slots}
+
+
+def make_history(scale: Scale) -> pd.DataFrame:
+    """One row per (term, course, instructor, slot, type) section taught."""
+    rng = np.random.default_rng(scale.seed)
+    u = _universe(scale)
+    by_dept = {d: [i for k, i in enumerate(u["instructors"]) if k % len(u["depts"]) == n]
+               for n, d in enumerate(u["depts"])}
+    rows = []
+    for term in range(scale.terms):
+        for course in u["courses"]:
+            dept = course.split()[0]
+            pool = by_dept[dept] or u["instructors"]
+            for instr in rng.choice(pool, size=min(3, len(pool)), replace=False):
+                for s in rng.choice(len(u["slots"]), size=2, replace=False):
+                    days, start, end = u["slots"][s]
+                    rows.append((term, course, dept, str(instr), f"{days}_{start}_{end}",
+                                 SECTION_TYPES[int(rng.integers(len(SECTION_TYPES)))]))
+    return pd.DataFrame(rows, columns=["SemesterIndex", "CourseCode", "Dept", "Instructor", "Slot", "Type"])
+
+
+def make_lookups(history: pd.DataFrame) -> dict:
+    """COUNT_DEFS / RECENCY_DEFS tables in the artifact's (group..., SemesterIndex, value) layout."""
+    lookups = {}
+    for out_col, cols in COUNT_DEFS:
+        per_term = history.groupby(list(cols) + ["SemesterIndex"]).size().rename(out_col).reset_index()
+        per_term[out_col] = per_term.groupby(list(cols))[out_col].cumsum()
+        lookups[out_col] = per_term
+    for out_col, cols in RECENCY_DEFS:
+        seen = history[list(cols) + ["SemesterIndex"]].drop_duplicates().copy()
+        seen[out_col] = seen["SemesterIndex"]
+        lookups[out_col] = seen
+    return lookups
+
+
+def make_serving_model(history: pd.DataFrame, n_models: int = 3, seed: int = 0) -> CompiledLinearModel:
+    rng = np.random.default_rng(seed)
+    cat_cols = ["CourseCode", "Instructor", "Slot", "Type"]
+    num_cols = [f"{c}_log1p" for c, _ in COUNT_DEFS] + [c.replace("last_term", "terms_since") for c, _ in RECENCY_DEFS]
+    categories, category_columns, offset = [], [], 0
+    for col in cat_cols:
+        cats = np.array(sorted(history[col].unique()), dtype=str)
+        categories.append(cats)
+        category_columns.append(np.arange(offset, offset + len(cats)))
+        offset += len(cats)
+    n_features = offset + len(num_cols)
+    return CompiledLinearModel(
+        cat_cols=cat_cols,
+        categories=categories,
+        category_columns=category_columns,
+        num_cols=num_cols,
+        num_offset=offset,
+        num_scale=np.ones(len(num_cols)),
+        coef=rng.normal(0, 0.3, size=(n_models, n_features)),
+        intercept=rng.normal(0, 0.1, size=n_models),
+        sigmoid_a=-np.ones(n_models),
+        sigmoid_b=np.zeros(n_models),
+    )
+
+
+def make_artifact(scale: Scale) -> dict:
+    """An in-memory v1-shaped SVM artifact (no score table, no artifact_path)."""
+    history = make_history(scale)
+    model = make_serving_model(history, seed=scale.seed)
+    return {
+        "serving_model": model,
+        "lookups": make_lookups(history),
+        "cat_cols": list(model.cat_cols),
+        "num_cols": list(model.num_cols),
+        "features": list(model.cat_cols) + list(model.num_cols),
+        "max_train_term": scale.terms - 1,
+        "artifact_version": f"synthetic-{scale.courses}x{scale.instructors}x{scale.terms}",
+    }
+
+
+def make_candidates(scale: Scale, courses: int | None = None) -> dict[str, list[dict]]:
+    """generate_professor_slot_candidates-shaped candidates, keyed by course.
+
+    About a tenth of the slots are TBA, and instructors are drawn from the
+    whole pool so some candidates miss every lookup (as new hires do).
+    """
+    rng = np.random.default_rng(scale.seed + 1)
+    u = _universe(scale)
+    out = {}
+    for course in u["courses"][: courses or scale.courses]:
+        cands = []
+        for _ in range(scale.candidates_per_course):
+            days, start, end = u["slots"][int(rng.integers(len(u["slots"])))]
+            tba = rng.random() < 0.1
+            start_time, end_time = ("TBA", "TBA") if tba else (_clock(start), _clock(end))
+            cands.append({
+                "course_number": course,
+                "instructor_name": str(rng.choice(u["instructors"])),
+                "instructor_count": 1,
+                "instructor_probability": 1.0 / 3,
+                "days_text": days,
+                "start_time": start_time,
+                "end_time": end_time,
+                "slot_label": "TBA TBA" if tba else f"{days} {start_time}-{end_time}",
+            })
+        out[course] = cands
+    return out
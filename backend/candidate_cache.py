@@ -0,0 +1,64 @@
+from collections import OrderedDict
+import os
+import threading
+
+
+DEFAULT_CACHE_SIZE = 256
+
+
+class CourseCandidateCache:
+    """Bounded LRU cache of per-course generate_v2 inputs.
+
+    Keys are (course_number, artifact_version, data_version): a new model or
+    a new schedule_flat load produces new keys, and stale entries age out
+    through LRU eviction.  Values are shared between requests and must be
+    treated as read-only.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+COURSE_CACHE = CourseCandidateCache(int(os.getenv("COURSE_CACHE_SIZE", str(DEFAULT_CACHE_SIZE))))
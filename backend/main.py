@@ -3,7 +3,13 @@ from schedules import router as schedules_router
 from ml.ml_router import router as ml_router
 from course import router as course_router
 from auth import router as auth_router
+from ml.executor import get_scoring_executor, shutdown_scoring_executor
+from ml.registry import SVM_REGISTRY
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+import os
 import dotenv
 import uvicorn
 from dotenv import load_dotenv
@@ -13,7 +19,33 @@ load_dotenv()
 dotenv.load_dotenv()
 
 
-app = FastAPI(title="major_map backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load and warm the SVM artifact before taking traffic; /ready stays 503
+    # until this has succeeded.
+    try:
+        SVM_REGISTRY.load()
+        SVM_REGISTRY.warmup()
+        # With SCORING_WORKERS set, spawn the scoring processes now too.
+        executor = get_scoring_executor()
+        if executor is not None:
+            executor.prestart(SVM_REGISTRY.get())
+        status = SVM_REGISTRY.status()
+        print(f"SVM artifact {status['artifact_version']} loaded in {status['load_seconds']:.3f}s, "
+              f"warmed in {status['warmup_seconds']:.3f}s")
+    except FileNotFoundError as exc:
+        print(f"SVM artifact not loaded at startup: {exc}")
+
+    # Optional hot reload: poll the artifact files and swap in retrained ones.
+    watch_interval = float(os.getenv("MODEL_WATCH_INTERVAL", "0") or 0)
+    if watch_interval > 0:
+        SVM_REGISTRY.start_watcher(watch_interval)
+    yield
+    SVM_REGISTRY.stop_watcher()
+    shutdown_scoring_executor()
+
+
+app = FastAPI(title="major_map backend", lifespan=lifespan)
 
 app.include_router(auth_router)
 app.include_router(course_router)
@@ -39,6 +71,20 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def ready():
+    status = SVM_REGISTRY.status()
+    if not status["ready"]:
+        # Startup load failed or never ran (artifact trained later): try
+        # again here so the probe recovers without a restart.
+        try:
+            await run_in_threadpool(SVM_REGISTRY.warmup)
+        except Exception as exc:
+            print(f"SVM artifact still not loaded: {exc}")
+        status = SVM_REGISTRY.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
 if __name__ == "__main__":
     # http://localhost:8000/docs#/
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
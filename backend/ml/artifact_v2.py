@@ -0,0 +1,401 @@
+from __future__ import annotations
+from pathlib import Path
+import hashlib
+import json
+import shutil
+import numpy as np
+
+from ml.compiled_model import CompiledLinearModel, compile_svm_pipeline
+
+
+# Artifact v2 is a directory of .npy blobs plus a JSON manifest:
+#
+#   manifest.json                 format_version, feature lists, table layout,
+#                                 checksum of the whole directory
+#   strings_utf8.npy              sorted shared string dictionary, UTF-8 bytes
+#   strings_offsets.npy           start of each string in strings_utf8.npy (+ end)
+#   lookup_<out_col>_keys.npy     sorted packed (group codes..., term) keys, uint32
+#                                 when they fit, int64 otherwise
+#   lookup_<out_col>_values.npy   value of each key in the narrowest dtype that
+#                                 holds it exactly (NaN allowed in float tables)
+#                                 (out_col prob_scheduled is the offline score table)
+#   model_*.npy                   CompiledLinearModel arrays (one-hot categories
+#                                 stored as int32 codes into the dictionary)
+#   dept<i>_*.npy                 the same for each per-Dept model, if any
+#                                 (manifest "dept_models" maps Dept -> prefix)
+#
+# Every array is opened with np.load(mmap_mode="r"), so loading costs no
+# parsing and the pages are shared by every worker process mapping the
+# same files.
+
+FORMAT_VERSION = 2
+MANIFEST = "manifest.json"
+
+# Optional offline score table (train_ant.build_score_table): stored as one
+# more lookup table, keyed like the model's categorical features, with one
+# row per candidate at term max_train_term + 1.
+SCORE_TABLE = "prob_scheduled"
+SCORE_TABLE_COLS = ("CourseCode", "Instructor", "Slot", "Type")
+
+
+# ---------------------------------------------------------------------------
+# Shared string dictionary
+# ---------------------------------------------------------------------------
+
+class StringDictionary:
+    """Sorted strings stored as one UTF-8 buffer plus offsets; code = position.
+
+    Fixed-width unicode arrays pay four bytes per character of the longest
+    string for every entry; the buffer pays one byte per character actually
+    used.  The ``{str: code}`` map used to encode request strings is built on
+    the first encode, so processes that never score pay nothing for it.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+        self._codes: dict[str, int] | None = None
+
+    @classmethod
+    def from_strings(cls, strings) -> "StringDictionary":
+        encoded = [s.encode("utf-8") for s in sorted(set(map(str, strings)))]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(data, offsets.astype(_narrow_uint(int(offsets[-1]))))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, code: int) -> str:
+        start, end = int(self.offsets[code]), int(self.offsets[code + 1])
+        return bytes(self.data[start:end]).decode("utf-8")
+
+    def tolist(self) -> list[str]:
+        return [self[i] for i in range(len(self))]
+
+    def decode(self, codes) -> np.ndarray:
+        """Codes -> unicode array."""
+        return np.array([self[int(c)] for c in np.asarray(codes).reshape(-1)], dtype=str)
+
+    def _code_map(self) -> dict[str, int]:
+        if self._codes is None:
+            self._codes = {s: i for i, s in enumerate(self.tolist())}
+        return self._codes
+
+    def code(self, value) -> int:
+        """One string -> its code; -1 if it is not in the dictionary."""
+        return self._code_map().get(str(value), -1)
+
+    def encode(self, values) -> np.ndarray:
+        """Strings -> int64 codes; -1 for strings not in the dictionary."""
+        codes = self._code_map()
+        values = values.tolist() if isinstance(values, np.ndarray) else list(values)
+        return np.fromiter((codes.get(str(v), -1) for v in values), dtype=np.int64, count=len(values))
+
+
+def _narrow_uint(max_value: int) -> type:
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _narrow_values(values: np.ndarray) -> np.ndarray:
+    """Store a float64 value column in the narrowest dtype that round-trips it exactly."""
+    finite = values[~np.isnan(values)]
+    if len(finite) == len(values) and np.array_equal(finite, np.round(finite)):
+        lo, hi = (int(finite.min()), int(finite.max())) if len(finite) else (0, 0)
+        for dtype in (np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32):
+            info = np.iinfo(dtype)
+            if info.min <= lo and hi <= info.max:
+                return values.astype(dtype)
+    as32 = values.astype(np.float32)
+    if np.array_equal(as32.astype(np.float64), values, equal_nan=True):
+        return as32
+    return values
+
+
+class EncodedGroups(dict):
+    """Group columns already mapped to dictionary codes (CodedLookupIndex.encode_groups)."""
+
+
+# ---------------------------------------------------------------------------
+# Packed-key lookup tables
+# ---------------------------------------------------------------------------
+
+class CodedLookupIndex:
+    """As-of lookups over packed integer keys; same interface as inference.LookupIndex.
+
+    Each row key packs the group's string codes and its term into one
+    integer, ``((code_0 << bits | code_1) << bits ...) << term_bits | term``,
+    and keys are stored sorted.  "Latest row of this group strictly before
+    target_term" is then one np.searchsorted, vectorized over the whole
+    candidate batch.  Request strings are translated to codes once per
+    request (encode_groups) and the codes are reused by every table.
+    """
+
+    def __init__(self, strings: StringDictionary, tables: dict):
+        self.strings = strings
+        # out_col -> (group_cols, code_bits, term_bits, keys, values)
+        self._tables = tables
+
+    def encode(self, values) -> np.ndarray:
+        """Map strings to dictionary codes; -1 for strings not in the dictionary."""
+        return self.strings.encode(values)
+
+    def encode_groups(self, groups: dict) -> EncodedGroups:
+        """Translate aligned group columns to codes once, for several get_many calls."""
+        return EncodedGroups({c: self.encode(v) for c, v in groups.items()})
+
+    def get(self, out_col: str, group_vals: dict, target_term: int):
+        """Return the stored value of the latest row before target_term, or None."""
+        entry = self._tables.get(out_col)
+        if entry is None or set(group_vals) != set(entry[0]):
+            return None
+        cols, bits, term_bits, keys, values = entry
+        group_key = 0
+        for c in cols:
+            code = self.strings.code(group_vals[c])
+            if code < 0:
+                return None
+            group_key = (group_key << bits) | code
+        term = min(max(int(target_term), 0), 1 << term_bits)
+        pos = int(np.searchsorted(keys, (group_key << term_bits) + term, side="left")) - 1
+        if pos < 0 or int(keys[pos]) >> term_bits != group_key:
+            return None
+        val = float(values[pos])
+        return None if np.isnan(val) else val
+
+    def get_many(self, out_col: str, group_arrays: dict, target_term: int) -> np.ndarray:
+        """Vectorized ``get``; NaN wherever the group has no row before target_term."""
+        n = len(next(iter(group_arrays.values()))) if group_arrays else 0
+        entry = self._tables.get(out_col)
+        if entry is None or set(group_arrays) != set(entry[0]):
+            return np.full(n, np.nan)
+        cols, bits, term_bits, keys, values = entry
+
+        encoded = isinstance(group_arrays, EncodedGroups)
+        group_key = np.zeros(n, dtype=np.int64)
+        known = np.ones(n, dtype=bool)
+        for c in cols:
+            codes = group_arrays[c] if encoded else self.encode(group_arrays[c])
+            known &= codes >= 0
+            group_key = (group_key << bits) | np.maximum(codes, 0)
+
+        # Clamping the target to 1 << term_bits turns "after every stored
+        # term" into "start of the next group", so searchsorted - 1 lands on
+        # the group's last row either way.
+        term = min(max(int(target_term), 0), 1 << term_bits)
+        # Query in the keys' own dtype so searchsorted never upcasts (copies) them.
+        query = ((group_key << term_bits) + term).astype(keys.dtype)
+        pos = np.searchsorted(keys, query, side="left") - 1
+        safe = np.maximum(pos, 0)
+        hit = known & (pos >= 0) & ((np.asarray(keys[safe], dtype=np.int64) >> term_bits) == group_key)
+        return np.where(hit, np.asarray(values[safe], dtype=float), np.nan)
+
+
+def encode_lookup_tables(lookups: dict, extra_strings=()) -> tuple[StringDictionary, dict]:
+    """Convert the artifact's DataFrame lookup tables into packed-key arrays.
+
+    Returns ``(strings, tables)`` where strings is the shared
+    StringDictionary (the tables' group values plus extra_strings) and
+    tables maps out_col to ``(group_cols, code_bits, term_bits, keys,
+    values)``.  Keys are uint32 whenever the packed width allows (one spare
+    bit, so the clamped query term cannot overflow) and values use the
+    narrowest exact dtype.
+    """
+    layouts = {}
+    vocab: set[str] = set(extra_strings)
+    for out_col, tbl in lookups.items():
+        cols = [c for c in tbl.columns if c not in ("SemesterIndex", out_col)]
+        layouts[out_col] = cols
+        for c in cols:
+            vocab.update(tbl[c].astype(str).unique().tolist())
+    strings = StringDictionary.from_strings(vocab)
+    bits = max(1, len(strings).bit_length())
+
+    tables = {}
+    for out_col, cols in layouts.items():
+        tbl = lookups[out_col]
+        terms = tbl["SemesterIndex"].to_numpy(dtype=np.int64)
+        term_bits = max(1, (int(terms.max()) + 1).bit_length()) if len(terms) else 1
+        if bits * len(cols) + term_bits > 63:
+            raise ValueError(f"{out_col}: {len(strings)} strings x {len(cols)} columns do not fit a 64-bit key")
+        key = np.zeros(len(tbl), dtype=np.int64)
+        for c in cols:
+            key = (key << bits) | strings.encode(tbl[c].astype(str).to_numpy(dtype=str))
+        key = (key << term_bits) | terms
+        order = np.argsort(key, kind="stable")
+        key_dtype = np.uint32 if bits * len(cols) + term_bits < 32 else np.int64
+        values = _narrow_values(tbl[out_col].to_numpy(dtype=float)[order])
+        tables[out_col] = (tuple(cols), bits, term_bits, key[order].astype(key_dtype), values)
+    return strings, tables
+
+
+# ---------------------------------------------------------------------------
+# Writer / reader
+# ---------------------------------------------------------------------------
+
+def _save_model(out_dir: Path, prefix: str, model: CompiledLinearModel, strings: StringDictionary) -> dict:
+    """Write one CompiledLinearModel as <prefix>*.npy; returns its manifest entry."""
+    np.save(out_dir / f"{prefix}coef.npy", model.coef)
+    np.save(out_dir / f"{prefix}intercept.npy", model.intercept)
+    np.save(out_dir / f"{prefix}sigmoid_a.npy", model.sigmoid_a)
+    np.save(out_dir / f"{prefix}sigmoid_b.npy", model.sigmoid_b)
+    np.save(out_dir / f"{prefix}num_scale.npy", model.num_scale)
+    for j, (cats, cols) in enumerate(zip(model.categories, model.category_columns)):
+        codes = strings.encode(np.asarray(cats, dtype=str)).astype(np.int32)
+        np.save(out_dir / f"{prefix}categories_{j}.npy", codes)
+        np.save(out_dir / f"{prefix}category_columns_{j}.npy", np.asarray(cols, dtype=np.int64))
+    return {
+        "prefix": prefix,
+        "cat_cols": list(model.cat_cols),
+        "num_cols": list(model.num_cols),
+        "num_offset": int(model.num_offset),
+    }
+
+
+def _load_model(load, meta: dict, strings: StringDictionary) -> CompiledLinearModel:
+    prefix = meta.get("prefix", "model_")
+
+    n_cat = len(meta["cat_cols"])
+    return CompiledLinearModel(
+        cat_cols=meta["cat_cols"],
+        categories=[strings.decode(load(f"{prefix}categories_{j}.npy")) for j in range(n_cat)],
+        category_columns=[load(f"{prefix}category_columns_{j}.npy") for j in range(n_cat)],
+        num_cols=meta["num_cols"],
+        num_offset=int(meta["num_offset"]),
+        num_scale=load(f"{prefix}num_scale.npy"),
+        coef=load(f"{prefix}coef.npy"),
+        intercept=load(f"{prefix}intercept.npy"),
+        sigmoid_a=load(f"{prefix}sigmoid_a.npy"),
+        sigmoid_b=load(f"{prefix}sigmoid_b.npy"),
+    )
+
+
+def write_svm_artifact_v2(art: dict, out_dir: Path) -> Path:
+    """Write a v1 artifact dict as a v2 directory.
+
+    The directory is written next to its final location and swapped in with
+    a rename, so readers never see a half-written artifact.
+    """
+    out_dir = Path(out_dir)
+    model = art.get("serving_model")
+    if model is None:
+        model = compile_svm_pipeline(art["model"])
+    lookups = dict(art["lookups"])
+    if art.get("score_table") is not None:
+        lookups[SCORE_TABLE] = art["score_table"]
+    dept_models = art.get("dept_models") or {}
+    model_strings = {str(v) for m in [model, *dept_models.values()] for cats in m.categories for v in cats}
+    strings, tables = encode_lookup_tables(lookups, model_strings)
+
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    np.save(tmp_dir / "strings_utf8.npy", strings.data)
+    np.save(tmp_dir / "strings_offsets.npy", strings.offsets)
+    table_meta = {}
+    for out_col, (cols, bits, term_bits, keys, values) in tables.items():
+        np.save(tmp_dir / f"lookup_{out_col}_keys.npy", keys)
+        np.save(tmp_dir / f"lookup_{out_col}_values.npy", values)
+        table_meta[out_col] = {"group_cols": list(cols), "code_bits": bits, "term_bits": term_bits}
+
+    model_meta = _save_model(tmp_dir, "model_", model, strings)
+    dept_meta = {
+        dept: _save_model(tmp_dir, f"dept{i}_", dept_model, strings)
+        for i, (dept, dept_model) in enumerate(sorted(dept_models.items()))
+    }
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "max_train_term": int(art["max_train_term"]),
+        "cat_cols": list(art["cat_cols"]),
+        "num_cols": list(art["num_cols"]),
+        "tables": table_meta,
+        "model": model_meta,
+    }
+    if dept_meta:
+        manifest["dept_models"] = dept_meta
+    if art.get("serving_max_deviation") is not None:
+        manifest["serving_max_deviation"] = float(art["serving_max_deviation"])
+    # Hashed once here, so opening the directory never has to read every blob.
+    manifest["checksum"] = files_checksum(sorted(tmp_dir.iterdir()), json.dumps(manifest, sort_keys=True))
+    (tmp_dir / MANIFEST).write_text(json.dumps(manifest, indent=2))
+
+    if out_dir.exists():
+        old_dir = out_dir.with_name(out_dir.name + ".old")
+        if old_dir.exists():
+            shutil.rmtree(old_dir)
+        out_dir.rename(old_dir)
+        tmp_dir.rename(out_dir)
+        shutil.rmtree(old_dir)
+    else:
+        tmp_dir.rename(out_dir)
+    return out_dir
+
+
+def files_checksum(files, extra: str = "") -> str:
+    """Short sha256 over the names and bytes of files (plus extra text)."""
+    digest = hashlib.sha256()
+    for f in files:
+        f = Path(f)
+        digest.update(f.name.encode())
+        with open(f, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(chunk)
+    digest.update(extra.encode())
+    return digest.hexdigest()[:12]
+
+
+def manifest_checksum(path: Path) -> str:
+    """The checksum write_svm_artifact_v2 stored in a directory's manifest."""
+    checksum = json.loads((Path(path) / MANIFEST).read_text()).get("checksum")
+    if not checksum:
+        raise ValueError(f"{path} has no checksum in {MANIFEST}; rewrite it with python -m ml.train_ant")
+    return checksum
+
+
+def read_svm_artifact_v2(path: Path) -> dict:
+    """Open a v2 artifact directory with every array memory-mapped read-only.
+
+    Returns a dict shaped like a v1 artifact minus the sklearn pipeline and
+    DataFrame lookups: 'lookup_index' and 'serving_model' are prebuilt on
+    top of the mapped arrays.
+    """
+    path = Path(path)
+    manifest = json.loads((path / MANIFEST).read_text())
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format: {manifest.get('format_version')}")
+
+    def load(name: str) -> np.ndarray:
+        return np.load(path / name, mmap_mode="r")
+
+    tables = {}
+    for out_col, meta in manifest["tables"].items():
+        tables[out_col] = (
+            tuple(meta["group_cols"]),
+            int(meta["code_bits"]),
+            int(meta["term_bits"]),
+            load(f"lookup_{out_col}_keys.npy"),
+            load(f"lookup_{out_col}_values.npy"),
+        )
+
+    strings = StringDictionary(load("strings_utf8.npy"), load("strings_offsets.npy"))
+
+    serving_model = _load_model(load, manifest["model"], strings)
+    dept_models = {dept: _load_model(load, meta, strings) for dept, meta in manifest.get("dept_models", {}).items()}
+    return {
+        "format_version": FORMAT_VERSION,
+        "serving_model": serving_model,
+        "dept_models": dept_models,
+        "lookup_index": CodedLookupIndex(strings, tables),
+        "cat_cols": manifest["cat_cols"],
+        "num_cols": manifest["num_cols"],
+        "features": manifest["cat_cols"] + manifest["num_cols"],
+        "max_train_term": int(manifest["max_train_term"]),
+        "serving_max_deviation": manifest.get("serving_max_deviation"),
+    }
@@ -0,0 +1,132 @@
+from __future__ import annotations
+import asyncio
+import os
+
+from starlette.concurrency import run_in_threadpool
+
+from ml.inference import score_candidates
+
+
+# ---------------------------------------------------------------------------
+# Cross-request micro-batching of score_candidates
+# ---------------------------------------------------------------------------
+#
+# Opt-in with SCORING_BATCH_WINDOW_MS > 0.  Concurrent requests on the same
+# event loop park their candidate lists here; after the window elapses, or
+# as soon as SCORING_MAX_BATCH rows are pending, all of them are scored with
+# one predict_proba call and each caller gets back exactly its own rows.
+# The call runs in the threadpool, so the event loop keeps serving (and
+# collecting the next window) while a batch is scored.
+
+DEFAULT_MAX_BATCH = 4096
+
+
+class MicroBatcher:
+    """Collects score_candidates calls for a few milliseconds and scores them together."""
+
+    def __init__(self, window_ms: float, max_batch: int = DEFAULT_MAX_BATCH, score_fn=score_candidates):
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._score_fn = score_fn
+        self._pending: list[tuple[list[dict], dict, asyncio.Future]] = []
+        self._pending_rows = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        # metrics
+        self.batches = 0
+        self.calls = 0
+        self.rows = 0
+        self.size_flushes = 0
+        self.window_flushes = 0
+        self.max_rows = 0
+
+    async def score(self, candidates: list[dict], art: dict) -> list[dict]:
+        """Same contract as inference.score_candidates."""
+        if not candidates:
+            return []
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((candidates, art, future))
+        self._pending_rows += len(candidates)
+        if self._pending_rows >= self.max_batch:
+            self.size_flushes += 1
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._on_window)
+        return await future
+
+    def _on_window(self) -> None:
+        self._timer = None
+        if self._pending:
+            self.window_flushes += 1
+            self.flush()
+
+    def flush(self) -> None:
+        """Start scoring everything pending; waiting callers resolve when it finishes."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._pending_rows = self._pending, [], 0
+
+        # A reload can swap the artifact mid-window; rows are only batched
+        # with rows that asked for the same artifact.
+        groups: dict[int, list[tuple[list[dict], dict, asyncio.Future]]] = {}
+        for entry in pending:
+            groups.setdefault(id(entry[1]), []).append(entry)
+
+        loop = asyncio.get_running_loop()
+        for entries in groups.values():
+            task = loop.create_task(self._score_group(entries))
+            # Keep a reference until done; the loop only holds weak ones.
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _score_group(self, entries: list[tuple[list[dict], dict, asyncio.Future]]) -> None:
+        rows = [c for cands, _, _ in entries for c in cands]
+        self.batches += 1
+        self.calls += len(entries)
+        self.rows += len(rows)
+        self.max_rows = max(self.max_rows, len(rows))
+        try:
+            scored = await run_in_threadpool(self._score_fn, rows, entries[0][1])
+        except Exception as exc:
+            for _, _, future in entries:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        start = 0
+        for cands, _, future in entries:
+            end = start + len(cands)
+            if not future.done():
+                future.set_result(scored[start:end])
+            start = end
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "calls": self.calls,
+            "rows": self.rows,
+            "size_flushes": self.size_flushes,
+            "window_flushes": self.window_flushes,
+            "max_rows": self.max_rows,
+            "mean_calls_per_batch": round(self.calls / self.batches, 3) if self.batches else 0.0,
+            "mean_rows_per_batch": round(self.rows / self.batches, 3) if self.batches else 0.0,
+            "mean_fill": round(self.rows / (self.batches * self.max_batch), 4) if self.batches else 0.0,
+        }
+
+
+_BATCHER: MicroBatcher | None = None
+
+
+def get_batcher() -> MicroBatcher | None:
+    """Return the shared batcher, or None when SCORING_BATCH_WINDOW_MS is unset or 0."""
+    global _BATCHER
+    window_ms = float(os.getenv("SCORING_BATCH_WINDOW_MS", "0") or 0)
+    if window_ms <= 0:
+        return None
+    if _BATCHER is None:
+        max_batch = int(os.getenv("SCORING_MAX_BATCH", str(DEFAULT_MAX_BATCH)))
+        _BATCHER = MicroBatcher(window_ms, max_batch)
+    return _BATCHER
@@ -0,0 +1,197 @@
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import io
+import json
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import average_precision_score, roc_auc_score
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from ml.compiled_model import compile_svm_pipeline, fold_calibrated_ensemble
+from ml.freq_topk import FrequencyTopK
+from ml.train_ant import (
+    CAT_COLS,
+    NUM_COLS,
+    build_labeled_dataset,
+    holdout_features,
+    load_and_prepare,
+    make_svm_pipeline,
+    temporal_split,
+)
+
+
+# ---------------------------------------------------------------------------
+# Accuracy vs serving cost of the candidate model families
+# ---------------------------------------------------------------------------
+#
+#   cd backend && python -m ml.bench_models --output models.json
+#
+# Trains every family on train_ant.py's labeled dataset and temporal split
+# (last 2 terms held out, history features from train-term positives only)
+# and reports, per family:
+#
+#   roc_auc / pr_auc     hold-out ranking quality
+#   artifact_kib         joblib-pickled model size
+#   load_ms              joblib.load of that pickle
+#   latency              predict_proba p50 / p95 (us) at each batch size
+#
+# Batches are drawn from the hold-out rows (with replacement above its
+# size), so every family scores the same inputs.  Only the model is timed:
+# feature hydration (ml/inference.py) costs the same for all of them.
+
+DEFAULT_BATCH_SIZES = (1, 10, 100, 1000, 10000)
+
+
+def make_logreg_pipeline(cat_cols: list[str], num_cols: list[str]) -> Pipeline:
+    # Same features and preprocessing as make_svm_pipeline; the classifier is
+    # probabilistic already, so no calibration folds.
+    preprocess = ColumnTransformer(
+        transformers=[
+            ("cat", OneHotEncoder(handle_unknown="ignore"), cat_cols),
+            ("num", StandardScaler(with_mean=False), num_cols),
+        ],
+        remainder="drop",
+    )
+    return Pipeline(steps=[("prep", preprocess), ("clf", LogisticRegression(class_weight="balanced", max_iter=2000))])
+
+
+class FrequencyScorer:
+    """P(Scheduled) from smoothed (course, instructor, slot) frequency tables.
+
+    A binary-label FrequencyTopK: its top-2 list per context holds both
+    classes, so P(1) is read straight off the precomputed list.
+    """
+
+    def __init__(self, context_cols: list[str], alpha: float = 1.0):
+        self.table = FrequencyTopK(context_cols, k=2, alpha=alpha)
+
+    def fit(self, X: pd.DataFrame, y) -> "FrequencyScorer":
+        self.table.fit(X, np.asarray(y).astype(int))
+        return self
+
+    def predict_proba(self, X) -> np.ndarray:
+        labels, probs = self.table.predict_topk_arrays(X, 2)
+        p1 = np.where(labels == "1", probs, 0.0).sum(axis=1)
+        return np.column_stack([1.0 - p1, p1])
+
+
+def fit_families(X_train: pd.DataFrame, y_train: pd.Series, families) -> dict:
+    """{family: fitted model exposing predict_proba}, with fit seconds printed."""
+    models: dict = {}
+    fitted_svc = None
+
+    def svc():
+        nonlocal fitted_svc
+        if fitted_svc is None:
+            fitted_svc = make_svm_pipeline(CAT_COLS, NUM_COLS).fit(X_train, y_train)
+        return fitted_svc
+
+    builders = {
+        # The sklearn pipeline as trained, and the NumPy model it is served as.
+        "svc_calibrated": svc,
+        "svc_compiled": lambda: compile_svm_pipeline(svc()),
+        # The 3 calibrated folds collapsed into one linear model + sigmoid.
+        "svc_folded": lambda: fold_calibrated_ensemble(compile_svm_pipeline(svc()), X_train),
+        "logreg": lambda: make_logreg_pipeline(CAT_COLS, NUM_COLS).fit(X_train, y_train),
+        "freq_table": lambda: FrequencyScorer(["CourseCode", "Instructor", "Slot"]).fit(X_train, y_train),
+    }
+    for family in families:
+        start = time.perf_counter()
+        models[family] = builders[family]()
+        print(f"fitted {family:<15} in {time.perf_counter() - start:6.2f}s")
+    return models
+
+
+def _time_call(fn, min_seconds: float = 0.2, max_calls: int = 200) -> np.ndarray:
+    """Microseconds per call of fn(), repeated until min_seconds or max_calls."""
+    fn()  # warm-up
+    samples = []
+    deadline = time.perf_counter() + min_seconds
+    while len(samples) < max_calls and (len(samples) < 3 or time.perf_counter() < deadline):
+        start = time.perf_counter_ns()
+        fn()
+        samples.append(time.perf_counter_ns() - start)
+    return np.asarray(samples, dtype=np.float64) / 1000.0
+
+
+def serving_cost(model, X_test: pd.DataFrame, batch_sizes, seed: int = 0) -> dict:
+    """Pickled size, load time and predict_proba latency per batch size."""
+    buf = io.BytesIO()
+    joblib.dump(model, buf)
+    blob = buf.getvalue()
+    load_us = _time_call(lambda: joblib.load(io.BytesIO(blob)), max_calls=20)
+
+    rng = np.random.default_rng(seed)
+    latency = {}
+    for size in batch_sizes:
+        rows = rng.choice(len(X_test), size=size, replace=size > len(X_test))
+        batch = X_test.iloc[rows].reset_index(drop=True)
+        samples = _time_call(lambda: model.predict_proba(batch))
+        latency[str(size)] = {
+            "p50_us": round(float(np.percentile(samples, 50)), 1),
+            "p95_us": round(float(np.percentile(samples, 95)), 1),
+            "us_per_row": round(float(np.percentile(samples, 50)) / size, 2),
+        }
+    return {
+        "artifact_kib": round(len(blob) / 1024.0, 1),
+        "load_ms": round(float(np.median(load_us)) / 1000.0, 2),
+        "latency": latency,
+    }
+
+
+def run(families, batch_sizes) -> dict:
+    df_labeled = build_labeled_dataset(load_and_prepare())
+    _, train_mask, test_mask = temporal_split(df_labeled)
+    df_feat = holdout_features(df_labeled, train_mask)
+    X = df_feat[CAT_COLS + NUM_COLS]
+    y = df_feat["Scheduled"].astype(int)
+    X_train, X_test = X.loc[train_mask], X.loc[test_mask].reset_index(drop=True)
+    y_train, y_test = y.loc[train_mask], y.loc[test_mask]
+
+    report = {"train_rows": int(len(X_train)), "test_rows": int(len(X_test)), "models": {}}
+    for family, model in fit_families(X_train, y_train, families).items():
+        proba = model.predict_proba(X_test)[:, 1]
+        report["models"][family] = {
+            "roc_auc": round(float(roc_auc_score(y_test, proba)), 4),
+            "pr_auc": round(float(average_precision_score(y_test, proba)), 4),
+            **serving_cost(model, X_test, batch_sizes),
+        }
+    return report
+
+
+def format_table(report: dict) -> str:
+    sizes = list(next(iter(report["models"].values()))["latency"]) if report["models"] else []
+    header = f"{'model':<15} {'ROC':>6} {'PR':>6} {'KiB':>9} {'load ms':>8} " + " ".join(f"{'p50us@' + s:>12}" for s in sizes)
+    lines = [header, "-" * len(header)]
+    for family, r in report["models"].items():
+        lat = " ".join(f"{r['latency'][s]['p50_us']:>12.1f}" for s in sizes)
+        lines.append(f"{family:<15} {r['roc_auc']:>6.3f} {r['pr_auc']:>6.3f} {r['artifact_kib']:>9.1f} {r['load_ms']:>8.2f} {lat}")
+    return "\n".join(lines)
+
+
+FAMILIES = ("svc_calibrated", "svc_compiled", "svc_folded", "logreg", "freq_table")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Accuracy vs serving cost of the candidate schedule models.")
+    parser.add_argument("--models", nargs="+", choices=FAMILIES, default=list(FAMILIES))
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=list(DEFAULT_BATCH_SIZES))
+    parser.add_argument("--output", type=Path, help="also write the JSON report here")
+    args = parser.parse_args(argv)
+
+    report = run(args.models, args.batch_sizes)
+    print(format_table(report))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,224 @@
+from __future__ import annotations
+from dataclasses import dataclass
+import numpy as np
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+
+# ---------------------------------------------------------------------------
+# Compiled serving model for the calibrated LinearSVC pipeline
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class CompiledLinearModel:
+    """Plain-NumPy copy of Pipeline(OneHotEncoder + StandardScaler -> calibrated linear model).
+
+    One-hot columns never need materialising: each categorical value maps to
+    a single weight column, so the decision function is a gather over those
+    columns plus a dense dot product on the scaled numerical features.  With
+    several calibrated folds (``CalibratedClassifierCV(cv=k)``) every row of
+    ``coef`` is one fold and the sigmoid probabilities are averaged, exactly
+    as sklearn does.
+
+    categories[j] holds the sorted string categories of cat_cols[j] and
+    category_columns[j] the weight column each of them maps to.
+    """
+
+    cat_cols: list[str]
+    categories: list[np.ndarray]
+    category_columns: list[np.ndarray]
+    num_cols: list[str]
+    num_offset: int
+    num_scale: np.ndarray
+    coef: np.ndarray           # (n_models, n_features)
+    intercept: np.ndarray      # (n_models,)
+    sigmoid_a: np.ndarray      # (n_models,)
+    sigmoid_b: np.ndarray      # (n_models,)
+
+    def __getstate__(self) -> dict:
+        # Fixed-width '<U' category arrays cost 4 bytes x the longest name per
+        # entry; pickle them as plain string lists and rebuild on load.
+        state = dict(self.__dict__)
+        state["categories"] = [cats.tolist() for cats in self.categories]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        state = dict(state)
+        state["categories"] = [np.asarray(cats, dtype=str) for cats in state["categories"]]
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+    @property
+    def n_models(self) -> int:
+        return int(self.coef.shape[0])
+
+    def encode(self, X) -> np.ndarray:
+        """Map each categorical value to its weight column (-1 when unseen).
+
+        X is anything indexable by column name (DataFrame or dict of arrays).
+        Returns an int array of shape (n_samples, len(cat_cols)).
+        """
+        n = len(X[self.cat_cols[0]]) if self.cat_cols else len(X[self.num_cols[0]])
+        cols = np.full((n, len(self.cat_cols)), -1, dtype=np.int64)
+        for j, col in enumerate(self.cat_cols):
+            cats = self.categories[j]
+            if not len(cats):
+                continue
+            vals = np.asarray(X[col], dtype=str)
+            pos = np.searchsorted(cats, vals)
+            pos = np.minimum(pos, len(cats) - 1)
+            hit = cats[pos] == vals
+            cols[hit, j] = self.category_columns[j][pos[hit]]
+        return cols
+
+    def decision_function(self, X) -> np.ndarray:
+        """Per-model linear decision values, shape (n_samples, n_models)."""
+        cat_idx = self.encode(X)
+        num = np.column_stack([np.asarray(X[c], dtype=float) for c in self.num_cols]) / self.num_scale
+        num_coef = self.coef[:, self.num_offset:self.num_offset + len(self.num_cols)]
+        decision = num @ num_coef.T + self.intercept
+        known = cat_idx >= 0
+        gathered = self.coef[:, np.where(known, cat_idx, 0)]    # (n_models, n, n_cat)
+        decision += np.where(known, gathered, 0.0).sum(axis=2).T
+        return decision
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Same contract as sklearn: (n_samples, 2) with P(class 1) in column 1."""
+        decision = self.decision_function(X)
+        p1 = (1.0 / (1.0 + np.exp(self.sigmoid_a * decision + self.sigmoid_b))).mean(axis=1)
+        return np.column_stack([1.0 - p1, p1])
+
+
+def compile_svm_pipeline(pipe: Pipeline) -> CompiledLinearModel:
+    """Extract a CompiledLinearModel from the pipeline train_ant.py builds.
+
+    Raises ValueError when the pipeline does not have the expected
+    ColumnTransformer(OneHotEncoder, StandardScaler) + sigmoid-calibrated
+    linear classifier shape.
+    """
+    if not isinstance(pipe, Pipeline) or len(pipe.steps) != 2:
+        raise ValueError("Expected a fitted Pipeline(prep, clf)")
+    prep = pipe.steps[0][1]
+    clf = pipe.steps[1][1]
+    if not isinstance(clf, CalibratedClassifierCV) or clf.method != "sigmoid":
+        raise ValueError("Expected a sigmoid CalibratedClassifierCV classifier")
+
+    cat_cols: list[str] = []
+    categories: list[np.ndarray] = []
+    category_columns: list[np.ndarray] = []
+    num_cols: list[str] = []
+    num_scale = np.ones(0)
+    num_offset = 0
+    offset = 0
+    for name, transformer, cols in prep.transformers_:
+        if name == "remainder" and transformer == "drop":
+            continue
+        if isinstance(transformer, OneHotEncoder):
+            if transformer.drop_idx_ is not None:
+                raise ValueError("OneHotEncoder(drop=...) is not supported")
+            for col, cats in zip(cols, transformer.categories_):
+                cats = np.asarray(cats, dtype=str)
+                order = np.argsort(cats, kind="stable")
+                cat_cols.append(col)
+                categories.append(cats[order])
+                category_columns.append(offset + order)
+                offset += len(cats)
+        elif isinstance(transformer, StandardScaler):
+            if transformer.with_mean:
+                raise ValueError("StandardScaler(with_mean=True) is not supported")
+            num_cols = list(cols)
+            num_offset = offset
+            num_scale = transformer.scale_ if transformer.scale_ is not None else np.ones(len(cols))
+            offset += len(cols)
+        else:
+            raise ValueError(f"Unsupported transformer {name!r}")
+
+    coef, intercept, sig_a, sig_b = [], [], [], []
+    for calibrated in clf.calibrated_classifiers_:
+        est = calibrated.estimator
+        cal = calibrated.calibrators[0]
+        coef.append(np.asarray(est.coef_, dtype=float).ravel())
+        intercept.append(float(np.ravel(est.intercept_)[0]))
+        sig_a.append(float(cal.a_))
+        sig_b.append(float(cal.b_))
+
+    return CompiledLinearModel(
+        cat_cols=cat_cols,
+        categories=categories,
+        category_columns=category_columns,
+        num_cols=num_cols,
+        num_offset=num_offset,
+        num_scale=np.asarray(num_scale, dtype=float),
+        coef=np.vstack(coef),
+        intercept=np.asarray(intercept),
+        sigmoid_a=np.asarray(sig_a),
+        sigmoid_b=np.asarray(sig_b),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Folding the CalibratedClassifierCV ensemble into one model
+# ---------------------------------------------------------------------------
+
+def fold_calibrated_ensemble(model: CompiledLinearModel, X) -> CompiledLinearModel:
+    """Collapse a k-fold calibrated ensemble into a single linear model + sigmoid.
+
+    Each fold's calibrated logit ``a_k * (w_k . x + c_k) + b_k`` is linear in
+    x, so their mean is one linear model.  A mean of k sigmoids is not itself
+    a sigmoid, though, so this is the closest single-model approximation: a
+    final Platt sigmoid is fitted on that averaged logit so its probabilities
+    match the ensemble's on X (cross-entropy against the ensemble's soft
+    labels).  X should be the data the ensemble was trained on.
+    """
+    if model.n_models == 1:
+        return model
+    from sklearn.linear_model import LogisticRegression
+
+    target = model.predict_proba(X)[:, 1]
+    a = model.sigmoid_a[:, None]
+    averaged = _replace_linear(
+        model,
+        coef=(a * model.coef).mean(axis=0, keepdims=True),
+        intercept=(model.sigmoid_a * model.intercept + model.sigmoid_b).mean(keepdims=True),
+        sigmoid_a=np.array([1.0]),
+        sigmoid_b=np.array([0.0]),
+    )
+    decision = averaged.decision_function(X)[:, 0]
+
+    # Soft-label logistic fit: each row appears once as y=1 weighted by the
+    # ensemble probability and once as y=0 weighted by its complement.
+    n = len(decision)
+    platt = LogisticRegression(C=1e6, max_iter=1000)
+    platt.fit(
+        np.concatenate([decision, decision]).reshape(-1, 1),
+        np.concatenate([np.ones(n), np.zeros(n)]),
+        sample_weight=np.concatenate([target, 1.0 - target]),
+    )
+    # expit(c*f + d) == 1 / (1 + exp(a*f + b)) with a = -c, b = -d
+    return _replace_linear(
+        averaged,
+        coef=averaged.coef,
+        intercept=averaged.intercept,
+        sigmoid_a=-platt.coef_.ravel(),
+        sigmoid_b=-platt.intercept_.ravel(),
+    )
+
+
+def max_probability_deviation(reference, candidate, X) -> float:
+    """Largest |P(class 1)| difference between two models on X."""
+    ref = reference.predict_proba(X)[:, 1]
+    cand = candidate.predict_proba(X)[:, 1]
+    return float(np.abs(ref - cand).max()) if len(ref) else 0.0
+
+
+def _replace_linear(model: CompiledLinearModel, **linear) -> CompiledLinearModel:
+    return CompiledLinearModel(
+        cat_cols=model.cat_cols,
+        categories=model.categories,
+        category_columns=model.category_columns,
+        num_cols=model.num_cols,
+        num_offset=model.num_offset,
+        num_scale=model.num_scale,
+        **linear,
+    )
@@ -0,0 +1,206 @@
+from __future__ import annotations
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import math
+import multiprocessing
+import os
+import threading
+import numpy as np
+
+
+# ---------------------------------------------------------------------------
+# Process-pool scoring executor
+# ---------------------------------------------------------------------------
+#
+# Opt-in with SCORING_WORKERS > 0.  Batches of at least SCORING_MIN_POOL_BATCH
+# candidates are split into chunks (at least SCORING_CHUNK_SIZE rows each)
+# and scored by worker processes, so feature hydration and predict_proba use
+# every core instead of one GIL.  generate_v2 sends a whole request's
+# candidates (about 26 per course) as one batch through score_async(), which
+# awaits the workers without blocking the event loop; the default threshold
+# is sized so a five-course request reaches it.  Each worker opens the artifact once, from
+# the same path the registry loaded, and keeps it until the served
+# artifact_version changes.  Workers return raw probabilities; rounding and
+# tagging stay in inference.score_candidates, so results are identical to
+# in-process scoring.
+
+DEFAULT_MIN_BATCH = 128
+DEFAULT_CHUNK_SIZE = 64
+
+
+class StaleArtifactError(RuntimeError):
+    """The artifact on disk no longer matches the version the parent is serving."""
+
+
+# ---- worker side ----
+
+# path -> artifact, most recently used last.  Tenants (ml.registry) each have
+# their own path; SCORING_WORKER_ARTIFACTS bounds how many a worker keeps.
+_WORKER_ARTS: OrderedDict[str, dict] = OrderedDict()
+DEFAULT_WORKER_ARTIFACTS = 2
+
+
+def _worker_artifact(path: str, version: str | None) -> dict:
+    # Imported here: this only ever runs inside a worker process.
+    from ml.inference import open_svm_artifact_path
+    from ml.registry import artifact_checksum
+
+    art = _WORKER_ARTS.get(path)
+    if art is None or art.get("artifact_version") != version:
+        if version is not None and artifact_checksum(path) != version:
+            raise StaleArtifactError(f"{path} no longer matches artifact {version}")
+        art = open_svm_artifact_path(path)
+        art["artifact_version"] = version
+        _WORKER_ARTS[path] = art
+    _WORKER_ARTS.move_to_end(path)
+    while len(_WORKER_ARTS) > max(1, int(os.getenv("SCORING_WORKER_ARTIFACTS", str(DEFAULT_WORKER_ARTIFACTS)))):
+        _WORKER_ARTS.popitem(last=False)
+    return art
+
+
+def _worker_load(path: str, version: str | None) -> int:
+    _worker_artifact(path, version)
+    return os.getpid()
+
+
+def _worker_score(path: str, version: str | None, candidates: list[dict]) -> np.ndarray:
+    from ml.inference import score_probabilities
+
+    return score_probabilities(candidates, _worker_artifact(path, version))
+
+
+# ---- parent side ----
+
+class ScoringExecutor:
+    """Splits large score_candidates batches across a pool of worker processes."""
+
+    def __init__(self, workers: int, min_batch: int = DEFAULT_MIN_BATCH, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.workers = workers
+        self.min_batch = min_batch
+        self.chunk_size = chunk_size
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.chunks = 0
+        self.rows = 0
+        self.fallbacks = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn, not fork: the API process runs threads (artifact
+                # watcher, threadpool) that must not be forked mid-lock.
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _chunks(self, candidates: list[dict], art: dict) -> list[list[dict]] | None:
+        if len(candidates) < self.min_batch or not art.get("artifact_path"):
+            return None
+        size = max(self.chunk_size, math.ceil(len(candidates) / self.workers))
+        return [candidates[i:i + size] for i in range(0, len(candidates), size)]
+
+    def _submit(self, chunks: list[list[dict]], art: dict) -> list:
+        pool = self._get_pool()
+        path, version = art["artifact_path"], art.get("artifact_version")
+        return [pool.submit(_worker_score, path, version, chunk) for chunk in chunks]
+
+    def _done(self, chunks: list[list[dict]], parts: list[np.ndarray]) -> np.ndarray:
+        self.batches += 1
+        self.chunks += len(chunks)
+        self.rows += sum(len(chunk) for chunk in chunks)
+        return np.concatenate(parts)
+
+    def _failed(self, exc: Exception) -> None:
+        print(f"Scoring pool failed, scoring in-process: {exc}")
+        self.fallbacks += 1
+        if isinstance(exc, BrokenProcessPool):
+            self.shutdown(wait=False)
+
+    def score(self, candidates: list[dict], art: dict) -> np.ndarray | None:
+        """Probabilities for a large batch, or None when it should be scored in-process.
+
+        Small batches and artifacts without an on-disk path are left to the
+        caller, as is any batch the pool fails on.  Blocks until the workers
+        finish: call it from a thread, or use score_async() on the event loop.
+        """
+        chunks = self._chunks(candidates, art)
+        if chunks is None:
+            return None
+        try:
+            parts = [f.result() for f in self._submit(chunks, art)]
+        except (StaleArtifactError, BrokenProcessPool, OSError) as exc:
+            self._failed(exc)
+            return None
+        return self._done(chunks, parts)
+
+    async def score_async(self, candidates: list[dict], art: dict) -> np.ndarray | None:
+        """score() for the event loop: awaits the worker futures instead of blocking on them."""
+        chunks = self._chunks(candidates, art)
+        if chunks is None:
+            return None
+        try:
+            parts = await asyncio.gather(*(asyncio.wrap_future(f) for f in self._submit(chunks, art)))
+        except (StaleArtifactError, BrokenProcessPool, OSError) as exc:
+            self._failed(exc)
+            return None
+        return self._done(chunks, list(parts))
+
+    def prestart(self, art: dict) -> None:
+        """Spawn the workers and have them open the artifact ahead of traffic."""
+        path = art.get("artifact_path")
+        if not path:
+            return
+        try:
+            pool = self._get_pool()
+            futures = [pool.submit(_worker_load, path, art.get("artifact_version")) for _ in range(self.workers)]
+            for f in futures:
+                f.result()
+        except (StaleArtifactError, BrokenProcessPool, OSError) as exc:
+            print(f"Scoring pool did not start, workers will load lazily: {exc}")
+            self.shutdown(wait=False)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait, cancel_futures=True)
+                self._pool = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "min_batch": self.min_batch,
+            "chunk_size": self.chunk_size,
+            "batches": self.batches,
+            "chunks": self.chunks,
+            "rows": self.rows,
+            "fallbacks": self.fallbacks,
+        }
+
+
+_EXECUTOR: ScoringExecutor | None = None
+
+
+def get_scoring_executor() -> ScoringExecutor | None:
+    """Return the shared executor, or None when SCORING_WORKERS is unset or 0."""
+    global _EXECUTOR
+    workers = int(os.getenv("SCORING_WORKERS", "0") or 0)
+    if workers <= 0:
+        return None
+    if _EXECUTOR is None:
+        _EXECUTOR = ScoringExecutor(
+            workers,
+            min_batch=int(os.getenv("SCORING_MIN_POOL_BATCH", str(DEFAULT_MIN_BATCH))),
+            chunk_size=int(os.getenv("SCORING_CHUNK_SIZE", str(DEFAULT_CHUNK_SIZE))),
+        )
+    return _EXECUTOR
+
+
+def shutdown_scoring_executor() -> None:
+    global _EXECUTOR
+    if _EXECUTOR is not None:
+        _EXECUTOR.shutdown()
+        _EXECUTOR = None
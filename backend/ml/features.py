@@ -1,9 +1,23 @@
 from __future__ import annotations
 from dataclasses import dataclass
-import pandas as pd
+import re
+import numpy as np
+
+# Shared by training (train_ant.py, train_hoang.py) and serving (ml_router.py,
+# inference.py).  Each helper has a scalar version for one request -- plain
+# str/int work on a precompiled regex -- and a *_batch version for a whole
+# column.  pandas is only imported inside the batch helpers that use its str
+# accessor, so importing this module does not pull it in.
 
 SEM_ORDER = {"Spring": 0, "Fall": 1}
 
+# 'CS 146 (Section 01)' -> ('CS', '146')
+SECTION_PATTERN = r"^(\w+)\s+([^\s]+)"
+_SECTION_RE = re.compile(SECTION_PATTERN)
+# '09:00AM' / '9:00 pm' -> hour, minute, meridiem
+_CLOCK_RE = re.compile(r"(\d{1,2}):(\d{1,2})\s*([AaPp])[Mm]")
+_NO_TIME = (-1, -1, -1)
+
 
 @dataclass(frozen=True)
 class SemesterIndexConfig:
@@ -14,19 +28,31 @@ def compute_semester_index(year: int, semester: str, cfg: SemesterIndexConfig) -
     return (int(year) * 2 + SEM_ORDER.get(semester, 0)) - cfg.base
 
 
+# ---------------------------------------------------------------------------
+# Scalar helpers
+# ---------------------------------------------------------------------------
+
+def clock_to_minutes(t: str) -> int:
+    """'09:00AM' -> minutes since midnight; -1 for TBA or anything unparseable."""
+    m = _CLOCK_RE.fullmatch(str(t).strip())
+    if m is None:
+        return -1
+    hour, minute = int(m[1]), int(m[2])
+    if not (1 <= hour <= 12 and minute < 60):
+        return -1
+    return ((hour % 12) + (12 if m[3] in "Pp" else 0)) * 60 + minute
+
+
 def parse_time_range(s: str) -> tuple[int, int, int]:
     s = str(s).strip()
     if s == "TBA" or "-" not in s:
-        return -1, -1, -1
-    start_str, end_str = s.split("-")
-
-    start_dt = pd.to_datetime(start_str, format="%I:%M%p", errors="coerce")
-    end_dt = pd.to_datetime(end_str, format="%I:%M%p", errors="coerce")
-    if pd.isna(start_dt) or pd.isna(end_dt):
-        return -1, -1, -1
+        return _NO_TIME
+    start_str, _, end_str = s.partition("-")
 
-    start_min = start_dt.hour * 60 + start_dt.minute
-    end_min = end_dt.hour * 60 + end_dt.minute
+    start_min = clock_to_minutes(start_str)
+    end_min = clock_to_minutes(end_str)
+    if start_min == -1 or end_min == -1:
+        return _NO_TIME
     return start_min, end_min, end_min - start_min
 
 
@@ -44,10 +70,8 @@ def get_building(location: str) -> str:
 
 
 def section_to_course_code(section: str) -> tuple[str, str]:
-    section = str(section).strip()
-    extracted = pd.Series(section).str.extract(r"^(\w+)\s+([^\s]+)").iloc[0]
-    dept = extracted[0] if pd.notna(extracted[0]) else "Unknown"
-    num = extracted[1] if pd.notna(extracted[1]) else "Unknown"
+    m = _SECTION_RE.match(str(section).strip())
+    dept, num = (m[1], m[2]) if m else ("Unknown", "Unknown")
     return dept, f"{dept} {num}"
 
 
@@ -60,3 +84,60 @@ def make_slot(days: str, start_minutes: int) -> str:
 
 def has_ge(satifies: str) -> int:
     return int(str(satifies).startswith("GE:"))
+
+
+# ---------------------------------------------------------------------------
+# Batch helpers (one column at a time)
+# ---------------------------------------------------------------------------
+
+def _as_str_array(values) -> np.ndarray:
+    # str() of every element, as for the scalar helpers (NaN -> 'nan').
+    return np.asarray(values, dtype=str)
+
+
+def parse_time_range_batch(values) -> np.ndarray:
+    """parse_time_range over a column: an (n, 3) int64 array of start, end, duration.
+
+    A timetable has a few hundred distinct time ranges, so each distinct
+    string is parsed once and the results are gathered back with NumPy.
+    """
+    strings = _as_str_array(values)
+    if not len(strings):
+        return np.empty((0, 3), dtype=np.int64)
+    uniques, inverse = np.unique(strings, return_inverse=True)
+    parsed = np.array([parse_time_range(s) for s in uniques], dtype=np.int64)
+    return parsed[inverse.reshape(-1)]
+
+
+def get_building_batch(values) -> np.ndarray:
+    """get_building over a column (object array)."""
+    strings = _as_str_array(values)
+    if not len(strings):
+        return np.empty(0, dtype=object)
+    uniques, inverse = np.unique(strings, return_inverse=True)
+    buildings = np.array([get_building(s) for s in uniques], dtype=object)
+    return buildings[inverse.reshape(-1)]
+
+
+def section_to_course_code_batch(values) -> tuple[np.ndarray, np.ndarray]:
+    """section_to_course_code over a column: (dept, course_code) object arrays."""
+    import pandas as pd
+
+    parts = pd.Series(_as_str_array(values)).str.strip().str.extract(SECTION_PATTERN).fillna("Unknown")
+    dept = parts[0].to_numpy(dtype=object)
+    return dept, (parts[0] + " " + parts[1]).to_numpy(dtype=object)
+
+
+def make_slot_batch(days, start_minutes) -> np.ndarray:
+    """make_slot over aligned days / start-minute columns (object array)."""
+    days = np.char.strip(_as_str_array(days))
+    start = np.asarray(start_minutes, dtype=np.int64)
+    return np.array(
+        [f"{d}_TBA" if s == -1 else f"{d}_{s}" for d, s in zip(days.tolist(), start.tolist())],
+        dtype=object,
+    )
+
+
+def has_ge_batch(values) -> np.ndarray:
+    """has_ge over a column (int64 array)."""
+    return np.char.startswith(_as_str_array(values), "GE:").astype(np.int64)
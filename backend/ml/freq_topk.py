@@ -0,0 +1,173 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+
+# ---------------------------------------------------------------------------
+# Smoothed conditional-frequency top-k predictor
+# ---------------------------------------------------------------------------
+#
+# Drop-in alternative to train_hoang.py's scenario A/B/C random forests for
+# "most likely instructor / slot / course given this context".  Instead of
+# 300 trees voting over thousands of classes, it keeps, for every context
+# seen in training, the k most likely labels already sorted.
+#
+# Contexts back off from the full tuple of context_cols to shorter prefixes
+# (the last column is dropped first) down to the global label prior.  Each
+# level is smoothed towards its parent with a Dirichlet prior of strength
+# alpha:
+#
+#   p(l | c) = (n(c, l) + alpha * p(l | parent(c))) / (n(c) + alpha)
+#
+# A context never seen in training has n(c) = 0, so its distribution IS its
+# parent's: serving looks up the longest seen prefix and returns that
+# context's precomputed list.  Prediction is one dict lookup per distinct
+# context in the batch; no per-class work at all.
+
+
+class FrequencyTopK:
+    """Top-k labels per context from smoothed, backed-off conditional frequencies.
+
+    context_cols: categorical columns, most important first (backoff drops
+    from the end).  k: list length kept per context.  alpha: smoothing
+    strength towards the parent context.  decay: per-term weight decay, so
+    with terms passed to fit() a row from t terms before the latest weighs
+    decay**t (1.0 = plain counts).
+    """
+
+    def __init__(self, context_cols: list[str], k: int = 10, alpha: float = 1.0, decay: float = 1.0):
+        self.context_cols = list(context_cols)
+        self.k = k
+        self.alpha = alpha
+        self.decay = decay
+        self.classes_: np.ndarray = np.empty(0, dtype=str)
+        # One entry per backoff level L (context = first L columns):
+        # (context -> row, labels (rows, k) int32 codes padded with -1, probs (rows, k) float32)
+        self._levels: list[tuple[dict, np.ndarray, np.ndarray]] = []
+
+    # ---- training ----
+
+    def fit(self, X: pd.DataFrame, y, terms=None) -> "FrequencyTopK":
+        y = np.asarray(y, dtype=str)
+        self.classes_, codes = np.unique(y, return_inverse=True)
+        weights = np.ones(len(y))
+        if terms is not None and self.decay != 1.0:
+            terms = np.asarray(terms, dtype=float)
+            weights = self.decay ** (terms.max() - terms)
+
+        df = pd.DataFrame({c: self._column(X, c) for c in self.context_cols})
+        df["_label"] = codes.reshape(-1)
+        df["_w"] = weights
+
+        self._levels = []
+        parent_p = None      # smoothed p of every (parent context, label) seen at the previous level
+        for level in range(len(self.context_cols) + 1):
+            cols = self.context_cols[:level]
+            counts = df.groupby(cols + ["_label"], sort=False)["_w"].sum().reset_index(name="n")
+            if cols:
+                counts["N"] = counts.groupby(cols, sort=False)["n"].transform("sum")
+                # Every (context, label) row has its (parent context, label) row one level up.
+                keys = cols[:-1] + ["_label"]
+                parent = counts[keys].merge(parent_p, on=keys, how="left")["p"].to_numpy()
+                counts["p"] = (counts["n"].to_numpy() + self.alpha * parent) / (counts["N"].to_numpy() + self.alpha)
+                counts["alpha_share"] = self.alpha / (counts["N"] + self.alpha)
+            else:
+                counts["p"] = counts["n"] / counts["n"].sum()
+            self._levels.append(self._top_lists(counts, cols))
+            parent_p = counts[cols + ["_label", "p"]]
+        return self
+
+    def _top_lists(self, counts: pd.DataFrame, cols: list[str]) -> tuple[dict, np.ndarray, np.ndarray]:
+        """Sorted top-k of every context at one level.
+
+        A context's top k come from its own labels (smoothed p) and its
+        parent's top k (scaled by alpha / (N + alpha)); any other label has a
+        lower parent probability than every parent top-k entry.
+        """
+        if not cols:
+            order = np.argsort(-counts["p"].to_numpy(), kind="stable")[: self.k]
+            labels = np.full((1, self.k), -1, dtype=np.int32)
+            probs = np.zeros((1, self.k), dtype=np.float32)
+            labels[0, : len(order)] = counts["_label"].to_numpy()[order]
+            probs[0, : len(order)] = counts["p"].to_numpy()[order]
+            return {(): 0}, labels, probs
+
+        parent_index, parent_labels, parent_probs = self._levels[-1]
+        gid = counts.groupby(cols, sort=False).ngroup().to_numpy()
+        order = np.argsort(gid, kind="stable")
+        starts = np.flatnonzero(np.r_[True, np.diff(gid[order]) != 0])
+        ends = np.r_[starts[1:], len(order)]
+        ctx_values = counts[cols].to_numpy(dtype=object)[order[starts]].tolist()
+        label_col = counts["_label"].to_numpy()[order].tolist()
+        p_col = counts["p"].to_numpy()[order].tolist()
+        share_col = counts["alpha_share"].to_numpy()[order]
+
+        index: dict = {}
+        labels = np.full((len(starts), self.k), -1, dtype=np.int32)
+        probs = np.zeros((len(starts), self.k), dtype=np.float32)
+        for row, (ctx, start, end) in enumerate(zip(ctx_values, starts.tolist(), ends.tolist())):
+            ctx = tuple(ctx)
+            index[ctx] = row
+            best = dict(zip(label_col[start:end], p_col[start:end]))
+            share = float(share_col[start])
+            prow = parent_index[ctx[:-1]]
+            for label, p in zip(parent_labels[prow].tolist(), parent_probs[prow].tolist()):
+                if label >= 0 and label not in best:
+                    best[label] = share * p
+            top = sorted(best.items(), key=lambda item: (-item[1], item[0]))[: self.k]
+            labels[row, : len(top)] = [label for label, _ in top]
+            probs[row, : len(top)] = [p for _, p in top]
+        return index, labels, probs
+
+    # ---- serving ----
+
+    @staticmethod
+    def _column(X, col: str) -> np.ndarray:
+        return np.asarray(X[col], dtype=str)
+
+    def _rows(self, contexts: list[tuple]) -> list[tuple[int, int]]:
+        """(level, row) of the longest seen prefix of each context."""
+        out = []
+        for ctx in contexts:
+            for level in range(len(ctx), -1, -1):
+                row = self._levels[level][0].get(ctx[:level])
+                if row is not None:
+                    out.append((level, row))
+                    break
+        return out
+
+    def predict_topk_arrays(self, X, k: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k labels and probabilities for every row of X.
+
+        Returns (labels, probs) of shape (n, k): labels are strings ('' past
+        the end of a short list), probs float32 sorted descending.  Rows
+        sharing a context are looked up once.
+        """
+        k = self.k if k is None else min(k, self.k)
+        n = len(X[self.context_cols[0]]) if self.context_cols else len(X)
+        columns = [self._column(X, c).tolist() for c in self.context_cols]
+        contexts = list(zip(*columns)) if columns else [()] * n
+        distinct = list(dict.fromkeys(contexts))
+        where = {ctx: i for i, ctx in enumerate(distinct)}
+        codes = np.empty((len(distinct), k), dtype=np.int32)
+        probs = np.empty((len(distinct), k), dtype=np.float32)
+        for i, (level, row) in enumerate(self._rows(distinct)):
+            _, level_labels, level_probs = self._levels[level]
+            codes[i] = level_labels[row, :k]
+            probs[i] = level_probs[row, :k]
+        pick = np.fromiter((where[ctx] for ctx in contexts), dtype=np.int64, count=n)
+        codes, probs = codes[pick], probs[pick]
+        labels = np.where(codes >= 0, self.classes_[np.maximum(codes, 0)], "")
+        return labels, probs
+
+    def predict_topk(self, X, k: int | None = None) -> list[list[tuple[str, float]]]:
+        """Per row, [(label, probability), ...] best first."""
+        labels, probs = self.predict_topk_arrays(X, k)
+        return [
+            [(label, float(p)) for label, p in zip(row_labels, row_probs) if label]
+            for row_labels, row_probs in zip(labels.tolist(), probs.tolist())
+        ]
+
+    def predict(self, X) -> np.ndarray:
+        """Most likely label of each row."""
+        return self.predict_topk_arrays(X, 1)[0][:, 0]
@@ -1,9 +1,16 @@
 from __future__ import annotations
-from datetime import datetime as _dt
+from bisect import bisect_left
 from pathlib import Path
 import math
 import joblib
+import numpy as np
 import pandas as pd
+from starlette.concurrency import run_in_threadpool
+
+from ml.artifact_v2 import MANIFEST, SCORE_TABLE, SCORE_TABLE_COLS, read_svm_artifact_v2
+from ml.compiled_model import compile_svm_pipeline
+from ml.executor import get_scoring_executor
+from ml.features import clock_to_minutes
 
 # REPO_ROOT = Path(__file__).resolve().parents[2]
 # ART_DIR = REPO_ROOT / "backend" / "ml_artifacts"
@@ -19,18 +26,41 @@ def load_artifact(filename: str):
 
 
 # ---------------------------------------------------------------------------
-# SVM artifact cache
+# SVM artifact loading (cached by ml.registry)
 # ---------------------------------------------------------------------------
 
-_SVM_CACHE: dict | None = None
+SVM_ARTIFACT_V1 = "train2_anthony_svm.joblib"
+SVM_ARTIFACT_V2 = "train2_anthony_svm_v2"
+
 
+def open_svm_artifact(art_dir: str | Path | None = None) -> dict:
+    """Open the SVM artifact in art_dir (default ART_DIR), preferring the memory-mapped v2 directory.
 
-def load_svm_artifact() -> dict:
-    """Load and cache the SVM artifact.  Safe to call from multiple modules."""
-    global _SVM_CACHE
-    if _SVM_CACHE is None:
-        _SVM_CACHE = load_artifact("train2_anthony_svm.joblib")
-    return _SVM_CACHE
+    Falls back to the v1 joblib pickle when no v2 artifact has been written.
+    The lookup index and serving model are prepared before returning, and
+    'artifact_path' records where the artifact was read from.
+    """
+    art_dir = ART_DIR if art_dir is None else Path(art_dir)
+    v2_dir = art_dir / SVM_ARTIFACT_V2
+    if (v2_dir / MANIFEST).exists():
+        return open_svm_artifact_path(v2_dir)
+    return open_svm_artifact_path(art_dir / SVM_ARTIFACT_V1)
+
+
+def open_svm_artifact_path(path: str | Path) -> dict:
+    """Open the SVM artifact at `path`: a v2 directory or a v1 joblib file."""
+    path = Path(path)
+    if path.is_dir():
+        art = read_svm_artifact_v2(path)
+    elif path.exists():
+        art = joblib.load(path)
+        art.setdefault("format_version", 1)
+    else:
+        raise FileNotFoundError(f"Missing model artifact: {path}. Run training first.")
+    art["artifact_path"] = str(path)
+    get_lookup_index(art)
+    get_serving_model(art)
+    return art
 
 
 # ---------------------------------------------------------------------------
@@ -41,63 +71,117 @@ def _parse_time_to_minutes(t: str) -> int:
     """Parse a time string like '09:00AM' into minutes since midnight.
     Returns -1 on TBA or parse failure.
     """
-    t = str(t).strip()
-    if t in ("TBA", "TBD", ""):
-        return -1
-    for fmt in ("%I:%M%p", "%I:%M %p"):
-        try:
-            dt = _dt.strptime(t, fmt)
-            return dt.hour * 60 + dt.minute
-        except ValueError:
-            continue
-    return -1
+    return clock_to_minutes(t)
+
+
+class LookupIndex:
+    """As-of index over the artifact's history lookup tables.
+
+    Each table is grouped once into ``{group_key: (terms, values)}`` with the
+    terms sorted ascending, so "latest row strictly before target_term" is a
+    bisect on one small list instead of a boolean mask over the whole table.
+    """
+
+    def __init__(self, lookups: dict):
+        self._tables: dict[str, tuple[tuple[str, ...], dict]] = {}
+        self._snapshots: dict[tuple[str, int], dict] = {}
+        for out_col, tbl in lookups.items():
+            self._tables[out_col] = _index_table(tbl, out_col)
+
+    def get(self, out_col: str, group_vals: dict, target_term: int):
+        """Return the stored value of the latest row before target_term, or None."""
+        entry = self._tables.get(out_col)
+        if entry is None:
+            return None
+        cols, groups = entry
+        if len(group_vals) != len(cols) or any(c not in group_vals for c in cols):
+            return None
+        series = groups.get(tuple(group_vals[c] for c in cols))
+        if series is None:
+            return None
+        terms, values = series
+        pos = bisect_left(terms, target_term)
+        if pos == 0:
+            return None
+        return values[pos - 1]
+
+    def get_many(self, out_col: str, group_arrays: dict, target_term: int) -> np.ndarray:
+        """Vectorized ``get`` over aligned arrays of group values.
+
+        Returns a float array with NaN wherever the group has no row before
+        target_term.  The as-of snapshot ``{group_key: value}`` for
+        target_term is built once and reused, so each call is a single hash
+        join over the candidate keys.
+        """
+        n = len(next(iter(group_arrays.values()))) if group_arrays else 0
+        entry = self._tables.get(out_col)
+        if entry is None or set(group_arrays) != set(entry[0]):
+            return np.full(n, np.nan)
+        cols, groups = entry
+        key = (out_col, target_term)
+        snap = self._snapshots.get(key)
+        if snap is None:
+            snap = {}
+            for group, (terms, values) in groups.items():
+                pos = bisect_left(terms, target_term)
+                if pos:
+                    snap[group] = float(values[pos - 1])
+            self._snapshots[key] = snap
+        keys = zip(*(group_arrays[c] for c in cols))
+        return np.fromiter((snap.get(k, np.nan) for k in keys), dtype=float, count=n)
+
+    def encode_groups(self, groups: dict) -> dict:
+        """The request strings are this index's keys already (see CodedLookupIndex.encode_groups)."""
+        return groups
+
+
+def _index_table(tbl: pd.DataFrame, out_col: str) -> tuple[tuple[str, ...], dict]:
+    """Group one lookup table into ``(group_cols, {key: (terms, values)})``."""
+    cols = tuple(c for c in tbl.columns if c not in ("SemesterIndex", out_col))
+    tbl = tbl.sort_values("SemesterIndex", kind="mergesort")
+    groups: dict = {}
+    keys = zip(*(tbl[c].tolist() for c in cols))
+    for key, term, value in zip(keys, tbl["SemesterIndex"].tolist(), tbl[out_col].tolist()):
+        terms, values = groups.setdefault(key, ([], []))
+        terms.append(int(term))
+        values.append(value)
+    return cols, groups
+
+
+def get_lookup_index(art: dict) -> LookupIndex:
+    """Return the artifact's LookupIndex, building it on first use."""
+    index = art.get("lookup_index")
+    if index is None:
+        tables = dict(art.get("lookups", {}))
+        if art.get("score_table") is not None:
+            tables[SCORE_TABLE] = art["score_table"]
+        index = LookupIndex(tables)
+        art["lookup_index"] = index
+    return index
 
 
 def _lookup_count(
-    lookups: dict, out_col: str, group_vals: dict, target_term: int
+    index: LookupIndex, out_col: str, group_vals: dict, target_term: int
 ) -> float:
     """Cumulative prior count for a group strictly before target_term."""
-    tbl: pd.DataFrame = lookups.get(out_col)
-    if tbl is None:
-        return 0.0
-    mask = tbl["SemesterIndex"] < target_term
-    for col, val in group_vals.items():
-        mask = mask & (tbl[col] == val)
-    rows = tbl[mask]
-    if rows.empty:
+    val = index.get(out_col, group_vals, target_term)
+    if val is None:
         return 0.0
-    return float(rows.sort_values("SemesterIndex").iloc[-1][out_col])
+    return float(val)
 
 
 def _lookup_last_term(
-    lookups: dict, out_col: str, group_vals: dict, target_term: int
+    index: LookupIndex, out_col: str, group_vals: dict, target_term: int
 ) -> int:
     """Return the most recent term this group was seen before target_term.
     Falls back to target_term + 1 (→ terms_since = -1 after subtraction,
     clipped to 0 downstream) when the combo is unknown or data is missing.
     """
     default = target_term + 1
-    if out_col not in lookups:
-        return default
-
-    df = lookups[out_col]
-
-    # Build filter mask for each group key
-    mask = pd.Series([True] * len(df), index=df.index)
-    for col, val in group_vals.items():
-        if col not in df.columns:
-            return default
-        mask &= df[col] == val
-
-    rows = df[mask & (df["SemesterIndex"] < target_term)]
-
-    if rows.empty:
-        return default
-
-    val = rows.sort_values("SemesterIndex").iloc[-1][out_col]
+    val = index.get(out_col, group_vals, target_term)
 
     # Guard against NaN stored in the lookup table
-    if pd.isna(val):
+    if val is None or pd.isna(val):
         return default
 
     return int(val)
@@ -121,7 +205,7 @@ def build_svm_row(candidate: dict, art: dict) -> dict:
 
     Slot format matches training: '{days}_{start_m}_{end_m}' or '{days}_TBA'.
     """
-    lookups = art["lookups"]
+    index = get_lookup_index(art)
     max_train_term = art["max_train_term"]
     # All production scoring uses max_train_term + 1 as the prediction target term.
     target_term = max_train_term + 1
@@ -143,46 +227,46 @@ def build_svm_row(candidate: dict, art: dict) -> dict:
 
     counts = {
         "instr_prior_count": _lookup_count(
-            lookups, "instr_prior_count", {"Instructor": instructor}, target_term
+            index, "instr_prior_count", {"Instructor": instructor}, target_term
         ),
         "course_prior_count": _lookup_count(
-            lookups, "course_prior_count", {"CourseCode": course_code}, target_term
+            index, "course_prior_count", {"CourseCode": course_code}, target_term
         ),
         "slot_prior_count": _lookup_count(
-            lookups, "slot_prior_count", {"Slot": slot}, target_term
+            index, "slot_prior_count", {"Slot": slot}, target_term
         ),
         "course_type_prior_count": _lookup_count(
-            lookups,
+            index,
             "course_type_prior_count",
             {"CourseCode": course_code, "Type": section_type},
             target_term,
         ),
         "instr_dept_prior_count": _lookup_count(
-            lookups,
+            index,
             "instr_dept_prior_count",
             {"Instructor": instructor, "Dept": dept},
             target_term,
         ),
         "instr_course_prior_count": _lookup_count(
-            lookups,
+            index,
             "instr_course_prior_count",
             {"Instructor": instructor, "CourseCode": course_code},
             target_term,
         ),
         "course_slot_prior_count": _lookup_count(
-            lookups,
+            index,
             "course_slot_prior_count",
             {"CourseCode": course_code, "Slot": slot},
             target_term,
         ),
         "course_type_slot_prior_count": _lookup_count(
-            lookups,
+            index,
             "course_type_slot_prior_count",
             {"CourseCode": course_code, "Type": section_type, "Slot": slot},
             target_term,
         ),
         "combo_prior_count": _lookup_count(
-            lookups,
+            index,
             "combo_prior_count",
             {
                 "CourseCode": course_code,
@@ -202,7 +286,7 @@ def build_svm_row(candidate: dict, art: dict) -> dict:
     ]
     recency: dict = {}
     for out_col, grp in recency_pairs:
-        last = _lookup_last_term(lookups, out_col, grp, target_term)
+        last = _lookup_last_term(index, out_col, grp, target_term)
         gap_col = out_col.replace("last_term", "terms_since")
         recency[gap_col] = (target_term + 1) if last == -1 else (target_term - last)
 
@@ -224,25 +308,267 @@ def build_svm_row(candidate: dict, art: dict) -> dict:
     }
 
 
+# ---------------------------------------------------------------------------
+# Columnar feature builder for a whole candidate list
+# ---------------------------------------------------------------------------
+
+# (output column, group columns) for the 9 count and 4 recency lookups.
+# Mirrors count_defs / recency_defs in train_ant.py.
+COUNT_DEFS = [
+    ("instr_prior_count",            ("Instructor",)),
+    ("course_prior_count",           ("CourseCode",)),
+    ("slot_prior_count",             ("Slot",)),
+    ("course_type_prior_count",      ("CourseCode", "Type")),
+    ("instr_dept_prior_count",       ("Instructor", "Dept")),
+    ("instr_course_prior_count",     ("Instructor", "CourseCode")),
+    ("course_slot_prior_count",      ("CourseCode", "Slot")),
+    ("course_type_slot_prior_count", ("CourseCode", "Type", "Slot")),
+    ("combo_prior_count",            ("CourseCode", "Instructor", "Slot", "Type")),
+]
+RECENCY_DEFS = [
+    ("instr_last_term",        ("Instructor",)),
+    ("course_last_term",       ("CourseCode",)),
+    ("instr_course_last_term", ("Instructor", "CourseCode")),
+    ("combo_last_term",        ("CourseCode", "Instructor", "Slot", "Type")),
+]
+
+
+def _candidate_column(candidates: list[dict], key: str, default: str) -> np.ndarray:
+    return np.array([str(c.get(key, default)).strip() for c in candidates], dtype=object)
+
+
+def _minutes_column(candidates: list[dict], key: str) -> np.ndarray:
+    raw = [c.get(key, "TBA") for c in candidates]
+    parsed = {t: _parse_time_to_minutes(t) for t in set(raw)}
+    return np.array([parsed[t] for t in raw], dtype=np.int64)
+
+
+def candidate_groups(candidates: list[dict]) -> dict:
+    """Derive the lookup group columns (CourseCode, Dept, Instructor, Slot, Type) of a candidate list."""
+    course_code = _candidate_column(candidates, "course_number", "")
+    days = _candidate_column(candidates, "days_text", "")
+    start_m = _minutes_column(candidates, "start_time")
+    end_m = _minutes_column(candidates, "end_time")
+
+    # Same '{days}_{start}_{end}' / '{days}_TBA' format as build_svm_row.
+    slot = np.array(
+        [
+            f"{d}_TBA" if s == -1 or e == -1 else f"{d}_{s}_{e}"
+            for d, s, e in zip(days, start_m.tolist(), end_m.tolist())
+        ],
+        dtype=object,
+    )
+    return {
+        "CourseCode": course_code,
+        "Dept":       np.array([cc.split()[0] if cc else "Unknown" for cc in course_code], dtype=object),
+        "Instructor": _candidate_column(candidates, "instructor_name", ""),
+        "Slot":       slot,
+        "Type":       _candidate_column(candidates, "type", "LEC"),
+    }
+
+
+def _select(groups: dict, cols) -> dict:
+    # type(groups) keeps CodedLookupIndex's EncodedGroups marker.
+    return type(groups)((c, groups[c]) for c in cols)
+
+
+def build_feature_matrix(groups: dict, art: dict) -> pd.DataFrame:
+    """Hydrate the model features for aligned group columns (see candidate_groups).
+
+    Each of the 13 history features is a single hash join against the
+    lookup snapshot for max_train_term + 1.  The group strings are encoded
+    for the index once and shared by all 13 lookups.  Returns the feature
+    matrix in ``cat_cols + num_cols`` order.
+    """
+    index = get_lookup_index(art)
+    target_term = art["max_train_term"] + 1
+    keys = index.encode_groups({c: groups[c] for c in ("CourseCode", "Dept", "Instructor", "Slot", "Type")})
+
+    features = {
+        "CourseCode": groups["CourseCode"],
+        "Instructor": groups["Instructor"],
+        "Slot":       groups["Slot"],
+        "Type":       groups["Type"],
+    }
+    for out_col, cols in COUNT_DEFS:
+        counts = index.get_many(out_col, _select(keys, cols), target_term)
+        features[f"{out_col}_log1p"] = np.log1p(np.nan_to_num(counts, nan=0.0))
+    for out_col, cols in RECENCY_DEFS:
+        last = index.get_many(out_col, _select(keys, cols), target_term)
+        last = np.where(np.isnan(last), target_term + 1, last).astype(np.int64)
+        gap_col = out_col.replace("last_term", "terms_since")
+        features[gap_col] = np.where(last == -1, target_term + 1, target_term - last)
+
+    return pd.DataFrame(features)[art["cat_cols"] + art["num_cols"]]
+
+
+def build_svm_matrix(candidates: list[dict], art: dict) -> pd.DataFrame:
+    """Columnar equivalent of ``build_svm_row`` for a whole candidate list.
+
+    Base columns are derived once per column rather than once per candidate
+    (candidate_groups), then hydrated by build_feature_matrix.
+    """
+    return build_feature_matrix(candidate_groups(candidates), art)
+
+
+def lookup_table_scores(groups: dict, art: dict) -> np.ndarray:
+    """Probabilities precomputed by train_ant.py for these groups; NaN where not in the score table.
+
+    Score-table rows are stored at term max_train_term + 1, so the as-of
+    lookup ("latest row strictly before") asks for max_train_term + 2.
+    """
+    return get_lookup_index(art).get_many(
+        SCORE_TABLE, {c: groups[c] for c in SCORE_TABLE_COLS}, art["max_train_term"] + 2
+    )
+
+
 # ---------------------------------------------------------------------------
 # Batch scorer
 # ---------------------------------------------------------------------------
 
-def score_candidates(candidates: list[dict], art: dict) -> list[dict]:
-    """Score a list of candidate dicts in one batch model call.
+def get_serving_model(art: dict):
+    """Return the model used for scoring.
 
-    Returns a new list of dicts, each with 'prob_scheduled' (float 0-1) added.
-    Candidates are scored relative to max_train_term + 1 (next unseen term).
+    Artifacts trained with a folded single-model ``serving_model`` use it
+    directly.  Otherwise the sklearn pipeline is compiled once into a
+    CompiledLinearModel (same probabilities, no per-call
+    Pipeline/ColumnTransformer overhead) and cached on the artifact.
+    Anything that is not the expected pipeline shape is served as-is.
     """
-    if not candidates:
-        return []
-    feature_cols = art["cat_cols"] + art["num_cols"]
-    rows = [build_svm_row(c, art) for c in candidates]
-    X = pd.DataFrame(rows)[feature_cols]
-    proba = art["model"].predict_proba(X)[:, 1]
+    if art.get("serving_model") is not None:
+        return art["serving_model"]
+    model = art.get("compiled_model")
+    if model is None:
+        try:
+            model = compile_svm_pipeline(art["model"])
+        except ValueError:
+            model = art["model"]
+        art["compiled_model"] = model
+    return model
+
+
+def routed_predict_proba(X, depts, model, dept_models: dict | None = None) -> np.ndarray:
+    """P(class 1) for feature rows X, each row scored by its department's model.
+
+    dept_models maps Dept -> model (train_ant.py --per-dept); rows of
+    departments without one, or every row when there are none, use the
+    global model.  A request costs one predict_proba per department it
+    touches.
+    """
+    if not dept_models:
+        return model.predict_proba(X)[:, 1]
+    depts = np.asarray(depts, dtype=object)
+    columns = {c: np.asarray(X[c]) for c in X.columns}
+    proba = np.empty(len(depts), dtype=float)
+    fallback = np.ones(len(depts), dtype=bool)
+    for dept in dict.fromkeys(depts.tolist()):
+        dept_model = dept_models.get(dept)
+        if dept_model is None:
+            continue
+        rows = np.flatnonzero(depts == dept)
+        proba[rows] = dept_model.predict_proba({c: v[rows] for c, v in columns.items()})[:, 1]
+        fallback[rows] = False
+    if fallback.any():
+        # The global model may be a plain sklearn pipeline: give it a DataFrame.
+        proba[fallback] = model.predict_proba(X[fallback])[:, 1]
+    return proba
+
+
+def score_probabilities(candidates: list[dict], art: dict) -> np.ndarray:
+    """P(scheduled) for each candidate, in order.
+
+    Precomputed probabilities from the artifact's score table are used
+    first; only candidates outside the enumerated universe go through the
+    model (their department's, when the artifact has per-Dept models).
+    """
+    groups = candidate_groups(candidates)
+    proba = lookup_table_scores(groups, art)
+    miss = np.isnan(proba)
+    if miss.any():
+        missed = {c: v[miss] for c, v in groups.items()}
+        proba[miss] = routed_predict_proba(
+            build_feature_matrix(missed, art), missed["Dept"], get_serving_model(art), art.get("dept_models")
+        )
+    return proba
+
+
+def _with_probabilities(candidates: list[dict], proba, art: dict) -> list[dict]:
+    version = art.get("artifact_version")
     result = []
     for c, p in zip(candidates, proba):
         item = dict(c)
         item["prob_scheduled"] = round(float(p), 4)
+        item["artifact_version"] = version
         result.append(item)
     return result
+
+
+def score_candidates(candidates: list[dict], art: dict) -> list[dict]:
+    """Score a list of candidate dicts in one batch model call.
+
+    Returns a new list of dicts, each with 'prob_scheduled' (float 0-1) and
+    the 'artifact_version' that produced it added.
+    Candidates are scored relative to max_train_term + 1 (next unseen term).
+    """
+    if not candidates:
+        return []
+    # Large batches are split across the worker-process pool when
+    # SCORING_WORKERS is set (ml/executor.py); otherwise score in-process.
+    executor = get_scoring_executor()
+    proba = executor.score(candidates, art) if executor is not None else None
+    if proba is None:
+        proba = score_probabilities(candidates, art)
+    return _with_probabilities(candidates, proba, art)
+
+
+async def score_candidates_async(candidates: list[dict], art: dict) -> list[dict]:
+    """score_candidates for async endpoints; never blocks the event loop.
+
+    Pool batches are awaited (ScoringExecutor.score_async); everything else
+    is scored in the threadpool.
+    """
+    if not candidates:
+        return []
+    executor = get_scoring_executor()
+    proba = await executor.score_async(candidates, art) if executor is not None else None
+    if proba is None:
+        proba = await run_in_threadpool(score_probabilities, candidates, art)
+    return _with_probabilities(candidates, proba, art)
+
+
+# ---------------------------------------------------------------------------
+# Top-k labels (scenario A/B/C artifacts from train_hoang.py)
+# ---------------------------------------------------------------------------
+
+def topk_from_proba(proba: np.ndarray, classes, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """The k most likely classes of every row of an (n, classes) probability matrix.
+
+    np.argpartition picks each row's k best in linear time; only those k
+    are then sorted, instead of argsorting thousands of classes per row.
+    Returns (labels, probs), both (n, k), best first.
+    """
+    proba = np.asarray(proba)
+    k = max(0, min(k, proba.shape[1]))
+    if k == 0 or not len(proba):
+        return np.empty((len(proba), k), dtype=object), np.empty((len(proba), k))
+    if k < proba.shape[1]:
+        best = np.argpartition(-proba, k - 1, axis=1)[:, :k]
+    else:
+        best = np.broadcast_to(np.arange(k), proba.shape)
+    best_p = np.take_along_axis(proba, best, axis=1)
+    order = np.argsort(-best_p, axis=1, kind="stable")
+    return np.asarray(classes)[np.take_along_axis(best, order, axis=1)], np.take_along_axis(best_p, order, axis=1)
+
+
+def predict_topk(art: dict, X: pd.DataFrame, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """(labels, probs) top-k arrays for feature rows X from a scenario artifact.
+
+    Handles both artifact kinds train_hoang.py writes: a random-forest
+    "pipeline" (one predict_proba for the whole batch) and a FrequencyTopK
+    "predictor", whose lists are already sorted (padded with '' labels).
+    """
+    predictor = art.get("predictor")
+    if predictor is not None:
+        return predictor.predict_topk_arrays(X, k)
+    pipeline = art["pipeline"]
+    return topk_from_proba(pipeline.predict_proba(X), pipeline.classes_, k)
@@ -1,53 +1,74 @@
 from __future__ import annotations
+import hmac
+import json
 import math
+import os
+import threading
+import numpy as np
 import pandas as pd
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional
 
 from ml.features import (
+    SEM_ORDER,
     compute_semester_index,
+    get_building_batch,
     has_ge,
+    has_ge_batch,
     parse_time_range,
+    parse_time_range_batch,
     section_to_course_code,
+    section_to_course_code_batch,
     SemesterIndexConfig,
     get_building,
 )
-from ml.inference import load_artifact
+from ml.batching import get_batcher
+from ml.executor import get_scoring_executor
+from ml.inference import LookupIndex, get_lookup_index, load_artifact, predict_topk, score_candidates
+from ml.registry import SVM_REGISTRY, TENANT_REGISTRY, UnknownTenantError, load_svm_artifact
 
 
 router = APIRouter(prefix="/ml", tags=["ml"])
 
 
-# Artifact filenames used when loading model artifacts.  The original
-# training script generates three files:
-# ``scenario_A_instructor.joblib``, ``scenario_B_slot.joblib`` and
-# ``scenario_C_course.joblib``.  To experiment with the new
-# logistic-regression models built by ``train2.py`` simply change the
-# constants below (e.g. ``ARTIFACT_A = "train2_logreg.joblib"``).
-# ARTIFACT_A   = "scenario_A_instructor.joblib"
-# ARTIFACT_B   = "scenario_B_slot.joblib"
-# ARTIFACT_C   = "scenario_C_course.joblib"
-ARTIFACT_SVM = "train2_anthony_svm.joblib"
+# Scenario artifacts written by train_hoang.py: A predicts the instructor and
+# B the slot of a course context, C the course of an instructor context.
+# Each file holds a random-forest "pipeline"; SCENARIO_PREDICTOR=freq serves
+# the FrequencyTopK "predictor" saved next to it (<name>_freq.joblib)
+# instead.  They are loaded on first use, so a deployment that never calls
+# /ml/predict/* never pays for them.
+SCENARIO_ARTIFACTS = {
+    "A": "scenario_A_instructor",
+    "B": "scenario_B_slot",
+    "C": "scenario_C_course",
+}
+_SCENARIOS: dict[str, dict] = {}
+_SCENARIO_LOCK = threading.Lock()
 
 
-# Load artifacts once at import time; the operation is fast and the
-# objects are immutable, so this avoids repeated I/O on every request.
-# A = load_artifact(ARTIFACT_A)
-# B = load_artifact(ARTIFACT_B)
-# C = load_artifact(ARTIFACT_C)
+def _get_scenario(name: str) -> dict:
+    """Load (once) and return a scenario artifact; FileNotFoundError until trained."""
+    art = _SCENARIOS.get(name)
+    if art is None:
+        with _SCENARIO_LOCK:
+            art = _SCENARIOS.get(name)
+            if art is None:
+                suffix = "_freq" if os.getenv("SCENARIO_PREDICTOR", "rf") == "freq" else ""
+                art = load_artifact(f"{SCENARIO_ARTIFACTS[name]}{suffix}.joblib")
+                _SCENARIOS[name] = art
+    return art
 
-# SVM artifact is loaded lazily to avoid crashing the router if training
-# has not been run yet.  The first request to /predict/scheduled will load it.
-_SVM: dict | None = None
 
+# The SVM artifact lives in ml.registry, shared with schedules.py.  main.py
+# preloads it at startup; it is still loaded lazily if that did not happen.
 
-def _get_svm() -> dict:
-    """Return the cached SVM artifact, loading it on first call."""
-    global _SVM
-    if _SVM is None:
-        _SVM = load_artifact(ARTIFACT_SVM)
-    return _SVM
+
+def _get_svm(tenant: Optional[str] = None) -> dict:
+    """Return the shared SVM artifact (or a tenant's) from the model registry."""
+    return load_svm_artifact(tenant)
 
 
 # simple Pydantic models used for request validation; they will be
@@ -93,36 +114,24 @@ class InstructorContext(BaseModel):
 # ---------------------------------------------------------------------------
 
 
-def _lookup_count(lookups: dict, out_col: str, group_vals: dict, target_term: int) -> float:
+def _lookup_count(index: LookupIndex, out_col: str, group_vals: dict, target_term: int) -> float:
     """Return the cumulative prior count for a group up to (but not including) target_term.
 
     Looks up the latest row in the lookup table where term < target_term.
     Falls back to 0.0 when the group has never been seen before.
     """
-    tbl: pd.DataFrame = lookups.get(out_col)
-    if tbl is None:
-        return 0.0
-    mask = tbl["SemesterIndex"] < target_term
-    for col, val in group_vals.items():
-        mask = mask & (tbl[col] == val)
-    rows = tbl[mask]
-    if rows.empty:
+    val = index.get(out_col, group_vals, target_term)
+    if val is None:
         return 0.0
-    return float(rows.sort_values("SemesterIndex").iloc[-1][out_col])
+    return float(val)
 
 
-def _lookup_last_term(lookups: dict, out_col: str, group_vals: dict, target_term: int) -> int:
+def _lookup_last_term(index: LookupIndex, out_col: str, group_vals: dict, target_term: int) -> int:
     """Return the most recent term the group was seen before target_term, or -1."""
-    tbl: pd.DataFrame = lookups.get(out_col)
-    if tbl is None:
+    val = index.get(out_col, group_vals, target_term)
+    if val is None or pd.isna(val):
         return -1
-    mask = tbl["SemesterIndex"] < target_term
-    for col, val in group_vals.items():
-        mask = mask & (tbl[col] == val)
-    rows = tbl[mask]
-    if rows.empty:
-        return -1
-    return int(rows.sort_values("SemesterIndex").iloc[-1][out_col])
+    return int(val)
 
 
 def build_features_svm(p: ScheduledCandidateContext) -> pd.DataFrame:
@@ -133,7 +142,7 @@ def build_features_svm(p: ScheduledCandidateContext) -> pd.DataFrame:
     from the precomputed lookup tables baked into the artifact.
     """
     art = _get_svm()
-    lookups: dict = art["lookups"]
+    index = get_lookup_index(art)
     max_train_term: int = art["max_train_term"]
 
     # --- Derive base fields ---
@@ -157,46 +166,46 @@ def build_features_svm(p: ScheduledCandidateContext) -> pd.DataFrame:
     # --- Hydrate 9 count features ---
     counts = {
         "instr_prior_count": _lookup_count(
-            lookups, "instr_prior_count", {"Instructor": p.instructor}, target_term
+            index, "instr_prior_count", {"Instructor": p.instructor}, target_term
         ),
         "course_prior_count": _lookup_count(
-            lookups, "course_prior_count", {"CourseCode": course_code}, target_term
+            index, "course_prior_count", {"CourseCode": course_code}, target_term
         ),
         "slot_prior_count": _lookup_count(
-            lookups, "slot_prior_count", {"Slot": slot}, target_term
+            index, "slot_prior_count", {"Slot": slot}, target_term
         ),
         "course_type_prior_count": _lookup_count(
-            lookups,
+            index,
             "course_type_prior_count",
             {"CourseCode": course_code, "Type": p.type},
             target_term,
         ),
         "instr_dept_prior_count": _lookup_count(
-            lookups,
+            index,
             "instr_dept_prior_count",
             {"Instructor": p.instructor, "Dept": dept},
             target_term,
         ),
         "instr_course_prior_count": _lookup_count(
-            lookups,
+            index,
             "instr_course_prior_count",
             {"Instructor": p.instructor, "CourseCode": course_code},
             target_term,
         ),
         "course_slot_prior_count": _lookup_count(
-            lookups,
+            index,
             "course_slot_prior_count",
             {"CourseCode": course_code, "Slot": slot},
             target_term,
         ),
         "course_type_slot_prior_count": _lookup_count(
-            lookups,
+            index,
             "course_type_slot_prior_count",
             {"CourseCode": course_code, "Type": p.type, "Slot": slot},
             target_term,
         ),
         "combo_prior_count": _lookup_count(
-            lookups,
+            index,
             "combo_prior_count",
             {
                 "CourseCode": course_code,
@@ -217,7 +226,7 @@ def build_features_svm(p: ScheduledCandidateContext) -> pd.DataFrame:
     ]
     recency: dict = {}
     for out_col, grp in recency_pairs:
-        last = _lookup_last_term(lookups, out_col, grp, target_term)
+        last = _lookup_last_term(index, out_col, grp, target_term)
         gap_col = out_col.replace("last_term", "terms_since")
         recency[gap_col] = (target_term + 1) if last == -1 else (target_term - last)
 
@@ -265,30 +274,6 @@ def build_features_AB(p: CourseContext, sem_cfg: SemesterIndexConfig) -> dict:
         "HasGE": has_ge(safe_satisfies),
     }
 
-# @router.post("/predict/instructor")
-# def predict_instructor(
-#     payload: CourseContext, k: int = 3
-# ) -> dict:
-#     """Return the top-*k* instructor predictions for a course context."""
-
-#     row = build_features_AB(payload, A["sem_cfg"])
-#     X = pd.DataFrame([row])[A["cat"] + A["num"]]
-#     preds = topk(A["pipeline"], X, k=k)
-#     return {"best": preds[0], "topk": preds}
-
-
-# @router.post("/predict/slot")
-# def predict_slot(
-#     payload: CourseContext, k: int = 3
-# ) -> dict:
-#     """Return the top-*k* slot predictions for a course context."""
-
-#     row = build_features_AB(payload, B["sem_cfg"])
-#     X = pd.DataFrame([row])[B["cat"] + B["num"]]
-#     preds = topk(B["pipeline"], X, k=k)
-#     return {"best": preds[0], "topk": preds}
-
-
 # @router.post("/predict/scheduled")
 # def predict_scheduled(payload: ScheduledCandidateContext) -> dict:
 #     """Score a candidate (course, instructor, slot, type) for the upcoming term.
@@ -322,26 +307,260 @@ def build_features_AB(p: CourseContext, sem_cfg: SemesterIndexConfig) -> dict:
 #     }
 
 
-# @router.post("/predict/course")
-# def predict_course(payload: InstructorContext, k: int = 3) -> dict:
-#     """Return the top-*k* course predictions for an instructor context.
-#     The input dictionary matches the features used during training of
-#     scenario C artifacts.
-#     """
+def _semester_index_batch(years: np.ndarray, semesters: list[str], sem_cfg: SemesterIndexConfig) -> np.ndarray:
+    order = np.fromiter((SEM_ORDER.get(s, 0) for s in semesters), dtype=np.int64, count=len(semesters))
+    return years * 2 + order - sem_cfg.base
 
-#     # Scenario C inputs match training features.
-#     sem_index = compute_semester_index(
-#         payload.year, payload.semester, C["sem_cfg"]
-#     )
-#     row = {
-#         "Instructor": payload.instructor,
-#         "Mode": payload.mode,
-#         "Type": payload.type,
-#         "Semester": payload.semester,
-#         "Building": payload.building,
-#         "Year": payload.year,
-#         "SemesterIndex": sem_index,
-#     }
-#     X = pd.DataFrame([row])[C["cat"] + C["num"]]
-#     preds = topk(C["pipeline"], X, k=k)
-#     return {"best": preds[0], "topk": preds}
+
+def build_features_AB_batch(contexts: list[CourseContext], sem_cfg: SemesterIndexConfig) -> pd.DataFrame:
+    """build_features_AB for a whole batch: one DataFrame, one row per context.
+
+    Each column is derived in one pass with the ml.features batch helpers
+    (distinct time ranges / locations are parsed once), not row by row.
+    """
+    dept, course_code = section_to_course_code_batch([c.section for c in contexts])
+    times = parse_time_range_batch([c.times or "12:00AM-12:00AM" for c in contexts])
+    years = np.fromiter((c.year for c in contexts), dtype=np.int64, count=len(contexts))
+    semesters = [c.semester for c in contexts]
+    return pd.DataFrame({
+        "Dept": dept,
+        "CourseCode": course_code,
+        "Mode": [c.mode for c in contexts],
+        "Type": [c.type for c in contexts],
+        "Semester": semesters,
+        "Building": get_building_batch([c.location or "Unknown" for c in contexts]),
+        "Unit": np.fromiter((c.unit for c in contexts), dtype=np.int64, count=len(contexts)),
+        "Year": years,
+        "SemesterIndex": _semester_index_batch(years, semesters, sem_cfg),
+        "DurationMinutes": times[:, 2],
+        "HasGE": has_ge_batch([c.satifies or "Unknown" for c in contexts]),
+    })
+
+
+def build_features_C_batch(contexts: list[InstructorContext], sem_cfg: SemesterIndexConfig) -> pd.DataFrame:
+    """Scenario C feature rows (instructor context -> course), one per context."""
+    years = np.fromiter((c.year for c in contexts), dtype=np.int64, count=len(contexts))
+    semesters = [c.semester for c in contexts]
+    return pd.DataFrame({
+        "Instructor": [c.instructor for c in contexts],
+        "Mode": [c.mode for c in contexts],
+        "Type": [c.type for c in contexts],
+        "Semester": semesters,
+        "Building": [c.building for c in contexts],
+        "Year": years,
+        "SemesterIndex": _semester_index_batch(years, semesters, sem_cfg),
+    })
+
+
+# ---------------------------------------------------------------------------
+# Top-k prediction (scenario A/B/C, batched)
+# ---------------------------------------------------------------------------
+
+MAX_PREDICT_BATCH = 10000
+MAX_PREDICT_K = 50
+
+
+def _predict_batch(scenario: str, contexts: list, builder, k: int) -> dict:
+    """Top-k labels for every context in one feature build and one model call."""
+    if len(contexts) > MAX_PREDICT_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_PREDICT_BATCH} contexts per request")
+    if not contexts:
+        return {"predictions": []}
+    try:
+        art = _get_scenario(scenario)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    X = builder(contexts, art["sem_cfg"])[art["cat"] + art["num"]]
+    labels, probs = predict_topk(art, X, k)
+    predictions = []
+    for row_labels, row_probs in zip(labels.tolist(), probs.tolist()):
+        topk = [{"label": str(label), "prob": round(float(p), 4)}
+                for label, p in zip(row_labels, row_probs) if label != ""]
+        predictions.append({"best": topk[0] if topk else None, "topk": topk})
+    return {"predictions": predictions}
+
+
+@router.post("/predict/instructor")
+def predict_instructor(contexts: list[CourseContext], k: int = Query(3, ge=1, le=MAX_PREDICT_K)) -> dict:
+    """Top-k instructors for each course context (scenario A), in input order."""
+    return _predict_batch("A", contexts, build_features_AB_batch, k)
+
+
+@router.post("/predict/slot")
+def predict_slot(contexts: list[CourseContext], k: int = Query(3, ge=1, le=MAX_PREDICT_K)) -> dict:
+    """Top-k slots for each course context (scenario B), in input order."""
+    return _predict_batch("B", contexts, build_features_AB_batch, k)
+
+
+@router.post("/predict/course")
+def predict_course(contexts: list[InstructorContext], k: int = Query(3, ge=1, le=MAX_PREDICT_K)) -> dict:
+    """Top-k courses for each instructor context (scenario C), in input order."""
+    return _predict_batch("C", contexts, build_features_C_batch, k)
+
+
+# ---------------------------------------------------------------------------
+# Batch scoring
+# ---------------------------------------------------------------------------
+
+NDJSON = "application/x-ndjson"
+DEFAULT_SCORE_CHUNK = 1000
+MAX_SCORE_CHUNK = 10000
+REQUIRED_CANDIDATE_KEYS = ("course_number", "instructor_name")
+
+
+def _check_candidate(candidate, line: int) -> dict:
+    if not isinstance(candidate, dict):
+        raise ValueError(f"candidate {line}: expected a JSON object")
+    missing = [k for k in REQUIRED_CANDIDATE_KEYS if not candidate.get(k)]
+    if missing:
+        raise ValueError(f"candidate {line}: missing {', '.join(missing)}")
+    return candidate
+
+
+def _ndjson_candidates(body: bytes):
+    """Yield candidates from an NDJSON body, one object per line."""
+    for line_no, raw in enumerate(body.split(b"\n"), start=1):
+        if raw.strip():
+            try:
+                candidate = json.loads(raw)
+            except ValueError as exc:   # includes json.JSONDecodeError
+                raise ValueError(f"candidate {line_no}: invalid JSON ({exc})") from None
+            yield _check_candidate(candidate, line_no)
+
+
+async def _scored_chunks(candidates, art: dict, chunk_size: int):
+    """Score candidates chunk by chunk off the event loop and yield NDJSON lines.
+
+    Errors after the response has started cannot change the status code, so
+    a bad candidate ends the stream with an {"error": ...} line, after the
+    scored results of every candidate before it.
+    """
+    chunk: list[dict] = []
+    candidates = iter(candidates)
+    while True:
+        error = None
+        try:
+            for candidate in candidates:
+                chunk.append(candidate)
+                if len(chunk) >= chunk_size:
+                    break
+        except ValueError as exc:
+            error = str(exc)
+        if chunk:
+            scored = await run_in_threadpool(score_candidates, chunk, art)
+            yield "".join(json.dumps(item) + "\n" for item in scored)
+        if error is not None:
+            yield json.dumps({"error": error}) + "\n"
+            return
+        if len(chunk) < chunk_size:
+            return
+        chunk = []
+
+
+@router.post("/score/batch")
+async def score_batch(
+    request: Request,
+    chunk_size: int = Query(DEFAULT_SCORE_CHUNK, ge=1, le=MAX_SCORE_CHUNK),
+    tenant: Optional[str] = Query(None),
+):
+    """Score many (course, instructor, slot, type) candidates in one connection.
+
+    Body: a JSON list of candidates (or {"candidates": [...]}) or, with
+    Content-Type application/x-ndjson, one candidate object per line.
+    Candidates use the generate_v2 shape: course_number, instructor_name,
+    days_text, start_time, end_time and optional type (default "LEC").
+
+    Response: NDJSON, one line per candidate in input order with
+    prob_scheduled and artifact_version added.  Candidates are scored
+    chunk_size at a time and each chunk is streamed as soon as it is done.
+    NDJSON lines are parsed lazily, so a malformed line ends the stream with
+    an {"error": ...} line after the results before it.  tenant selects
+    another campus / catalog artifact (see ml.registry.TenantRegistry).
+    """
+    try:
+        art = _get_svm(tenant)
+    except UnknownTenantError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+
+    if request.headers.get("content-type", "").split(";")[0].strip() == NDJSON:
+        # The body is read here, before the response starts: once streaming,
+        # StreamingResponse listens for disconnects on the same receive
+        # channel and the body would never finish arriving.
+        candidates = _ndjson_candidates(await request.body())
+    else:
+        try:
+            body = await request.json()
+            items = body.get("candidates") if isinstance(body, dict) else body
+            if not isinstance(items, list):
+                raise ValueError("expected a list of candidates or {\"candidates\": [...]}")
+            items = [_check_candidate(c, i + 1) for i, c in enumerate(items)]
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        candidates = items
+
+    return StreamingResponse(_scored_chunks(candidates, art, chunk_size), media_type=NDJSON)
+
+
+# ---------------------------------------------------------------------------
+# Model admin
+# ---------------------------------------------------------------------------
+
+def _check_admin_token(token: Optional[str]) -> None:
+    """Admin endpoints are disabled unless MODEL_ADMIN_TOKEN is set."""
+    expected = os.getenv("MODEL_ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=404, detail="Model admin endpoints are disabled")
+    if not token or not hmac.compare_digest(token, expected):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.post("/admin/reload")
+async def reload_model(
+    force: bool = False, tenant: Optional[str] = None, x_admin_token: Optional[str] = Header(None)
+) -> dict:
+    """Load, warm and swap in the SVM artifact currently on disk.
+
+    Requests already running finish on the previous artifact.  Unless
+    force=true, nothing is swapped when the artifact checksum is unchanged.
+    With tenant, reloads that tenant's artifact instead of the default one.
+    """
+    _check_admin_token(x_admin_token)
+    try:
+        if tenant:
+            swapped = await run_in_threadpool(TENANT_REGISTRY.reload, tenant, force)
+        else:
+            swapped = await run_in_threadpool(SVM_REGISTRY.reload, force)
+    except UnknownTenantError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Reload failed, previous artifact still served: {exc}")
+    if tenant:
+        return {"swapped": swapped, **TENANT_REGISTRY.stats()["tenants"][tenant]}
+    return {"swapped": swapped, **SVM_REGISTRY.status()}
+
+
+@router.get("/models/stats")
+async def model_stats() -> dict:
+    """Per-tenant artifact memory estimates, hit/miss counts and evictions (ml/registry.py).
+
+    The default artifact is always resident and reported by /ready instead.
+    """
+    return TENANT_REGISTRY.stats()
+
+
+@router.get("/scoring/stats")
+async def scoring_stats() -> dict:
+    """Micro-batcher fill metrics (ml/batching.py) and process-pool usage (ml/executor.py).
+
+    Each section is null when that feature is disabled.
+    """
+    batcher = get_batcher()
+    executor = get_scoring_executor()
+    return {
+        "batcher": batcher.stats() if batcher is not None else None,
+        "executor": executor.stats() if executor is not None else None,
+    }
@@ -0,0 +1,422 @@
+from __future__ import annotations
+from collections import OrderedDict
+from pathlib import Path
+import os
+import re
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+from ml.artifact_v2 import MANIFEST, files_checksum, manifest_checksum
+from ml.inference import ART_DIR, SVM_ARTIFACT_V1, SVM_ARTIFACT_V2, open_svm_artifact, score_candidates
+
+
+# Synthetic candidates scored once after loading so the first real request
+# does not pay for lazy index/snapshot construction.  Unknown names are fine:
+# they exercise the same code paths as real ones.
+WARMUP_CANDIDATES = [
+    {
+        "course_number": "CS 146",
+        "instructor_name": "Warmup Instructor",
+        "days_text": "MW",
+        "start_time": "09:00AM",
+        "end_time": "10:15AM",
+    },
+    {
+        "course_number": "CS 151",
+        "instructor_name": "Warmup Instructor",
+        "days_text": "TR",
+        "start_time": "TBA",
+        "end_time": "TBA",
+    },
+]
+
+
+def artifact_checksum(path: str | Path) -> str:
+    """Version of an artifact: the checksum in a v2 directory's manifest, or a sha256 of a v1 file.
+
+    v2 directories are hashed once when written, so opening one (here and in
+    every scoring worker) stays O(1) in the artifact's size.
+    """
+    path = Path(path)
+    return manifest_checksum(path) if path.is_dir() else files_checksum([path])
+
+
+def default_watch_paths() -> list[Path]:
+    """The file whose mtime changes when the artifact open_svm_artifact() picks is rewritten.
+
+    That is the v2 manifest when a v2 directory exists, else the v1 file;
+    re-evaluated on every poll so a newly written v2 directory is noticed.
+    """
+    manifest = ART_DIR / SVM_ARTIFACT_V2 / MANIFEST
+    return [manifest] if manifest.exists() else [ART_DIR / SVM_ARTIFACT_V1]
+
+
+class ModelRegistry:
+    """Process-wide holder for the served SVM artifact.
+
+    main.py loads and warms it in the FastAPI lifespan hook so workers are
+    ready before they take traffic; get() still loads and warms lazily when
+    the hook did not run (tests, scripts) or its load failed.
+
+    The artifact and its status are kept together in one tuple that reload()
+    replaces with a single assignment.  A request holds the dict get()
+    returned for its whole lifetime, so in-flight requests finish on the
+    artifact they started with while new ones see the new version.
+    """
+
+    def __init__(self, opener=open_svm_artifact, watch_paths=None):
+        self._opener = opener
+        self._watch_paths = watch_paths
+        self._lock = threading.Lock()      # serialises loads; readers never take it once loaded
+        self._current: tuple[dict, dict] | None = None
+        self._signature = None
+        self._pending_signature = None
+        self._stop = threading.Event()
+        self._watcher: threading.Thread | None = None
+        self.error: str | None = None
+        self.reloads = 0
+
+    # ---- serving ----
+
+    def get(self) -> dict:
+        current = self._current
+        if current is None:
+            with self._lock:
+                if self._current is None:
+                    art, info = self._open()
+                    self._warm(art, info)
+                    self._current = (art, info)
+                current = self._current
+        return current[0]
+
+    def load(self) -> dict:
+        """(Re)load the artifact now, without warming it."""
+        with self._lock:
+            self._current = self._open()
+            return self._current[0]
+
+    def warmup(self) -> None:
+        """Run one synthetic scoring pass through the loaded artifact (if not already warm)."""
+        self.get()
+        current = self._current
+        if not current[1]["warm"]:
+            self._warm(*current)
+
+    def status(self) -> dict:
+        current = self._current
+        info = dict(current[1]) if current else {
+            "artifact_version": None,
+            "format_version": None,
+            "loaded_at": None,
+            "load_seconds": None,
+            "warm": False,
+            "warmup_seconds": None,
+        }
+        info["ready"] = bool(current) and info["warm"]
+        info["error"] = self.error
+        info["reloads"] = self.reloads
+        info["watching"] = self._watcher is not None and self._watcher.is_alive()
+        return info
+
+    # ---- reload ----
+
+    def reload(self, force: bool = False) -> bool:
+        """Load and warm the artifact on disk, then swap it in.
+
+        Runs in the caller's thread (admin endpoint threadpool or watcher);
+        requests keep being served from the current artifact meanwhile.
+        Returns False without swapping when the checksum is unchanged, unless
+        force is set.  On failure the current artifact stays in service and
+        the exception propagates.
+        """
+        with self._lock:
+            art, info = self._open()
+            current = self._current
+            if not force and current and info["artifact_version"] == current[1]["artifact_version"]:
+                return False
+            self._warm(art, info)
+            self._current = (art, info)
+            self.reloads += 1
+            print(f"Swapped in SVM artifact {info['artifact_version']}")
+            return True
+
+    def check_for_update(self) -> bool:
+        """Reload when a watched file's mtime or size changed since the last load.
+
+        A change is only acted on once two consecutive polls agree on it, so
+        a retrain caught mid-write (v2 directory briefly renamed away) does
+        not swap in an intermediate artifact.
+        """
+        previous = self._signature
+        signature = self._file_signature()
+        if signature == previous:
+            self._pending_signature = None
+            return False
+        if signature != self._pending_signature:
+            self._pending_signature = signature
+            return False
+        try:
+            swapped = self.reload()
+        except Exception as exc:
+            # Keep the old signature so the next check retries.
+            self._signature = previous
+            print(f"SVM artifact reload failed, still serving {self.status()['artifact_version']}: {exc}")
+            return False
+        self._signature = signature
+        return swapped
+
+    def start_watcher(self, interval: float) -> None:
+        """Poll the artifact files every `interval` seconds in a daemon thread."""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        if self._signature is None:
+            self._signature = self._file_signature()
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                self.check_for_update()
+
+        self._watcher = threading.Thread(target=run, name="svm-artifact-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    # ---- internals ----
+
+    def _file_signature(self) -> tuple:
+        paths = self._watch_paths if self._watch_paths is not None else default_watch_paths()
+        signature = []
+        for p in paths:
+            try:
+                st = Path(p).stat()
+            except OSError:
+                continue
+            signature.append((str(p), st.st_mtime_ns, st.st_size))
+        return tuple(signature)
+
+    def _open(self) -> tuple[dict, dict]:
+        start = time.perf_counter()
+        signature = self._file_signature()
+        try:
+            art = self._opener()
+        except Exception as exc:
+            self.error = str(exc)
+            raise
+        path = art.get("artifact_path")
+        version = artifact_checksum(path) if path else None
+        art["artifact_version"] = version
+        info = {
+            "artifact_version": version,
+            "format_version": art.get("format_version", 1),
+            "loaded_at": time.time(),
+            "load_seconds": time.perf_counter() - start,
+            "warm": False,
+            "warmup_seconds": None,
+        }
+        self._signature = signature
+        self.error = None
+        return art, info
+
+    @staticmethod
+    def _warm(art: dict, info: dict) -> None:
+        start = time.perf_counter()
+        score_candidates(WARMUP_CANDIDATES, art)
+        info["warmup_seconds"] = time.perf_counter() - start
+        info["warm"] = True
+
+
+# ---------------------------------------------------------------------------
+# Per-tenant artifacts under a memory budget
+# ---------------------------------------------------------------------------
+#
+# Other campuses / catalogs keep their artifacts in ART_DIR/tenants/<tenant>/
+# with the same file names as the default one (v2 directory and/or v1
+# pickle).  They are opened on first request and kept in LRU order; once
+# their estimated total passes MODEL_MEMORY_BUDGET_MB the least recently
+# used ones are dropped.  The default artifact (SVM_REGISTRY) is always
+# resident and not counted against the budget.
+
+DEFAULT_TENANT = "default"
+TENANTS_DIR = "tenants"
+DEFAULT_MEMORY_BUDGET_MB = 1024
+_TENANT_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+
+
+class UnknownTenantError(LookupError):
+    """No artifact directory exists for the requested tenant."""
+
+
+def artifact_memory_bytes(art: dict) -> int:
+    """Estimate the bytes an opened artifact keeps alive.
+
+    Walks the artifact's containers and objects: arrays count their nbytes
+    (memory-mapped ones as if fully paged in), DataFrames their deep
+    memory_usage and everything else sys.getsizeof.  Objects shared with
+    the rest of the process (interned strings, small ints) are counted too,
+    so this errs high.
+    """
+    seen: set[int] = set()
+    stack: list = [art]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, np.ndarray):
+            total += obj.nbytes
+            if obj.dtype == object:
+                stack.extend(obj.ravel().tolist())
+        elif isinstance(obj, (pd.DataFrame, pd.Series)):
+            total += int(np.sum(obj.memory_usage(deep=True)))
+        else:
+            total += sys.getsizeof(obj)
+            if isinstance(obj, dict):
+                stack.extend(obj.keys())
+                stack.extend(obj.values())
+            elif isinstance(obj, (list, tuple, set, frozenset)):
+                stack.extend(obj)
+            elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+                stack.append(vars(obj))
+    return total
+
+
+class TenantRegistry:
+    """SVM artifacts keyed by tenant, loaded on demand and evicted LRU-first past a memory budget.
+
+    Each resident tenant has its own ModelRegistry, so loading, warming and
+    reload() behave exactly as for the default artifact, and loading one
+    tenant never blocks requests for another.  Evicting a tenant only drops
+    the registry's reference: requests still holding its artifact finish on
+    it.  Hit/miss counters outlive eviction so the budget can be tuned from
+    stats().
+    """
+
+    def __init__(self, root: str | Path | None = None, budget_bytes: int | None = None, opener=open_svm_artifact):
+        self._root = root
+        self._budget_bytes = budget_bytes
+        self._opener = opener
+        self._lock = threading.Lock()      # guards _entries and the counters; never held while loading
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._counters: dict[str, dict] = {}
+        self.evictions = 0
+
+    @property
+    def root(self) -> Path:
+        return Path(self._root) if self._root is not None else ART_DIR / TENANTS_DIR
+
+    @property
+    def budget_bytes(self) -> int:
+        if self._budget_bytes is not None:
+            return self._budget_bytes
+        return int(float(os.getenv("MODEL_MEMORY_BUDGET_MB", str(DEFAULT_MEMORY_BUDGET_MB))) * (1 << 20))
+
+    def tenant_dir(self, tenant: str) -> Path:
+        if not _TENANT_RE.fullmatch(tenant or ""):
+            raise UnknownTenantError(f"Invalid tenant id: {tenant!r}")
+        path = self.root / tenant
+        if not path.is_dir():
+            raise UnknownTenantError(f"No artifacts for tenant {tenant!r}")
+        return path
+
+    def get(self, tenant: str) -> dict:
+        """Return the tenant's artifact, loading and warming it (and evicting others) if needed."""
+        with self._lock:
+            entry = self._entries.get(tenant)
+            missed = entry is None
+            if missed:
+                # Validated before any counter is created, so unknown ids cost nothing.
+                path = self.tenant_dir(tenant)
+                entry = {"registry": ModelRegistry(lambda: self._opener(path), watch_paths=[]), "memory_bytes": None}
+                self._entries[tenant] = entry
+            counters = self._counters.setdefault(tenant, {"hits": 0, "misses": 0})
+            counters["misses" if missed else "hits"] += 1
+            self._entries.move_to_end(tenant)
+            entry["last_used"] = time.time()
+
+        try:
+            art = entry["registry"].get()
+        except Exception:
+            with self._lock:
+                if self._entries.get(tenant) is entry:
+                    del self._entries[tenant]
+            raise
+        if entry["memory_bytes"] is None:
+            self._account(tenant, entry, art)
+        return art
+
+    def reload(self, tenant: str, force: bool = False) -> bool:
+        """ModelRegistry.reload() for one tenant; loads it if it is not resident."""
+        entry = self._entries.get(tenant)
+        if entry is None:
+            self.get(tenant)
+            return True
+        swapped = entry["registry"].reload(force)
+        if swapped:
+            self._account(tenant, entry, entry["registry"].get())
+        return swapped
+
+    def evict(self, tenant: str) -> bool:
+        with self._lock:
+            return self._entries.pop(tenant, None) is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = list(self._entries.items())
+            counters = {t: dict(c) for t, c in self._counters.items()}
+        tenants = {}
+        for tenant, c in counters.items():
+            tenants[tenant] = {**c, "resident": False}
+        for tenant, entry in entries:
+            status = entry["registry"].status()
+            tenants[tenant].update({
+                "resident": True,
+                "ready": status["ready"],
+                "artifact_version": status["artifact_version"],
+                "format_version": status["format_version"],
+                "memory_bytes": entry["memory_bytes"],
+                "last_used": entry.get("last_used"),
+            })
+        return {
+            "budget_bytes": self.budget_bytes,
+            "resident_bytes": sum(e["memory_bytes"] or 0 for _, e in entries),
+            "evictions": self.evictions,
+            "tenants": tenants,
+        }
+
+    def _account(self, tenant: str, entry: dict, art: dict) -> None:
+        nbytes = artifact_memory_bytes(art)
+        with self._lock:
+            entry["memory_bytes"] = nbytes
+            budget = self.budget_bytes
+            total = sum(e["memory_bytes"] or 0 for e in self._entries.values())
+            # Oldest first; the tenant just served always stays, even alone over budget.
+            for victim in [t for t in self._entries if t != tenant]:
+                if total <= budget:
+                    break
+                total -= self._entries.pop(victim)["memory_bytes"] or 0
+                self.evictions += 1
+                print(f"Evicted SVM artifact for tenant {victim} ({total} of {budget} bytes resident)")
+
+
+SVM_REGISTRY = ModelRegistry()
+TENANT_REGISTRY = TenantRegistry()
+
+
+def load_svm_artifact(tenant: str | None = None) -> dict:
+    """Return the served SVM artifact (loaded on first use).  Safe to call from multiple modules.
+
+    With a tenant other than DEFAULT_TENANT, returns that tenant's artifact
+    from TENANT_REGISTRY (UnknownTenantError if it has none).
+    """
+    if tenant and tenant != DEFAULT_TENANT:
+        return TENANT_REGISTRY.get(tenant)
+    return SVM_REGISTRY.get()
@@ -1,4 +1,5 @@
 from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from sklearn.svm import LinearSVC
 from sklearn.calibration import CalibratedClassifierCV
@@ -6,11 +7,23 @@ from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import roc_auc_score, average_precision_score, classification_report
+import argparse
+import multiprocessing
+import os
 import re
 import joblib
 import numpy as np
 import pandas as pd
 
+from ml.artifact_v2 import SCORE_TABLE, SCORE_TABLE_COLS, write_svm_artifact_v2
+from ml.compiled_model import (
+    CompiledLinearModel,
+    compile_svm_pipeline,
+    max_probability_deviation,
+)
+from ml.features import SECTION_PATTERN, get_building_batch, has_ge_batch, parse_time_range_batch
+from ml.inference import build_feature_matrix, get_serving_model, routed_predict_proba
+
 
 # Paths
 REPO_ROOT = Path(__file__).resolve().parents[2]
@@ -20,7 +33,8 @@ OUT_DIR.mkdir(parents=True, exist_ok=True)
 
 
 def norm_slot(d, t):
-    return f"{re.sub('\\s+', '', str(d))}|{str(t).strip()}"
+    days = re.sub(r"\s+", "", str(d))
+    return f"{days}|{str(t).strip()}"
 
 
 def load_and_prepare():
@@ -44,28 +58,14 @@ def load_and_prepare():
     df_engineer = df.copy()
 
     # 4a. Section -> Dept, CourseNumber, CourseCode
-    section = df_engineer["Section"].str.extract(r"^(\w+)\s+([^\s]+)")
+    section = df_engineer["Section"].str.extract(SECTION_PATTERN)
     df_engineer["Dept"] = section[0]
     df_engineer["CourseNumber"] = section[1]
     df_engineer["CourseCode"] = df_engineer["Dept"].astype(str) + " " + df_engineer["CourseNumber"].astype(str)
 
     # 4b. Times -> StartMinutes, EndMinutes, DurationMinutes
-    def parse_time_range(s):
-        try:
-            if s == "TBA" or "-" not in str(s):
-                return -1, -1, -1
-            start_str, end_str = str(s).split("-")
-            start_dt = pd.to_datetime(start_str, format="%I:%M%p")
-            end_dt = pd.to_datetime(end_str, format="%I:%M%p")
-            start_min = start_dt.hour * 60 + start_dt.minute
-            end_min = end_dt.hour * 60 + end_dt.minute
-            return start_min, end_min, end_min - start_min
-        except Exception:
-            return -1, -1, -1
-
-    df_engineer[["StartMinutes", "EndMinutes", "DurationMinutes"]] = df_engineer["Times"].apply(
-        lambda s: pd.Series(parse_time_range(s))
-    )
+    # (ml/features.py: the same parser ml_router uses at serving time)
+    df_engineer[["StartMinutes", "EndMinutes", "DurationMinutes"]] = parse_time_range_batch(df_engineer["Times"])
 
     # 4c. Slot from Days + StartMinutes/EndMinutes
     def make_slot(row):
@@ -79,22 +79,10 @@ def load_and_prepare():
     df_engineer["Slot"] = df_engineer.apply(make_slot, axis=1)
 
     # 4d. HasGE from Satifies
-    df_engineer["HasGE"] = df_engineer["Satifies"].astype(str).str.startswith("GE:").astype(int)
+    df_engineer["HasGE"] = has_ge_batch(df_engineer["Satifies"])
 
     # 4e. Building from Location
-    def get_building(location):
-        location = str(location).strip()
-        if location in ["ONLINE", "Unknown"]:
-            return location
-        prefix = ""
-        for ch in location:
-            if ch.isalpha():
-                prefix += ch
-            else:
-                break
-        return prefix if prefix else "Unknown"
-
-    df_engineer["Building"] = df_engineer["Location"].apply(get_building)
+    df_engineer["Building"] = get_building_batch(df_engineer["Location"])
 
     # 4e (term): Term column
     df_engineer["Term"] = df_engineer["Year"].astype(str) + "_" + df_engineer["Semester"].astype(str)
@@ -323,43 +311,202 @@ def _build_lookup_tables(
         tbl = _make_last_seen_term_table(hist, group_cols, term_col, out_col)
         lookups[out_col] = tbl.copy()
 
-    return lookups
+    return _intern_lookup_tables(lookups, term_col)
+
+
+def _intern_lookup_tables(lookups: dict, term_col: str = "SemesterIndex") -> dict:
+    """Shrink the lookup DataFrames without changing the values they serve.
+
+    Every string group column becomes a categorical over ONE shared,
+    sorted CategoricalDtype (the pickle stores each distinct string once,
+    and rows hold small integer codes instead of object pointers); the term
+    column and integer counts take the narrowest integer dtype, and the
+    NaN-bearing last-term columns float32 (terms are small integers, so
+    exact).  LookupIndex reads them back as the same strings and numbers.
+    """
+    vocab: set[str] = set()
+    for out_col, tbl in lookups.items():
+        for c in tbl.columns:
+            if c not in (term_col, out_col):
+                vocab.update(tbl[c].astype(str).unique().tolist())
+    shared = pd.CategoricalDtype(sorted(vocab))
+
+    interned = {}
+    for out_col, tbl in lookups.items():
+        tbl = tbl.reset_index(drop=True)
+        for c in tbl.columns:
+            if c == term_col:
+                tbl[c] = pd.to_numeric(tbl[c], downcast="integer")
+            elif c == out_col:
+                numeric = pd.to_numeric(tbl[c])
+                kind = "integer" if numeric.notna().all() else "float"
+                tbl[c] = pd.to_numeric(numeric, downcast=kind)
+            else:
+                tbl[c] = tbl[c].astype(str).astype(shared)
+        interned[out_col] = tbl
+    return interned
 
 
 # ---------------------------------------------------------------------------
-# Main training function
+# Offline score table for the generate_v2 candidate universe
 # ---------------------------------------------------------------------------
 
-def train_linear_svm(df_engineer: pd.DataFrame) -> None:
-    """Train the notebook's Linear SVM with history/recency features.
+def build_score_universe(
+    df_engineer: pd.DataFrame, n_terms: int = 4, n_instructors: int = 3, section_type: str = "LEC"
+) -> pd.DataFrame:
+    """Enumerate the (CourseCode, Instructor, Slot, Type) candidates generate_v2 will score.
 
-    Key design choices (matching the notebook exactly):
+    Mirrors stats.generate_professor_slot_candidates on the training data:
+    per course, the top `n_instructors` instructors by section count over
+    its last `n_terms` Spring/Fall terms, crossed with every slot used in
+    those terms (TBA included).  Those candidates carry no type, so they
+    are scored as `section_type`.
+    """
+    df = df_engineer[df_engineer["Semester"].isin(["Spring", "Fall"])].dropna(subset=["CourseCode", "Slot"]).copy()
+    df["term_idx"] = pd.to_numeric(df["Year"], errors="coerce") * 2 + (df["Semester"] == "Fall").astype(int)
+    df = df.dropna(subset=["term_idx"])
+
+    terms = df[["CourseCode", "term_idx"]].drop_duplicates()
+    terms = terms[terms.groupby("CourseCode")["term_idx"].rank(method="first", ascending=False) <= n_terms]
+    recent = df.merge(terms, on=["CourseCode", "term_idx"])
+
+    instr = recent["Instructor"].astype(str).str.strip()
+    has_instr = recent["Instructor"].notna() & (instr != "")
+    top = (
+        recent.loc[has_instr].assign(Instructor=instr[has_instr])
+        .groupby(["CourseCode", "Instructor"]).size().reset_index(name="n")
+        .sort_values(["CourseCode", "n", "Instructor"], ascending=[True, False, True], kind="mergesort")
+        .groupby("CourseCode").head(n_instructors)
+    )
 
-    1. Term-aware negative sampling
-       Instructor pool is scoped to (SemesterIndex, Dept) — so fake rows
-       only use instructors who were actually active in that same term.
-       Positive-key check includes SemesterIndex to avoid false negatives.
+    days = recent["Days"].astype(str).str.strip()
+    has_days = recent["Days"].notna() & (days != "")
+    slots = recent.loc[has_days, ["CourseCode", "Slot"]].drop_duplicates()
 
-    2. Temporal train / test split
-       Last 2 SemesterIndex values are held out as the test set.  This
-       mirrors production: we always predict for a future term.
+    universe = top[["CourseCode", "Instructor"]].merge(slots, on="CourseCode")
+    universe["Type"] = section_type
+    return universe.reset_index(drop=True)
 
-    3. No-leak history features
-       add_history_features_no_leak() is called with train-term positives
-       only (train_pos_hist).  Test rows see train history but not each
-       other, so metrics are honest.
 
-    4. Preprocessor
-       OneHotEncoder on categoricals + StandardScaler(with_mean=False) on
-       the 13 numerical history columns.  with_mean=False keeps the OHE
-       output sparse, which LinearSVC requires.
+def build_score_table(universe: pd.DataFrame, artifact: dict) -> pd.DataFrame:
+    """Score every universe row with the artifact's serving model.
 
-    5. Artifact
-       Saves model, feature lists, precomputed lookup tables, and
-       max_train_term to 'train2_anthony_svm.joblib' so ml_router.py can
-       hydrate the 13 num_cols at inference time without re-running the
-       full feature-engineering pipeline.
+    Returns a lookup table (CourseCode, Instructor, Slot, Type,
+    SemesterIndex, prob_scheduled) stored at term max_train_term + 1, the
+    term production scoring always targets.
     """
+    # Score on a shallow copy so the lookup index built here is not pickled
+    # into the artifact.
+    scoring_art = dict(artifact)
+    course_code = universe["CourseCode"].to_numpy(dtype=object)
+    groups = {
+        "CourseCode": course_code,
+        "Dept":       np.array([cc.split()[0] if cc else "Unknown" for cc in course_code], dtype=object),
+        "Instructor": universe["Instructor"].to_numpy(dtype=object),
+        "Slot":       universe["Slot"].to_numpy(dtype=object),
+        "Type":       universe["Type"].to_numpy(dtype=object),
+    }
+    X = build_feature_matrix(groups, scoring_art)
+    table = universe[list(SCORE_TABLE_COLS)].copy()
+    table["SemesterIndex"] = int(artifact["max_train_term"]) + 1
+    table[SCORE_TABLE] = routed_predict_proba(
+        X, groups["Dept"], get_serving_model(scoring_art), scoring_art.get("dept_models")
+    )
+    return table
+
+
+# ---------------------------------------------------------------------------
+# Model fitting (global and per department)
+# ---------------------------------------------------------------------------
+
+# Departments with fewer labeled rows than this (or fewer than 3 of either
+# class, the calibration folds' minimum) keep using the global model.
+DEFAULT_MIN_DEPT_ROWS = 300
+
+
+def make_svm_pipeline(cat_cols: list[str], num_cols: list[str]) -> Pipeline:
+    # StandardScaler(with_mean=False): sparse-safe scaler for count features.
+    # LinearSVC is margin-based and sensitive to feature scale, so scaling
+    # the numerical columns is important.
+    preprocess = ColumnTransformer(
+        transformers=[
+            ("cat", OneHotEncoder(handle_unknown="ignore"), cat_cols),
+            ("num", StandardScaler(with_mean=False), num_cols),
+        ],
+        remainder="drop",
+    )
+    svm = LinearSVC(class_weight="balanced", max_iter=2000, C=1.0)
+    clf = CalibratedClassifierCV(estimator=svm, method="sigmoid", cv=3)
+    return Pipeline(steps=[("prep", preprocess), ("clf", clf)])
+
+
+def _fit_compiled(X: pd.DataFrame, y: pd.Series, cat_cols: list[str], num_cols: list[str]) -> CompiledLinearModel:
+    # Top-level so ProcessPoolExecutor can pickle it; returns the compiled
+    # model only (a few KB), not the fitted pipeline.
+    pipe = make_svm_pipeline(cat_cols, num_cols)
+    pipe.fit(X, y)
+    return compile_svm_pipeline(pipe)
+
+
+def train_dept_models(
+    X: pd.DataFrame,
+    y: pd.Series,
+    depts,
+    cat_cols: list[str],
+    num_cols: list[str],
+    workers: int = 1,
+    min_rows: int = DEFAULT_MIN_DEPT_ROWS,
+) -> dict[str, CompiledLinearModel]:
+    """Fit one calibrated LinearSVC per department, `workers` at a time in separate processes.
+
+    Each model one-hot encodes only its department's courses, instructors
+    and slots, so it is smaller and faster to fit than the global one, and
+    departments train independently.  Returns {Dept: CompiledLinearModel}
+    for the departments with enough data.
+    """
+    depts = np.asarray(depts, dtype=object)
+    jobs = {}
+    for dept in sorted(set(depts.tolist()) - {None}):
+        mask = depts == dept
+        y_dept = y[mask]
+        counts = y_dept.value_counts()
+        if mask.sum() < min_rows or len(counts) < 2 or counts.min() < 3:
+            continue
+        jobs[dept] = (X[mask], y_dept)
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(jobs)), mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            futures = {dept: pool.submit(_fit_compiled, Xd, yd, cat_cols, num_cols) for dept, (Xd, yd) in jobs.items()}
+            return {dept: f.result() for dept, f in futures.items()}
+    return {dept: _fit_compiled(Xd, yd, cat_cols, num_cols) for dept, (Xd, yd) in jobs.items()}
+
+
+# ---------------------------------------------------------------------------
+# Labeled dataset and temporal split (shared with ml/bench_models.py)
+# ---------------------------------------------------------------------------
+
+CAT_COLS = ["CourseCode", "Instructor", "Slot", "Type"]
+NUM_COLS = [
+    "instr_prior_count_log1p",
+    "course_prior_count_log1p",
+    "slot_prior_count_log1p",
+    "course_type_prior_count_log1p",
+    "instr_dept_prior_count_log1p",
+    "instr_course_prior_count_log1p",
+    "course_slot_prior_count_log1p",
+    "course_type_slot_prior_count_log1p",
+    "combo_prior_count_log1p",
+    "instr_terms_since",
+    "course_terms_since",
+    "instr_course_terms_since",
+    "combo_terms_since",
+]
+
+
+def build_labeled_dataset(df_engineer: pd.DataFrame) -> pd.DataFrame:
+    """Scheduled positives plus K=3 term-aware sampled negatives per positive (see train_linear_svm)."""
     df = df_engineer.copy()
 
     # ---- Build positive rows ----
@@ -457,37 +604,95 @@ def train_linear_svm(df_engineer: pd.DataFrame) -> None:
         [df_pos[preserve_cols], neg[preserve_cols]], ignore_index=True
     )
     print(f"Labeled dataset: {df_labeled['Scheduled'].value_counts().to_dict()}")
+    return df_labeled
 
-    # ---- Temporal train / test split ----
-    # Last 2 terms are held out as the test set.
+
+def temporal_split(df_labeled: pd.DataFrame) -> tuple[list, pd.Series, pd.Series]:
+    """(all_terms, train_mask, test_mask): the last 2 terms are held out as the test set."""
     all_terms = sorted(df_labeled["SemesterIndex"].unique())
     test_terms = set(all_terms[-2:])
     train_mask = ~df_labeled["SemesterIndex"].isin(test_terms)
     test_mask = df_labeled["SemesterIndex"].isin(test_terms)
     print(f"Train terms: {sorted(set(all_terms) - test_terms)}  |  Test terms: {sorted(test_terms)}")
+    return all_terms, train_mask, test_mask
+
+
+def holdout_features(df_labeled: pd.DataFrame, train_mask: pd.Series) -> pd.DataFrame:
+    """History/recency features where every row looks back into train-term positives only."""
+    train_pos_hist = df_labeled.loc[train_mask & (df_labeled["Scheduled"] == 1)].copy()
+    return add_history_features_no_leak(df_labeled, train_pos_hist, term_col="SemesterIndex")
+
+
+# ---------------------------------------------------------------------------
+# Main training function
+# ---------------------------------------------------------------------------
+
+def train_linear_svm(
+    df_engineer: pd.DataFrame,
+    per_dept: bool = False,
+    workers: int = 1,
+    min_dept_rows: int = DEFAULT_MIN_DEPT_ROWS,
+) -> None:
+    """Train the notebook's Linear SVM with history/recency features.
+
+    Key design choices (matching the notebook exactly):
+
+    1. Term-aware negative sampling
+       Instructor pool is scoped to (SemesterIndex, Dept) — so fake rows
+       only use instructors who were actually active in that same term.
+       Positive-key check includes SemesterIndex to avoid false negatives.
+
+    2. Temporal train / test split
+       Last 2 SemesterIndex values are held out as the test set.  This
+       mirrors production: we always predict for a future term.
+
+    3. No-leak history features
+       add_history_features_no_leak() is called with train-term positives
+       only (train_pos_hist).  Test rows see train history but not each
+       other, so metrics are honest.
+
+    4. Preprocessor
+       OneHotEncoder on categoricals + StandardScaler(with_mean=False) on
+       the 13 numerical history columns.  with_mean=False keeps the OHE
+       output sparse, which LinearSVC requires.
+
+    5. Artifact
+       Saves model, feature lists, precomputed lookup tables, and
+       max_train_term to 'train2_anthony_svm.joblib' so ml_router.py can
+       hydrate the 13 num_cols at inference time without re-running the
+       full feature-engineering pipeline.
+
+    6. Serving model
+       The 3-fold calibrated ensemble is compiled to NumPy
+       (ml.compiled_model.compile_svm_pipeline) and stored as
+       'serving_model' in place of the sklearn pipeline, with its max
+       probability deviation from the pipeline on the training data.
+
+    7. Artifact v2
+       The same artifact is also written as 'train2_anthony_svm_v2/', a
+       directory of .npy blobs (packed integer lookup keys, shared string
+       dictionary, model weights) that inference memory-maps.
+
+    8. Offline score table
+       Every (course, top-3 instructor, recent slot) candidate of the next
+       term is scored once here and stored as 'score_table', a lookup
+       table served by score_candidates before it falls back to the model.
+
+    9. Per-department models (per_dept=True)
+       One more pipeline per Dept with at least min_dept_rows labeled rows,
+       fitted `workers` at a time in separate processes and stored as
+       'dept_models'.  Scoring routes each candidate to its department's
+       model and falls back to the global one.
+    """
+    df_labeled = build_labeled_dataset(df_engineer)
+    all_terms, train_mask, test_mask = temporal_split(df_labeled)
 
     # ---- No-leak history features ----
     # Only positives from train terms form the history that both train AND
     # test rows are allowed to look back into.
-    train_pos_hist = df_labeled.loc[train_mask & (df_labeled["Scheduled"] == 1)].copy()
-    df_feat = add_history_features_no_leak(df_labeled, train_pos_hist, term_col="SemesterIndex")
-
-    cat_cols = ["CourseCode", "Instructor", "Slot", "Type"]
-    num_cols = [
-        "instr_prior_count_log1p",
-        "course_prior_count_log1p",
-        "slot_prior_count_log1p",
-        "course_type_prior_count_log1p",
-        "instr_dept_prior_count_log1p",
-        "instr_course_prior_count_log1p",
-        "course_slot_prior_count_log1p",
-        "course_type_slot_prior_count_log1p",
-        "combo_prior_count_log1p",
-        "instr_terms_since",
-        "course_terms_since",
-        "instr_course_terms_since",
-        "combo_terms_since",
-    ]
+    df_feat = holdout_features(df_labeled, train_mask)
+
+    cat_cols, num_cols = list(CAT_COLS), list(NUM_COLS)
 
     X = df_feat[cat_cols + num_cols]
     y = df_feat["Scheduled"].astype(int)
@@ -497,19 +702,7 @@ def train_linear_svm(df_engineer: pd.DataFrame) -> None:
     print(f"X_train: {X_train.shape}  X_test: {X_test.shape}")
 
     # ---- Pipeline ----
-    # StandardScaler(with_mean=False): sparse-safe scaler for count features.
-    # LinearSVC is margin-based and sensitive to feature scale, so scaling
-    # the numerical columns is important.
-    preprocess = ColumnTransformer(
-        transformers=[
-            ("cat", OneHotEncoder(handle_unknown="ignore"), cat_cols),
-            ("num", StandardScaler(with_mean=False), num_cols),
-        ],
-        remainder="drop",
-    )
-    svm = LinearSVC(class_weight="balanced", max_iter=2000, C=1.0)
-    clf = CalibratedClassifierCV(estimator=svm, method="sigmoid", cv=3)
-    pipe = Pipeline(steps=[("prep", preprocess), ("clf", clf)])
+    pipe = make_svm_pipeline(cat_cols, num_cols)
 
     print("Fitting pipeline...")
     pipe.fit(X_train, y_train)
@@ -522,6 +715,17 @@ def train_linear_svm(df_engineer: pd.DataFrame) -> None:
     print("PR  AUC :", round(average_precision_score(y_test, proba), 4))
     print(classification_report(y_test, preds, digits=3))
 
+    # ---- Per-department models (hold-out) ----
+    if per_dept:
+        dept_all = df_feat["Dept"]
+        dept_models = train_dept_models(
+            X_train, y_train, dept_all.loc[train_mask], cat_cols, num_cols, workers, min_dept_rows
+        )
+        routed = routed_predict_proba(X_test, dept_all.loc[test_mask], compile_svm_pipeline(pipe), dept_models)
+        print(f"Per-Dept models: {len(dept_models)} ({', '.join(dept_models) or 'none'})")
+        print("Routed ROC AUC :", round(roc_auc_score(y_test, routed), 4))
+        print("Routed PR  AUC :", round(average_precision_score(y_test, routed), 4))
+
     # =======================================================================
     # PRODUCTION RETRAINING
     # =======================================================================
@@ -542,30 +746,69 @@ def train_linear_svm(df_engineer: pd.DataFrame) -> None:
     # 3. Retrain on the full dataset
     pipe.fit(X_all, y_all)
 
+    # 4. Compile the production ensemble into the NumPy serving model and
+    # record how far it is from the sklearn pipeline (float noise only).
+    serving_model = compile_svm_pipeline(pipe)
+    serving_dev = max_probability_deviation(pipe, serving_model, X_all)
+    print("Serving model max |p - p_pipeline| on X_all:", serving_dev)
+
     # ---- Build and export LOOKUP tables for inference ----
     # These are baked into the artifact so ml_router.py can hydrate the
     # 13 num_cols at request time without re-running feature engineering.
     max_train_term = int(max(all_terms))
     lookups = _build_lookup_tables(all_pos_hist, term_col="SemesterIndex")
 
+    artifact = {
+        "serving_model":  serving_model,
+        "serving_max_deviation": serving_dev,
+        "cat_cols":       cat_cols,
+        "num_cols":       num_cols,
+        "features":       cat_cols + num_cols,   # kept for backward compat
+        "lookups":        lookups,
+        "max_train_term": max_train_term,
+    }
+    if per_dept:
+        artifact["dept_models"] = train_dept_models(
+            X_all, y_all, df_feat_all["Dept"], cat_cols, num_cols, workers, min_dept_rows
+        )
+
+    # ---- Offline score table ----
+    # Every candidate generate_v2 can ask about next term has a fixed
+    # probability until the next retrain, so score them all now;
+    # ml/inference.score_candidates serves these and only runs the model on
+    # misses.
+    universe = build_score_universe(df_engineer)
+    artifact["score_table"] = build_score_table(universe, artifact)
+    print(f"Score table: {len(artifact['score_table'])} candidates "
+          f"across {universe['CourseCode'].nunique()} courses")
+
+    # v2 first: integer-coded lookups + model weights as .npy blobs that
+    # ml/inference.py memory-maps (shared across uvicorn workers).  It is the
+    # artifact a serving process picks (and watches), so it changes before
+    # the v1 fallback does.
+    v2_path = write_svm_artifact_v2(artifact, OUT_DIR / "train2_anthony_svm_v2")
+    print("Saved v2 (memory-mapped) artifact to:", v2_path)
+
+    # Dump next to the target and rename, so a process serving v1 never
+    # reads a half-written pickle.
     artifact_path = OUT_DIR / "train2_anthony_svm.joblib"
-    joblib.dump(
-        {
-            "model":          pipe,
-            "cat_cols":       cat_cols,
-            "num_cols":       num_cols,
-            "features":       cat_cols + num_cols,   # kept for backward compat
-            "lookups":        lookups,
-            "max_train_term": max_train_term,
-        },
-        artifact_path,
-    )
+    tmp_path = artifact_path.with_name(artifact_path.name + ".tmp")
+    joblib.dump(artifact, tmp_path)
+    os.replace(tmp_path, artifact_path)
     print("Saved production artifact to:", artifact_path)
 
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the schedule SVM and write its artifacts.")
+    parser.add_argument("--per-dept", action="store_true", help="also train one model per department")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes for the per-department fits (default: all cores)")
+    parser.add_argument("--min-dept-rows", type=int, default=DEFAULT_MIN_DEPT_ROWS,
+                        help="departments with fewer labeled rows use the global model")
+    args = parser.parse_args(argv)
+
     df = load_and_prepare()
-    train_linear_svm(df)
+    train_linear_svm(df, per_dept=args.per_dept, workers=args.workers, min_dept_rows=args.min_dept_rows)
 
 
 if __name__ == "__main__":
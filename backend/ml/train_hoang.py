@@ -1,6 +1,10 @@
 from __future__ import annotations
 from pathlib import Path
+import argparse
+import io
+import time
 import joblib
+import numpy as np
 import pandas as pd
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
@@ -8,8 +12,11 @@ from sklearn.preprocessing import OneHotEncoder
 from sklearn.ensemble import RandomForestClassifier
 from .features import (
     SemesterIndexConfig, SEM_ORDER,
-    parse_time_range, get_building, make_slot, has_ge
+    parse_time_range_batch, get_building_batch, make_slot_batch, has_ge_batch,
+    section_to_course_code_batch,
 )
+from .freq_topk import FrequencyTopK
+from .inference import topk_from_proba
 # python -m backend.ml.train
 
 
@@ -37,6 +44,40 @@ def make_pipeline(cat_cols: list[str], num_cols: list[str]) -> Pipeline:
     return Pipeline([("pre", pre), ("rf", model)])
 
 
+def make_freq_predictor(cat_cols: list[str]) -> FrequencyTopK:
+    # Numerical columns are not used: the frequency tables condition on the
+    # categorical context only (Year/SemesterIndex enter as term decay).
+    return FrequencyTopK(cat_cols, k=10, alpha=1.0, decay=0.8)
+
+
+def compare_predictors(name: str, rf: Pipeline | None, freq: FrequencyTopK, X_test: pd.DataFrame, y_test, k: int = 3) -> dict:
+    """Hold-out top-1 / top-k accuracy, pickled size and single-row latency of both predictors."""
+    y_test = np.asarray(y_test, dtype=str)
+    one = X_test.iloc[:1]
+    report = {}
+    candidates = {"freq": (freq, lambda X: freq.predict_topk_arrays(X, k)[0])}
+    if rf is not None:
+        candidates["rf"] = (rf, lambda X: topk_from_proba(rf.predict_proba(X), rf.classes_, k)[0])
+    for label, (model, topk) in candidates.items():
+        top = topk(X_test)
+        buf = io.BytesIO()
+        joblib.dump(model, buf)
+        topk(one)
+        start = time.perf_counter()
+        for _ in range(20):
+            topk(one)
+        report[label] = {
+            "top1": float(np.mean(top[:, 0] == y_test)),
+            f"top{k}": float(np.mean((top == y_test[:, None]).any(axis=1))),
+            "artifact_kib": buf.getbuffer().nbytes / 1024,
+            "predict_ms": (time.perf_counter() - start) / 20 * 1000,
+        }
+    for label, r in report.items():
+        print(f"{name:<22} {label:<4}  top1 {r['top1']:.3f}  top{k} {r[f'top{k}']:.3f}  "
+              f"size {r['artifact_kib']:>10.1f} KiB  1-row {r['predict_ms']:7.2f} ms")
+    return report
+
+
 def load_raw() -> pd.DataFrame:
     csvs = sorted(DATA_DIR.glob("*.csv"))
     if not csvs:
@@ -52,21 +93,21 @@ def engineer(df: pd.DataFrame) -> tuple[pd.DataFrame, SemesterIndexConfig]:
     sem_cfg = SemesterIndexConfig(base=int(base_val))
 
     # CourseCode
-    dept_course = df["Section"].astype(str).str.strip().str.extract(r"^(\w+)\s+([^\s]+)")
-    df["Dept"] = dept_course[0].fillna("Unknown")
-    df["CourseNumber"] = dept_course[1].fillna("Unknown")
-    df["CourseCode"] = df["Dept"].astype(str) + " " + df["CourseNumber"].astype(str)
+    dept, course_code = section_to_course_code_batch(df["Section"])
+    df["Dept"] = dept
+    df["CourseNumber"] = [code[len(d) + 1:] for d, code in zip(dept, course_code)]
+    df["CourseCode"] = course_code
 
     # time features
-    t = df["Times"].apply(lambda s: pd.Series(parse_time_range(str(s))))
-    df["StartMinutes"] = t[0]
-    df["EndMinutes"] = t[1]
-    df["DurationMinutes"] = t[2]
+    t = parse_time_range_batch(df["Times"])
+    df["StartMinutes"] = t[:, 0]
+    df["EndMinutes"] = t[:, 1]
+    df["DurationMinutes"] = t[:, 2]
 
     # Slot, Building, HasGE
-    df["Slot"] = [make_slot(d, sm) for d, sm in zip(df["Days"], df["StartMinutes"])]
-    df["Building"] = df["Location"].apply(get_building)
-    df["HasGE"] = df["Satisfies"].apply(has_ge)
+    df["Slot"] = make_slot_batch(df["Days"], df["StartMinutes"])
+    df["Building"] = get_building_batch(df["Location"])
+    df["HasGE"] = has_ge_batch(df["Satisfies"])
 
     # SemesterIndex formula
     df["SemesterIndex"] = (df["Year"].astype(int) * 2 + df["Semester"].map(SEM_ORDER).fillna(0).astype(int)) - sem_cfg.base
@@ -74,7 +115,20 @@ def engineer(df: pd.DataFrame) -> tuple[pd.DataFrame, SemesterIndexConfig]:
     return df, sem_cfg
 
 
-def main():
+SCENARIOS = [
+    # (name, label column, cat cols, num cols, RF artifact)
+    ("A instructor", "Instructor", CAT_AB, NUM_AB, "scenario_A_instructor"),
+    ("B slot",       "Slot",       CAT_AB, NUM_AB, "scenario_B_slot"),
+    ("C course",     "CourseCode", CAT_C,  NUM_C,  "scenario_C_course"),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the scenario A/B/C top-k predictors.")
+    parser.add_argument("--predictor", choices=("rf", "freq", "both"), default="both",
+                        help="random forests, frequency tables (<artifact>_freq.joblib), or both with a comparison")
+    args = parser.parse_args(argv)
+
     df = load_raw()
     df, sem_cfg = engineer(df)
 
@@ -83,22 +137,26 @@ def main():
     test_terms = all_terms[-2:]
     train_mask = ~df["SemesterIndex"].isin(test_terms)
 
-    # Train targets as STRINGS => API returns human-readable labels directly
-    pipe_A = make_pipeline(CAT_AB, NUM_AB)
-    pipe_A.fit(df.loc[train_mask, CAT_AB + NUM_AB], df.loc[train_mask, "Instructor"].astype(str))
-
-    pipe_B = make_pipeline(CAT_AB, NUM_AB)
-    pipe_B.fit(df.loc[train_mask, CAT_AB + NUM_AB], df.loc[train_mask, "Slot"].astype(str))
-
-    pipe_C = make_pipeline(CAT_C, NUM_C)
-    pipe_C.fit(df.loc[train_mask, CAT_C + NUM_C], df.loc[train_mask, "CourseCode"].astype(str))
-
-    joblib.dump({"pipeline": pipe_A, "sem_cfg": sem_cfg, "cat": CAT_AB, "num": NUM_AB},
-                OUT_DIR / "scenario_A_instructor.joblib")
-    joblib.dump({"pipeline": pipe_B, "sem_cfg": sem_cfg, "cat": CAT_AB, "num": NUM_AB},
-                OUT_DIR / "scenario_B_slot.joblib")
-    joblib.dump({"pipeline": pipe_C, "sem_cfg": sem_cfg, "cat": CAT_C, "num": NUM_C},
-                OUT_DIR / "scenario_C_course.joblib")
+    for name, target, cat, num, artifact in SCENARIOS:
+        train = df.loc[train_mask]
+        # Train targets as STRINGS => API returns human-readable labels directly
+        y_train = train[target].astype(str)
+        rf = freq = None
+        if args.predictor in ("rf", "both"):
+            rf = make_pipeline(cat, num)
+            rf.fit(train[cat + num], y_train)
+            joblib.dump({"pipeline": rf, "sem_cfg": sem_cfg, "cat": cat, "num": num},
+                        OUT_DIR / f"{artifact}.joblib")
+        if args.predictor in ("freq", "both"):
+            freq = make_freq_predictor(cat)
+            freq.fit(train[cat], y_train, terms=train["SemesterIndex"])
+            if rf is not None:
+                test = df.loc[~train_mask]
+                compare_predictors(name, rf, freq, test[cat + num], test[target].astype(str))
+            # Served as fitted: on the same train terms as the RF artifact, so
+            # SCENARIO_PREDICTOR=freq swaps the model, not the training data.
+            joblib.dump({"predictor": freq, "sem_cfg": sem_cfg, "cat": cat, "num": []},
+                        OUT_DIR / f"{artifact}_freq.joblib")
 
     print("Saved ML artifacts to:", OUT_DIR)
 
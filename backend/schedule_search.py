@@ -0,0 +1,528 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable
+import heapq
+import itertools
+import math
+import re
+import numpy as np
+
+
+# ---------------------------------------------------------------------------
+# Weekly occupancy bitmasks for generate_v2's conflict checks
+# ---------------------------------------------------------------------------
+#
+# schedules.is_time_conflict parses both slot labels (regex + two strptime)
+# on every call, and the schedule search calls it for every (partial,
+# candidate, assigned section) triple.  Here every distinct slot_label of a
+# request is parsed once and compiled into an int bitmask: one lane per day
+# letter, and inside a lane one bit per elementary time segment between the
+# request's distinct start/end times.  Two sections overlap on some day iff
+# their masks share a bit, so "does this candidate fit the partial" is one
+# AND against the OR of the partial's masks.
+#
+# The answers are exactly is_time_conflict's, including its quirks: TBA/TBD
+# or unparseable times (and a 12:00AM start, which it reads as a parse
+# failure) never conflict, and days compare letter by letter.
+
+NO_SLOT = "TBD TBD"
+_TIMES_RE = re.compile(r"(\d{1,2}:\d{2}[A-Za-z]+)-(\d{1,2}:\d{2}[A-Za-z]+)")
+
+
+def split_slot_prediction(slot_str: str):
+    """
+    Safely splits a model prediction like 'MW 09:00AM-10:15AM' into days and times.
+    """
+    parts = str(slot_str).strip().split(" ", 1)
+    if len(parts) == 2:
+        return parts[0], parts[1]
+    return "TBD", "TBD"
+
+
+def parse_times(t_str: str) -> tuple[int, int]:
+    """'09:00AM-10:15AM' -> (540, 615) minutes since midnight; (0, 0) if unparseable."""
+    match = _TIMES_RE.search(t_str.replace(" ", ""))
+    if not match:
+        return 0, 0
+
+    start_str, end_str = match.groups()
+    try:
+        start_dt = datetime.strptime(start_str, "%I:%M%p")
+        end_dt = datetime.strptime(end_str, "%I:%M%p")
+        return (start_dt.hour * 60 + start_dt.minute), (end_dt.hour * 60 + end_dt.minute)
+    except ValueError:
+        return 0, 0
+
+
+def _meeting(slot_label: str) -> tuple[frozenset, int, int] | None:
+    """(day letters, start, end) of a slot label, or None when it can never conflict."""
+    days, times = split_slot_prediction(slot_label)
+    if not days or days in ("TBD", "TBA") or not times or times in ("TBD", "TBA"):
+        return None
+    start, end = parse_times(times)
+    if start == 0:
+        return None
+    return frozenset(days.upper()), start, end
+
+
+@dataclass(frozen=True)
+class SlotOccupancy:
+    """A compiled slot label.
+
+    mask has one bit per (day, time segment) the section occupies; 0 for
+    sections that never conflict.  An end time not after the start time
+    cannot be expressed as segments, so such a section is `irregular` and
+    checked against the others' (days, start, end) directly; two irregular
+    sections never overlap.
+    """
+
+    mask: int
+    days: frozenset = frozenset()
+    start: int = 0
+    end: int = 0
+    irregular: bool = False
+
+
+FREE = SlotOccupancy(mask=0)
+
+
+def overlaps(a: SlotOccupancy, b: SlotOccupancy) -> bool:
+    """Pairwise check on the parsed fields (the same test as is_time_conflict)."""
+    if not a.days or not b.days or not (a.days & b.days):
+        return False
+    return a.start < b.end and b.start < a.end
+
+
+def compile_slot_masks(slot_labels: Iterable[str]) -> dict[str, SlotOccupancy]:
+    """Parse each distinct label once and give it a mask over this set of labels.
+
+    Segment boundaries are the distinct start/end minutes of the regular
+    meetings, so masks stay a few dozen bits per day however many
+    candidates share those times.  Masks are only comparable with masks from
+    the same call.
+    """
+    meetings = {}
+    for label in slot_labels:
+        if label not in meetings:
+            meetings[label] = _meeting(label)
+
+    regular = [m for m in meetings.values() if m is not None and m[1] < m[2]]
+    boundaries = sorted({t for _, start, end in regular for t in (start, end)})
+    segment = {t: i for i, t in enumerate(boundaries)}
+    lane_width = max(len(boundaries) - 1, 1)
+    lanes = {day: i for i, day in enumerate(sorted({d for days, _, _ in regular for d in days}))}
+
+    compiled = {}
+    for label, meeting in meetings.items():
+        if meeting is None:
+            compiled[label] = FREE
+            continue
+        days, start, end = meeting
+        if start >= end:
+            compiled[label] = SlotOccupancy(mask=0, days=days, start=start, end=end, irregular=True)
+            continue
+        first, last = segment[start], segment[end]
+        run = ((1 << (last - first)) - 1) << first
+        mask = 0
+        for day in days:
+            mask |= run << (lanes[day] * lane_width)
+        compiled[label] = SlotOccupancy(mask=mask, days=days, start=start, end=end)
+    return compiled
+
+
+# ---------------------------------------------------------------------------
+# Partial schedules
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Partial:
+    """A conflict-free partial schedule and the OR of its sections' masks."""
+
+    sections: tuple = ()
+    mask: int = 0
+    occupancies: tuple = ()     # one SlotOccupancy per section
+    irregular: tuple = ()       # the irregular ones, usually empty
+
+    def fits(self, occ: SlotOccupancy) -> bool:
+        if occ.mask & self.mask:
+            return False
+        if occ.irregular:
+            return not any(overlaps(occ, other) for other in self.occupancies if other.mask)
+        if self.irregular and occ.mask:
+            return not any(overlaps(occ, other) for other in self.irregular)
+        return True
+
+    def extend(self, section: dict, occ: SlotOccupancy) -> "Partial":
+        return Partial(
+            sections=self.sections + (section,),
+            mask=self.mask | occ.mask,
+            occupancies=self.occupancies + (occ,),
+            irregular=self.irregular + (occ,) if occ.irregular else self.irregular,
+        )
+
+
+def slot_label(candidate: dict) -> str:
+    return candidate.get("slot_label", NO_SLOT)
+
+
+def enumerate_schedules(per_course: list[list[dict]]) -> list[list[dict]]:
+    """Every conflict-free combination of one candidate per course (incremental pruning).
+
+    Start with one empty partial schedule.  For each course we try to
+    extend every existing partial with every candidate for that course,
+    keeping only combinations that have no time conflict.  Courses without
+    candidates are skipped; if every candidate of a course conflicts with
+    every partial, the partials are kept so the remaining courses can still
+    be scheduled.
+    """
+    occupancy = compile_slot_masks(slot_label(c) for cands in per_course for c in cands)
+    partials = [Partial()]
+    for course_candidates in per_course:
+        if not course_candidates:
+            continue
+        compiled = [(cand, occupancy[slot_label(cand)]) for cand in course_candidates]
+        next_partials = [
+            partial.extend(cand, occ)
+            for partial in partials
+            for cand, occ in compiled
+            if partial.fits(occ)
+        ]
+        partials = next_partials if next_partials else partials
+    return [list(p.sections) for p in partials]
+
+
+# ---------------------------------------------------------------------------
+# Conflict-graph clique enumeration
+# ---------------------------------------------------------------------------
+#
+# enumerate_schedules() still tests every (partial, candidate) pair, and most
+# of those tests repeat: the same two sections meet in thousands of
+# partials.  CompatibilityGraph answers every pair once, up front, with
+# NumPy interval arithmetic over the request's distinct slot labels, and
+# stores each candidate's compatible candidates as an int bitset (bit j =
+# j-th candidate of the flattened request).  A schedule is then a clique
+# with one candidate per course: a partial carries the AND of its members'
+# bitsets, and its extensions are exactly the set bits of that AND within
+# the next course's bit range, so no test ever fails inside the loop.
+
+def _bits(mask: int):
+    """Indices of the set bits of mask, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class CompatibilityGraph:
+    """Pairwise compatibility of every candidate of a request, as bitsets.
+
+    candidates: the non-empty courses' candidates, flattened in course
+    order.  course_bits[c]: the bits of course c's candidates.
+    compatible[i]: the candidates of other courses that do not conflict
+    with candidate i (is_time_conflict's semantics: TBA/TBD and
+    unparseable slots conflict with nothing).
+    """
+
+    def __init__(self, per_course: list[list[dict]]):
+        courses = [cands for cands in per_course if cands]
+        self.candidates = [cand for cands in courses for cand in cands]
+        self.course_bits = []
+        offset = 0
+        for cands in courses:
+            self.course_bits.append(((1 << len(cands)) - 1) << offset)
+            offset += len(cands)
+
+        labels = [slot_label(c) for c in self.candidates]
+        distinct = list(dict.fromkeys(labels))
+        meetings = [_meeting(label) for label in distinct]
+        letters = {day: i for i, day in enumerate(sorted({d for m in meetings if m for d in m[0]}))}
+        days = np.zeros((len(distinct), max(len(letters), 1)), dtype=bool)
+        for row, meeting in enumerate(meetings):
+            for day in meeting[0] if meeting else ():
+                days[row, letters[day]] = True
+        start = np.array([m[1] if m else 0 for m in meetings], dtype=np.int64)
+        end = np.array([m[2] if m else 0 for m in meetings], dtype=np.int64)
+
+        # Label x label conflicts: a shared day and overlapping [start, end).
+        conflict = (
+            (days.astype(np.int64) @ days.T.astype(np.int64) > 0)
+            & (start[:, None] < end[None, :])
+            & (start[None, :] < end[:, None])
+        )
+        where = {label: i for i, label in enumerate(distinct)}
+        index = np.fromiter((where[label] for label in labels), dtype=np.int64, count=len(labels))
+        course = np.repeat(np.arange(len(courses)), [len(cands) for cands in courses])
+        compatible = ~conflict[np.ix_(index, index)] & (course[:, None] != course[None, :])
+        packed = np.packbits(compatible, axis=1, bitorder="little")
+        self.compatible = [int.from_bytes(row.tobytes(), "little") for row in packed]
+
+    def _extendable(self, allowed: int, levels: list[int], failed: set) -> bool:
+        """Whether some clique takes one of `allowed` from each of levels.
+
+        failed memoises dead ends by the part of `allowed` that still
+        matters, so instructor variants of a slot are explored once.
+        """
+        if not levels:
+            return True
+        rest = 0
+        for bits in levels:
+            rest |= bits
+        key = (len(levels), allowed & rest)
+        if key in failed:
+            return False
+        for i in _bits(allowed & levels[0]):
+            if self._extendable(allowed & self.compatible[i], levels[1:], failed):
+                return True
+        failed.add(key)
+        return False
+
+    def placed_courses(self) -> list[int]:
+        """course_bits of the courses enumerate_schedules() places.
+
+        A course is skipped when none of its candidates fits any clique of
+        the courses placed before it (the keep-partials rule).
+        """
+        placed: list[int] = []
+        everyone = (1 << len(self.candidates)) - 1
+        for bits in self.course_bits:
+            if self._extendable(everyone, placed + [bits], set()):
+                placed.append(bits)
+        return placed
+
+    def cliques(self):
+        """Yield every schedule as a list of candidates, in enumerate_schedules() order."""
+        levels = self.placed_courses()
+        depth = len(levels)
+        chosen: list[dict] = []
+
+        def walk(level: int, allowed: int):
+            if level == depth:
+                yield list(chosen)
+                return
+            for i in _bits(allowed & levels[level]):
+                chosen.append(self.candidates[i])
+                yield from walk(level + 1, allowed & self.compatible[i])
+                chosen.pop()
+
+        yield from walk(0, (1 << len(self.candidates)) - 1)
+
+
+def clique_schedules(per_course: list[list[dict]]) -> list[list[dict]]:
+    """Same schedules, in the same order, as enumerate_schedules(), from the compatibility graph."""
+    return list(CompatibilityGraph(per_course).cliques())
+
+
+# ---------------------------------------------------------------------------
+# Best-first top-K search
+# ---------------------------------------------------------------------------
+#
+# generate_v2 ranks schedules by schedule_score = sum(log(prob_scheduled)).
+# Rather than enumerating every combination and sorting, top_schedules()
+# expands partials best bound first: a partial's bound is its score so far
+# plus the best log-probability of every course still to place, which no
+# completion can beat.  A complete schedule popped from the heap therefore
+# outranks everything not yet emitted, and the search stops after K.
+#
+# Ties are broken as the old stable sort did (enumeration order, i.e. the
+# candidates' per-course positions), and bounds are compared after the
+# same 4-decimal rounding, so the first K results are exactly the first K
+# of enumerate_schedules() sorted by rounded score.  The search itself runs
+# over slots rather than candidates (see below).
+
+_BOUND_SLACK = 1e-9     # float sums in a different order may differ by an ulp
+
+
+def log_prob(candidate: dict) -> float:
+    return math.log(max(candidate["prob_scheduled"], 1e-9))
+
+
+def schedule_score(sections) -> float:
+    """Log-joint probability of a schedule under independence (higher = more likely)."""
+    return sum(log_prob(s) for s in sections)
+
+
+def _feasible(options: list[list[SlotOccupancy]], partial: Partial = Partial(), level: int = 0) -> bool:
+    if level == len(options):
+        return True
+    return any(_feasible(options, partial.extend(None, occ), level + 1) for occ in options[level] if partial.fits(occ))
+
+
+def schedulable_courses(per_course: list[list[dict]], occupancy: dict[str, SlotOccupancy]) -> list[int]:
+    """Indices of the courses enumerate_schedules() places.
+
+    A course is skipped when it has no candidates, or when none of them fits
+    any conflict-free combination of the courses placed before it.  The
+    check is a depth-first search for one combination, over each course's
+    distinct occupancies (instructor variants of a slot are the same here).
+    """
+    placed: list[int] = []
+    options: list[list[SlotOccupancy]] = []
+    for i, cands in enumerate(per_course):
+        if not cands:
+            continue
+        distinct = list(dict.fromkeys(occupancy[slot_label(c)] for c in cands))
+        if _feasible(options + [distinct]):
+            placed.append(i)
+            options.append(distinct)
+    return placed
+
+
+# ---------------------------------------------------------------------------
+# Slot-level search, instructors expanded last
+# ---------------------------------------------------------------------------
+#
+# Candidates of a course that share a slot_label differ only in instructor:
+# same conflicts, different probabilities.  The search runs over one
+# SlotGroup per distinct label, scored by its best instructor, so a course
+# with three instructors per slot adds a third as many partials.  Instructor
+# variants are produced only when a complete slot-level schedule reaches the
+# top of the heap (or never, for slot-level results).
+
+@dataclass(frozen=True)
+class SlotGroup:
+    """The candidates of one course that share a slot_label, best first.
+
+    Members are ordered by (-log_prob, position).  positions are the
+    candidates' indices in the course's list; min_position[r] is the
+    smallest position among members r.., a bound used to order ties.
+    """
+
+    label: str
+    occupancy: SlotOccupancy
+    positions: tuple
+    candidates: tuple
+    log_probs: tuple
+    min_position: tuple
+
+    @property
+    def best(self) -> float:
+        return self.log_probs[0]
+
+    @property
+    def best_candidate(self) -> dict:
+        return self.candidates[0]
+
+
+def slot_groups(candidates: list[dict], occupancy: dict[str, SlotOccupancy]) -> list[SlotGroup]:
+    """Group a course's candidates by slot_label, in order of first appearance."""
+    members: dict[str, list[tuple[float, int]]] = {}
+    for position, cand in enumerate(candidates):
+        members.setdefault(slot_label(cand), []).append((-log_prob(cand), position))
+    groups = []
+    for label, ranked in members.items():
+        ranked.sort()
+        positions = tuple(position for _, position in ranked)
+        groups.append(SlotGroup(
+            label=label,
+            occupancy=occupancy[label],
+            positions=positions,
+            candidates=tuple(candidates[i] for i in positions),
+            log_probs=tuple(-neg for neg, _ in ranked),
+            min_position=tuple(min(positions[r:]) for r in range(len(positions))),
+        ))
+    return groups
+
+
+# Heap entry kinds
+_SLOTS = 0          # a slot-level partial (or complete) schedule
+_VARIANTS = 1       # instructor variants of a complete one not yet enumerated
+_SCHEDULE = 2       # one instructor variant, ready to emit
+
+
+def _variant_entry(groups: tuple, ranks: tuple, free_from: int, seq) -> tuple:
+    """Heap entry for the variant `ranks` (member index per group) and its successors.
+
+    Successors raise one rank at or after free_from, so each variant is
+    reached once; none scores higher, and none has a smaller position
+    tuple than the one built from min_position, so that is the entry's key.
+    """
+    score = 0
+    for g, r in zip(groups, ranks):
+        score += g.log_probs[r]
+    bound = [g.positions[r] for g, r in zip(groups[:free_from], ranks[:free_from])]
+    bound += [g.min_position[r] for g, r in zip(groups[free_from:], ranks[free_from:])]
+    return (-round(score, 4), tuple(bound), next(seq), _VARIANTS, (groups, ranks, free_from, score))
+
+
+def _search(per_course: list[list[dict]], top_k: int | None, expand: bool):
+    occupancy = compile_slot_masks(slot_label(c) for cands in per_course for c in cands)
+    courses = [slot_groups(per_course[i], occupancy) for i in schedulable_courses(per_course, occupancy)]
+    depth = len(courses)
+    remaining = [0.0] * (depth + 1)
+    for level in range(depth - 1, -1, -1):
+        remaining[level] = remaining[level + 1] + max(g.best for g in courses[level])
+
+    # Entries: (-rounded bound, position bound, seq, kind, payload).  Every
+    # entry's key is <= that of each schedule it leads to (score can only
+    # drop, positions only grow), so schedules pop in final order; seq keeps
+    # payloads out of comparisons.  A slot-level entry's positions are its
+    # groups' smallest.
+    seq = itertools.count()
+    heap = [(-round(remaining[0] + _BOUND_SLACK, 4), (), next(seq), _SLOTS, ((), 0.0, Partial()))]
+    emitted = 0
+    while heap and (top_k is None or emitted < top_k):
+        _, path, _, kind, payload = heapq.heappop(heap)
+        if kind == _SCHEDULE:
+            yield payload
+            emitted += 1
+            continue
+        if kind == _VARIANTS:
+            groups, ranks, free_from, score = payload
+            sections = [g.candidates[r] for g, r in zip(groups, ranks)]
+            positions = tuple(g.positions[r] for g, r in zip(groups, ranks))
+            heapq.heappush(heap, (-round(score, 4), positions, next(seq), _SCHEDULE, (sections, score)))
+            for i in range(free_from, len(groups)):
+                if ranks[i] + 1 < len(groups[i].positions):
+                    raised = ranks[:i] + (ranks[i] + 1,) + ranks[i + 1:]
+                    heapq.heappush(heap, _variant_entry(groups, raised, i, seq))
+            continue
+
+        chosen, score, partial = payload
+        level = len(chosen)
+        if level == depth:                      # a complete slot-level schedule
+            if expand:
+                heapq.heappush(heap, _variant_entry(chosen, (0,) * depth, 0, seq))
+            else:
+                yield chosen, score
+                emitted += 1
+            continue
+        final = level + 1 == depth
+        for group in courses[level]:
+            if not partial.fits(group.occupancy):
+                continue
+            child_score = score + group.best
+            key = round(child_score, 4) if final else round(child_score + remaining[level + 1] + _BOUND_SLACK, 4)
+            heapq.heappush(heap, (
+                -key, path + (group.min_position[0],), next(seq), _SLOTS,
+                (chosen + (group,), child_score, partial.extend(group.label, group.occupancy)),
+            ))
+
+
+def top_schedules(per_course: list[list[dict]], top_k: int | None = None):
+    """Yield (sections, schedule_score) best first, at most top_k of them.
+
+    Same schedules, scores and order as enumerate_schedules() followed by a
+    stable sort on round(schedule_score, 4), but the work done is bounded by
+    the slot-level partials whose bound can still reach the K-th result.
+    """
+    return _search(per_course, top_k, expand=True)
+
+
+def top_slot_schedules(per_course: list[list[dict]], top_k: int | None = None):
+    """Yield (slot groups, score) best first: one entry per slot combination.
+
+    score is that of the combination's best instructors.  Ties are broken
+    by the groups' first candidate positions.
+    """
+    return _search(per_course, top_k, expand=False)
+
+
+def slot_section(group: SlotGroup) -> dict:
+    """A slot-level schedule section: the best candidate plus the other instructors for that slot."""
+    section = dict(group.best_candidate)
+    section["instructor_alternatives"] = [
+        {"instructor_name": c.get("instructor_name"), "prob_scheduled": c.get("prob_scheduled")}
+        for c in group.candidates[1:]
+    ]
+    return section
@@ -1,13 +1,20 @@
 from fastapi import APIRouter, HTTPException, Request
-from ml.inference import load_svm_artifact, score_candidates
+from fastapi.responses import StreamingResponse
+from ml.batching import get_batcher
+from ml.inference import score_candidates_async
+from ml.registry import UnknownTenantError, load_svm_artifact
 from ml.ml_router import (CourseContext, InstructorContext,)
-from stats import generate_professor_slot_candidates, top_instructors_last4_semesters
-from datetime import datetime
+from stats import generate_professor_slot_candidates, schedule_flat_data_version, top_instructors_last4_semesters
+from candidate_cache import COURSE_CACHE
+# split_slot_prediction moved to schedule_search; re-exported for existing imports.
+from schedule_search import (  # noqa: F401
+    CompatibilityGraph, enumerate_schedules, parse_times, schedule_score, slot_section, split_slot_prediction,
+    top_schedules, top_slot_schedules,
+)
 from db_module import get_db_connection
 from jwt_verify import get_current_user_id_cookie
+import asyncio
 import os
-import re
-import math
 import dotenv
 import hashlib
 import json
@@ -28,20 +35,194 @@ async def generate_schedule_v2(request: Request, payload: dict):
         "semester": "Fall",
         "name": "My Schedule",
         "description": "",
-        "term_id": 1
+        "term_id": 1,
+        "tenant": "default",        (optional: campus / catalog artifact)
+        "top_k": 20,                (optional: return only the 20 best schedules)
+        "expand_instructors": true  (optional: false = one schedule per slot combination)
       }
 
     Pipeline per course:
+      0. COURSE_CACHE lookup                → skips steps 1-3 on a hit
       1. generate_professor_slot_candidates  → (instructor x slot) pairs from DB
-      2. score_candidates                   → batch SVM scoring
+      2. score_candidates_async             → one SVM batch for all missed courses
       3. filter at prob_scheduled >= 0.7    → fallback to top-3 if nothing passes
 
     Incremental-pruning product loop builds all conflict-free schedule combinations.
     Each schedule is annotated with schedule_score = sum(log(prob_scheduled)),
     a log-joint-probability proxy for how historically likely the combination is.
     All valid schedules are returned sorted best-first; the user picks from them.
+    With top_k, a best-first branch-and-bound search returns just the first
+    top_k of that list, without enumerating the rest.
+    With expand_instructors=false, candidates of a course that share a slot
+    are one option: each schedule is a combination of slots, each section
+    that slot's best candidate with the other instructors listed in
+    instructor_alternatives, and schedule_score uses the best instructors.
     """
 
+    user_id, courses, top_k, expand_instructors, per_course, professor_frequencies = \
+        await _prepare_generation(request, payload)
+
+    # ---- Build conflict-free schedules, best first ----
+    # schedule_score = sum(log(prob_scheduled)): the log-joint-probability
+    # under independence (higher = more likely), stored so the frontend can
+    # display / sort by it later.  Slot labels are compiled once into weekly
+    # occupancy bitmasks, so each (partial, candidate) conflict test is one
+    # AND (schedule_search.py).
+    if not expand_instructors:
+        # One schedule per slot combination, best instructor first and the
+        # others listed per section; variants are never enumerated.
+        schedules_out = [
+            {"sections": [slot_section(g) for g in groups], "schedule_score": round(score, 4)}
+            for groups, score in top_slot_schedules(per_course, top_k)
+        ]
+    elif top_k is None:
+        # Every combination, as cliques of the pairwise compatibility graph
+        # (same order as enumerate_schedules), then a full sort.
+        schedules_out = [
+            {"sections": sections, "schedule_score": round(schedule_score(sections), 4)}
+            for sections in CompatibilityGraph(per_course).cliques()
+        ]
+        schedules_out.sort(key=lambda s: s["schedule_score"], reverse=True)
+    else:
+        # Branch-and-bound: only the K best are ever completed.
+        schedules_out = [
+            {"sections": sections, "schedule_score": round(score, 4)}
+            for sections, score in top_schedules(per_course, top_k)
+        ]
+
+    # ---- Persist to DB and return all options ----
+    # Skip DB save in DEV_BYPASS mode — no real user_id to associate the record with.
+    if os.getenv("DEV_BYPASS") == "1":
+        return {
+            "schedule_id":     None,
+            "total_schedules": len(schedules_out),
+            "schedules":       schedules_out,
+            "professor_frequencies": professor_frequencies,
+        }
+
+    try:
+        schedule_id = _save_schedules(user_id, payload, courses, json.dumps(schedules_out))
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Failed to save schedules: {exc}")
+    return {
+        "schedule_id":     schedule_id,
+        "total_schedules": len(schedules_out),
+        "schedules":       schedules_out,
+        "professor_frequencies": professor_frequencies,
+    }
+
+
+NDJSON = "application/x-ndjson"
+SSE = "text/event-stream"
+
+
+@router.post("/generate_v2/stream")
+async def generate_schedule_v2_stream(request: Request, payload: dict):
+    """generate_v2, streamed: schedules are sent as they are found, best first.
+
+    Same input JSON as /generate_v2, except that top_k is required.  The
+    response is NDJSON, or Server-Sent
+    Events when the request's Accept header asks for text/event-stream.
+    Every event is a JSON object with a "type":
+
+      {"type": "professor_frequencies", "professor_frequencies": {...}}
+      {"type": "schedule", "rank": 1, "sections": [...], "schedule_score": -0.21}
+      ...
+      {"type": "summary", "schedule_id": 501, "total_schedules": 40}
+
+    (in SSE, "type" is also the event name).  Schedules come from the
+    best-first search, so the first one is out within milliseconds and the
+    order is exactly /generate_v2's.  The row saved to MySQL is the same as
+    /generate_v2's; it is written once the last schedule has been sent, so
+    schedule_id is only known at the end (None in DEV_BYPASS).  Errors
+    after the response has started end the stream with an
+    {"type": "error", "error": ...} event.
+
+    top_k is required because the best-first order needs it: the search
+    frontier and the row being persisted both grow with the number of
+    schedules sent, so the stream's memory is bounded by top_k.  For every
+    schedule, use /generate_v2, which enumerates them faster.
+    """
+    user_id, courses, top_k, expand_instructors, per_course, professor_frequencies = \
+        await _prepare_generation(request, payload, require_top_k=True)
+
+    if expand_instructors:
+        found = (
+            {"sections": sections, "schedule_score": round(score, 4)}
+            for sections, score in top_schedules(per_course, top_k)
+        )
+    else:
+        found = (
+            {"sections": [slot_section(g) for g in groups], "schedule_score": round(score, 4)}
+            for groups, score in top_slot_schedules(per_course, top_k)
+        )
+
+    sse = SSE in request.headers.get("accept", "")
+    persist = os.getenv("DEV_BYPASS") != "1"
+
+    def events():
+        # A plain generator: StreamingResponse runs each step in its
+        # threadpool, so the search and the DB insert stay off the event loop.
+        yield _event(sse, "professor_frequencies", {"professor_frequencies": professor_frequencies})
+        encoded = []    # at most top_k, kept only to build the persisted row
+        total = 0
+        try:
+            for total, schedule in enumerate(found, start=1):
+                if persist:
+                    encoded.append(json.dumps(schedule))
+                yield _event(sse, "schedule", {"rank": total, **schedule})
+            schedule_id = None
+            if persist:
+                # Same text as json.dumps(schedules_out) in /generate_v2.
+                schedule_id = _save_schedules(user_id, payload, courses, "[" + ", ".join(encoded) + "]")
+        except Exception as exc:
+            yield _event(sse, "error", {"error": f"Failed to generate schedules: {exc}"})
+            return
+        yield _event(sse, "summary", {"schedule_id": schedule_id, "total_schedules": total})
+
+    return StreamingResponse(events(), media_type=SSE if sse else NDJSON)
+
+
+def _event(sse: bool, kind: str, body: dict) -> str:
+    """One stream event: an NDJSON line, or an SSE message named after its type."""
+    data = json.dumps({"type": kind, **body})
+    return f"event: {kind}\ndata: {data}\n\n" if sse else data + "\n"
+
+
+def _save_schedules(user_id, payload: dict, courses: list, sections_json: str) -> int:
+    """Insert one generated-schedules row (sections_json: the JSON list of schedules); returns its id."""
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "INSERT INTO schedules (user_id, name, description, term_id, sections, input_hash) VALUES (%s,%s,%s,%s,%s,%s)",
+            (
+                user_id,
+                payload.get("name", "Generated Schedule"),
+                payload.get("description", ""),
+                payload.get("term_id"),
+                sections_json,
+                hashlib.sha256(
+                    json.dumps({"courses": sorted(courses)}, sort_keys=True).encode()
+                ).hexdigest(),
+            ),
+        )
+        schedule_id = cursor.lastrowid
+        connection.commit()
+        return schedule_id
+    finally:
+        cursor.close()
+        connection.close()
+
+
+async def _prepare_generation(request: Request, payload: dict, require_top_k: bool = False):
+    """Auth, payload validation and per-course scored candidates for generate_v2.
+
+    Returns (user_id, courses, top_k, expand_instructors, per_course,
+    professor_frequencies); raises HTTPException on any error, so streaming
+    callers fail before their response starts.  require_top_k makes top_k
+    mandatory.
+    """
     # Auth check — bypass in local dev with DEV_BYPASS=1 in your .env
     if os.getenv("DEV_BYPASS") != "1":
         user_id = get_current_user_id_cookie(request)
@@ -53,29 +234,64 @@ async def generate_schedule_v2(request: Request, payload: dict):
     courses = payload.get("courses", [])
     if not courses:
         raise HTTPException(status_code=400, detail="courses list is required")
+    top_k = payload.get("top_k")
+    if top_k is not None and (isinstance(top_k, bool) or not isinstance(top_k, int) or top_k < 1):
+        raise HTTPException(status_code=400, detail="top_k must be a positive integer")
+    if top_k is None and require_top_k:
+        raise HTTPException(status_code=400, detail="top_k is required")
+    expand_instructors = payload.get("expand_instructors", True)
+    if not isinstance(expand_instructors, bool):
+        raise HTTPException(status_code=400, detail="expand_instructors must be a boolean")
 
     # ---- Load SVM artifact (cached after first call) ----
     try:
-        svm_art = load_svm_artifact()
+        svm_art = load_svm_artifact(payload.get("tenant"))
+    except UnknownTenantError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
     except FileNotFoundError as exc:
         raise HTTPException(status_code=503, detail=str(exc))
 
     # ---- Generate and score candidates per course ----
     PROB_THRESHOLD = 0.7
-    per_course: list[list[dict]] = []
+    batcher = get_batcher()
     professor_frequencies = {}
 
+    # Scored + filtered candidates for a course depend only on schedule_flat
+    # and the artifact, so they are cached per (course, artifact, data
+    # version).  Without a data version (probe failed) or an artifact
+    # version, the cache is bypassed.
+    try:
+        data_version = schedule_flat_data_version()
+    except Exception:
+        data_version = None
+    artifact_version = svm_art.get("artifact_version")
+    cacheable = data_version is not None and artifact_version is not None
+
+    # Pass 1: cache lookups and DB fetches.  Courses that miss the cache are
+    # collected so all of them can be scored together in pass 2.
+    per_course: list[list[dict] | None] = []
+    to_score: list[tuple[int, tuple, list[dict], list[dict] | None]] = []
     for course in courses:
+        cache_key = (course, artifact_version, data_version)
+        cached = COURSE_CACHE.get(cache_key) if cacheable else None
+        if cached is not None:
+            filtered, frequencies = cached
+            professor_frequencies[course] = frequencies
+            per_course.append(filtered)
+            continue
+
         # Load historical professor frequencies for the legend
+        frequencies = None
         try:
             top_profs = top_instructors_last4_semesters(course)
-            professor_frequencies[course] = [
+            frequencies = [
                 {
                     "instructor_name": p["instructor_name"],
                     "teach_count": p["teach_count"],
                     "probability": float(p["probability"])
                 } for p in top_profs
             ]
+            professor_frequencies[course] = frequencies
         except Exception:
             pass  # Failsafe gracefully if DB fetch fails
 
@@ -85,112 +301,47 @@ async def generate_schedule_v2(request: Request, payload: dict):
         except Exception as exc:
             raise HTTPException(status_code=500, detail=f"DB error for {course}: {exc}")
 
+        to_score.append((len(per_course), cache_key, candidates, frequencies))
+        per_course.append(None)
+
+    # Pass 2: score every missed course's candidates.
+    scored_lists = await _score_courses([cands for _, _, cands, _ in to_score], svm_art, batcher)
+    for (i, cache_key, candidates, frequencies), scored in zip(to_score, scored_lists):
         if not candidates:
             # No historical data for this course — skip gracefully
-            per_course.append([])
-            continue
+            filtered = []
+        else:
+            # 3. Keep high-confidence candidates; fall back to top-3 if none qualify
+            filtered = [c for c in scored if c["prob_scheduled"] >= PROB_THRESHOLD]
+            if not filtered:
+                filtered = sorted(scored, key=lambda c: c["prob_scheduled"], reverse=True)[:3]
 
-        # 2. Score all candidates in one batch (one predict_proba call)
-        scored = score_candidates(candidates, svm_art)
-
-        # 3. Keep high-confidence candidates; fall back to top-3 if none qualify
-        filtered = [c for c in scored if c["prob_scheduled"] >= PROB_THRESHOLD]
-        if not filtered:
-            filtered = sorted(scored, key=lambda c: c["prob_scheduled"], reverse=True)[:3]
-
-        per_course.append(filtered)
-
-    # ---- Build conflict-free schedules (incremental pruning) ----
-    # Start with one empty partial schedule.  For each course we try to extend
-    # every existing partial with every candidate for that course, keeping only
-    # combinations that have no time conflict.  Pruning happens immediately, so
-    # we never enumerate combinations that can't work.
-    partials: list[list[dict]] = [[]]
-
-    for course_candidates in per_course:
-        if not course_candidates:
-            continue  # no candidates for this course — skip it
-        next_partials: list[list[dict]] = []
-        for partial in partials:
-            for cand in course_candidates:
-                c_days, c_times = split_slot_prediction(cand.get("slot_label", "TBD TBD"))
-                conflict = any(
-                    is_time_conflict(
-                        c_days, c_times,
-                        *split_slot_prediction(assigned.get("slot_label", "TBD TBD")),
-                    )
-                    for assigned in partial
-                )
-                if not conflict:
-                    next_partials.append(partial + [cand])
-        # If all candidates conflict with every partial, preserve existing
-        # partials so the remaining courses can still be scheduled.
-        partials = next_partials if next_partials else partials
-
-    # ---- Annotate each schedule with a confidence score ----
-    # schedule_score = sum(log(prob_scheduled)).
-    # This is the log-joint-probability under independence (higher = more likely).
-    # Stored here so the frontend can display / sort by it later.
-    schedules_out = []
-    for sections in partials:
-        score = sum(math.log(max(s["prob_scheduled"], 1e-9)) for s in sections)
-        schedules_out.append({
-            "sections": sections,
-            "schedule_score": round(score, 4),
-        })
-
-    # Best schedules first
-    schedules_out.sort(key=lambda s: s["schedule_score"], reverse=True)
+        per_course[i] = filtered
+        # A failed frequency lookup is retried next time rather than cached.
+        if cacheable and frequencies is not None:
+            COURSE_CACHE.put(cache_key, (filtered, frequencies))
 
-    # ---- Persist to DB and return all options ----
-    # Skip DB save in DEV_BYPASS mode — no real user_id to associate the record with.
-    if os.getenv("DEV_BYPASS") == "1":
-        return {
-            "schedule_id":     None,
-            "total_schedules": len(schedules_out),
-            "schedules":       schedules_out,
-            "professor_frequencies": professor_frequencies,
-        }
+    return user_id, courses, top_k, expand_instructors, per_course, professor_frequencies
 
-    connection = get_db_connection()
-    cursor = connection.cursor()
-    try:
-        cursor.execute(
-            "INSERT INTO schedules (user_id, name, description, term_id, sections, input_hash) VALUES (%s,%s,%s,%s,%s,%s)",
-            (
-                user_id,
-                payload.get("name", "Generated Schedule"),
-                payload.get("description", ""),
-                payload.get("term_id"),
-                json.dumps(schedules_out),
-                hashlib.sha256(
-                    json.dumps({"courses": sorted(courses)}, sort_keys=True).encode()
-                ).hexdigest(),
-            ),
-        )
-        schedule_id = cursor.lastrowid
-        connection.commit()
-        return {
-            "schedule_id":     schedule_id,
-            "total_schedules": len(schedules_out),
-            "schedules":       schedules_out,
-            "professor_frequencies": professor_frequencies,
-        }
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f"Failed to save schedules: {exc}")
-    finally:
-        cursor.close()
-        connection.close()
 
+async def _score_courses(candidate_lists: list[list[dict]], svm_art: dict, batcher) -> list[list[dict]]:
+    """2. score_candidates for each course's candidates, one list per course.
 
-def split_slot_prediction(slot_str: str):
+    All courses are scored together: with SCORING_BATCH_WINDOW_MS set they
+    are submitted to the micro-batcher at once (one window, shared with
+    concurrent requests); otherwise the whole request is one
+    score_candidates_async call, which SCORING_WORKERS can spread over the
+    process pool.
     """
-    Safely splits a model prediction like 'MW 09:00AM-10:15AM' into days and times.
-    """
-    parts = str(slot_str).strip().split(" ", 1)
-    if len(parts) == 2:
-        return parts[0], parts[1]
-    return "TBD", "TBD"
+    if batcher is not None:
+        return list(await asyncio.gather(*(batcher.score(cands, svm_art) for cands in candidate_lists)))
+    rows = [c for cands in candidate_lists for c in cands]
+    scored = await score_candidates_async(rows, svm_art) if rows else []
+    out, start = [], 0
+    for cands in candidate_lists:
+        out.append(scored[start:start + len(cands)])
+        start += len(cands)
+    return out
 
 
 def is_time_conflict(days1: str, times1: str, days2: str, times2: str) -> bool:
@@ -207,19 +358,6 @@ def is_time_conflict(days1: str, times1: str, days2: str, times2: str) -> bool:
     if not days1_set.intersection(days2_set):
         return False  # No shared days, so no conflict
 
-    def parse_times(t_str):
-        match = re.search(r"(\d{1,2}:\d{2}[A-Za-z]+)-(\d{1,2}:\d{2}[A-Za-z]+)", t_str.replace(" ", ""))
-        if not match:
-            return 0, 0
-
-        start_str, end_str = match.groups()
-        try:
-            start_dt = datetime.strptime(start_str, "%I:%M%p")
-            end_dt = datetime.strptime(end_str, "%I:%M%p")
-            return (start_dt.hour * 60 + start_dt.minute), (end_dt.hour * 60 + end_dt.minute)
-        except ValueError:
-            return 0, 0
-
     start1, end1 = parse_times(times1)
     start2, end2 = parse_times(times2)
 
@@ -365,6 +503,12 @@ def hydrate_instructor_context(instructor_name: str) -> InstructorContext:
 #         connection.close()
 
 
+@router.get("/cache/stats")
+async def course_cache_stats():
+    """Hit/miss counters of the per-course candidate cache used by generate_v2."""
+    return COURSE_CACHE.stats()
+
+
 @router.get("")
 async def list_schedules(request: Request):
     """List all schedules for the current user."""
@@ -1,5 +1,7 @@
 from db_module import get_db_connection
 from typing import Any
+import os
+import time
 
 
 def top_instructors_last4_semesters(course_number: str, limit: int = 5) -> list[dict]:
@@ -167,3 +169,38 @@ def generate_professor_slot_candidates(course_number: str) -> list[dict[str, Any
             })
 
     return candidates
+
+
+# Last (monotonic time, version) read by schedule_flat_data_version.
+_DATA_VERSION: tuple[float, str] | None = None
+
+
+def schedule_flat_data_version() -> str:
+    """
+    Cheap fingerprint of schedule_flat contents: its max id, as a string.
+
+    schedule_flat is only ever appended to (INSERT IGNORE loads), so any new
+    load raises MAX(id), which the primary key answers without a scan.  Used
+    to key caches derived from the table.  The value is reused for
+    DATA_VERSION_TTL_SECONDS (default 5) so cache hits skip the DB entirely;
+    a new load is noticed within that window.
+    """
+    global _DATA_VERSION
+    ttl = float(os.getenv("DATA_VERSION_TTL_SECONDS", "5") or 0)
+    now = time.monotonic()
+    cached = _DATA_VERSION
+    if cached is not None and now - cached[0] < ttl:
+        return cached[1]
+
+    sql = "SELECT COALESCE(MAX(id), 0) AS max_id FROM schedule_flat;"
+
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor(dictionary=True)
+        cur.execute(sql)
+        row = cur.fetchone()
+        version = str(int(row["max_id"]))
+    finally:
+        conn.close()
+    _DATA_VERSION = (now, version)
+    return version
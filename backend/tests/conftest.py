@@ -1,8 +1,87 @@
 import os
 import sys
 
+import numpy as np
+import pandas as pd
+import pytest
+
 
 # Ensure backend modules (e.g. main, auth, ml) are importable in CI.
 BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if BACKEND_ROOT not in sys.path:
     sys.path.insert(0, BACKEND_ROOT)
+
+
+@pytest.fixture(autouse=True)
+def _clear_course_cache():
+    """generate_v2 caches per-course candidates process-wide; isolate tests from each other."""
+    from candidate_cache import COURSE_CACHE
+
+    COURSE_CACHE.clear()
+    yield
+    COURSE_CACHE.clear()
+
+
+@pytest.fixture(autouse=True)
+def _clear_data_version():
+    """stats.schedule_flat_data_version reuses its last value for a few seconds; start each test without it."""
+    import stats
+
+    stats._DATA_VERSION = None
+    yield
+    stats._DATA_VERSION = None
+
+
+def _tiny_svm_artifact() -> dict:
+    """A two-table SVM artifact with the production feature columns."""
+    from ml.compiled_model import CompiledLinearModel
+    from ml.inference import COUNT_DEFS, RECENCY_DEFS
+
+    num_cols = [f"{out_col}_log1p" for out_col, _ in COUNT_DEFS] + [
+        out_col.replace("last_term", "terms_since") for out_col, _ in RECENCY_DEFS
+    ]
+    lookups = {
+        "instr_prior_count": pd.DataFrame(
+            {
+                "Instructor": ["Prof A", "Prof A", "Prof B"],
+                "SemesterIndex": [0, 2, 1],
+                "instr_prior_count": [1, 3, 2],
+            }
+        ),
+        "combo_last_term": pd.DataFrame(
+            {
+                "CourseCode": ["CS 146", "CS 146"],
+                "Instructor": ["Prof A", "Prof A"],
+                "Slot": ["TR_540_615", "TR_540_615"],
+                "Type": ["LEC", "LEC"],
+                "SemesterIndex": [0, 2],
+                "combo_last_term": [np.nan, 0.0],
+            }
+        ),
+    }
+    serving_model = CompiledLinearModel(
+        cat_cols=["CourseCode"],
+        categories=[np.array(["CS 146", "CS 151"])],
+        category_columns=[np.array([0, 1])],
+        num_cols=num_cols,
+        num_offset=2,
+        num_scale=np.ones(len(num_cols)),
+        coef=np.linspace(-1, 1, 2 + len(num_cols)).reshape(1, -1),
+        intercept=np.array([0.1]),
+        sigmoid_a=np.array([-1.0]),
+        sigmoid_b=np.array([0.0]),
+    )
+    return {
+        "serving_model": serving_model,
+        "lookups": lookups,
+        "cat_cols": ["CourseCode", "Instructor", "Slot", "Type"],
+        "num_cols": num_cols,
+        "max_train_term": 2,
+        "serving_max_deviation": 0.01,
+    }
+
+
+@pytest.fixture
+def make_svm_artifact():
+    """Factory for a small in-memory SVM artifact; every call returns a fresh dict."""
+    return _tiny_svm_artifact
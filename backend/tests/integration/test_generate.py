@@ -83,8 +83,8 @@ def test_list_courses(mock_get_db):
 # ---------------------------------------------------------------------------
 
 
-def test_predict_instructor_endpoint_not_enabled():
-    """The legacy /ml/predict/instructor endpoint is currently disabled."""
+def test_predict_instructor_endpoint_expects_a_batch():
+    """/ml/predict/instructor takes a list of contexts, not a single one."""
     payload = {
         "section": "CS 146 (Section 01)",
         "mode": "In Person",
@@ -94,7 +94,7 @@ def test_predict_instructor_endpoint_not_enabled():
         "semester": "Spring"
     }
     response = client.post("/ml/predict/instructor", json=payload)
-    assert response.status_code == 404
+    assert response.status_code == 422
 
 # ---------------------------------------------------------------------------
 # 4. SCHEDULE GENERATION TESTS (/schedules/generate_v2)
@@ -104,7 +104,7 @@ def test_predict_instructor_endpoint_not_enabled():
 @patch("schedules.get_db_connection")
 @patch("schedules.load_svm_artifact")
 @patch("schedules.generate_professor_slot_candidates")
-@patch("schedules.score_candidates")
+@patch("schedules.score_candidates_async")
 def test_generate_schedule_v2_success(mock_score, mock_candidates, mock_load_svm, mock_get_db):
     """
     FIX: Replaces test_predict_scheduled_probability to test the actual /generate_v2 endpoint.
@@ -0,0 +1,131 @@
+from main import app
+import os
+import sys
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+# Ensure backend directory is importable in local runs and CI.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+client = TestClient(app)
+
+
+def test_health():
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+@patch("main.SVM_REGISTRY")
+def test_ready_returns_503_while_cold(mock_registry):
+    mock_registry.status.return_value = {"ready": False, "warm": False, "artifact_version": None}
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["warm"] is False
+    mock_registry.warmup.assert_called_once()
+
+
+@patch("main.SVM_REGISTRY")
+def test_ready_loads_artifact_missing_at_startup(mock_registry):
+    mock_registry.status.side_effect = [
+        {"ready": False, "warm": False, "artifact_version": None},
+        {"ready": True, "warm": True, "artifact_version": "abc123"},
+    ]
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["artifact_version"] == "abc123"
+
+
+@patch("main.SVM_REGISTRY")
+def test_ready_stays_503_when_load_fails(mock_registry):
+    mock_registry.status.return_value = {"ready": False, "warm": False, "artifact_version": None}
+    mock_registry.warmup.side_effect = FileNotFoundError("Missing model artifact")
+    response = client.get("/ready")
+    assert response.status_code == 503
+
+
+@patch("main.SVM_REGISTRY")
+def test_ready_reports_artifact_once_warm(mock_registry):
+    mock_registry.status.return_value = {"ready": True, "warm": True, "artifact_version": "abc123"}
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["artifact_version"] == "abc123"
+
+
+@patch("main.SVM_REGISTRY")
+def test_startup_loads_and_warms_registry(mock_registry):
+    mock_registry.status.return_value = {
+        "ready": True, "warm": True, "artifact_version": "abc123",
+        "load_seconds": 0.1, "warmup_seconds": 0.01,
+    }
+    with TestClient(app):
+        pass
+    mock_registry.load.assert_called_once()
+    mock_registry.warmup.assert_called_once()
+
+
+@patch("main.SVM_REGISTRY")
+def test_startup_survives_missing_artifact(mock_registry):
+    mock_registry.load.side_effect = FileNotFoundError("Missing model artifact")
+    with TestClient(app) as local_client:
+        assert local_client.get("/health").status_code == 200
+    mock_registry.warmup.assert_not_called()
+
+
+def test_reload_is_disabled_without_admin_token(monkeypatch):
+    monkeypatch.delenv("MODEL_ADMIN_TOKEN", raising=False)
+    response = client.post("/ml/admin/reload", headers={"X-Admin-Token": "anything"})
+    assert response.status_code == 404
+
+
+def test_reload_rejects_wrong_admin_token(monkeypatch):
+    monkeypatch.setenv("MODEL_ADMIN_TOKEN", "secret")
+    response = client.post("/ml/admin/reload", headers={"X-Admin-Token": "wrong"})
+    assert response.status_code == 403
+
+
+@patch("ml.ml_router.SVM_REGISTRY")
+def test_reload_swaps_artifact(mock_registry, monkeypatch):
+    monkeypatch.setenv("MODEL_ADMIN_TOKEN", "secret")
+    mock_registry.reload.return_value = True
+    mock_registry.status.return_value = {"ready": True, "artifact_version": "def456"}
+
+    response = client.post("/ml/admin/reload?force=true", headers={"X-Admin-Token": "secret"})
+
+    assert response.status_code == 200
+    assert response.json()["swapped"] is True
+    assert response.json()["artifact_version"] == "def456"
+    mock_registry.reload.assert_called_once_with(True)
+
+
+@patch("ml.ml_router.SVM_REGISTRY")
+def test_failed_reload_reports_500(mock_registry, monkeypatch):
+    monkeypatch.setenv("MODEL_ADMIN_TOKEN", "secret")
+    mock_registry.reload.side_effect = ValueError("corrupt artifact")
+
+    response = client.post("/ml/admin/reload", headers={"X-Admin-Token": "secret"})
+
+    assert response.status_code == 500
+    assert "previous artifact still served" in response.json()["detail"]
+
+
+@patch("main.SVM_REGISTRY")
+def test_startup_starts_watcher_when_interval_set(mock_registry, monkeypatch):
+    monkeypatch.setenv("MODEL_WATCH_INTERVAL", "30")
+    mock_registry.status.return_value = {
+        "ready": True, "warm": True, "artifact_version": "abc123",
+        "load_seconds": 0.1, "warmup_seconds": 0.01,
+    }
+    with TestClient(app):
+        mock_registry.start_watcher.assert_called_once_with(30.0)
+    mock_registry.stop_watcher.assert_called_once()
+
+
+def test_scoring_stats_reports_disabled_features(monkeypatch):
+    monkeypatch.delenv("SCORING_BATCH_WINDOW_MS", raising=False)
+    monkeypatch.delenv("SCORING_WORKERS", raising=False)
+    response = client.get("/ml/scoring/stats")
+    assert response.status_code == 200
+    assert response.json() == {"batcher": None, "executor": None}
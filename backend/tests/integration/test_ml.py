@@ -0,0 +1,172 @@
+from main import app
+from ml.features import SemesterIndexConfig
+from ml.registry import UnknownTenantError
+import json
+import os
+import sys
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
+import numpy as np
+
+# Ensure backend directory is importable in local runs and CI.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+client = TestClient(app)
+
+
+def _candidate(i):
+    return {
+        "course_number": "CS 146",
+        "instructor_name": f"Prof {i}",
+        "days_text": "MW",
+        "start_time": "09:00AM",
+        "end_time": "10:15AM",
+    }
+
+
+def _fake_score(chunk, art):
+    return [{**c, "prob_scheduled": 0.5, "artifact_version": art["artifact_version"]} for c in chunk]
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+@patch("ml.ml_router.score_candidates", side_effect=_fake_score)
+@patch("ml.ml_router.load_svm_artifact", return_value={"artifact_version": "v1"})
+def test_score_batch_json_streams_ndjson_in_chunks(_mock_load, mock_score):
+    candidates = [_candidate(i) for i in range(5)]
+    response = client.post("/ml/score/batch?chunk_size=2", json={"candidates": candidates})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = _lines(response)
+    assert [r["instructor_name"] for r in lines] == [c["instructor_name"] for c in candidates]
+    assert all(r["artifact_version"] == "v1" for r in lines)
+    assert [len(call.args[0]) for call in mock_score.call_args_list] == [2, 2, 1]
+
+
+@patch("ml.ml_router.score_candidates", side_effect=_fake_score)
+@patch("ml.ml_router.load_svm_artifact", return_value={"artifact_version": "v1"})
+def test_score_batch_accepts_bare_json_list(_mock_load, _mock_score):
+    response = client.post("/ml/score/batch", json=[_candidate(1)])
+    assert response.status_code == 200
+    assert len(_lines(response)) == 1
+
+
+@patch("ml.ml_router.score_candidates", side_effect=_fake_score)
+@patch("ml.ml_router.load_svm_artifact", return_value={"artifact_version": "v1"})
+def test_score_batch_accepts_ndjson_body(_mock_load, mock_score):
+    body = "\n".join(json.dumps(_candidate(i)) for i in range(3)) + "\n\n"
+    response = client.post(
+        "/ml/score/batch?chunk_size=10",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    assert [r["instructor_name"] for r in _lines(response)] == ["Prof 0", "Prof 1", "Prof 2"]
+    assert mock_score.call_count == 1
+
+
+@patch("ml.ml_router.score_candidates", side_effect=_fake_score)
+@patch("ml.ml_router.load_svm_artifact", return_value={"artifact_version": "v1"})
+def test_score_batch_ndjson_bad_line_ends_stream_with_error(_mock_load, _mock_score):
+    body = json.dumps(_candidate(0)) + "\n" + json.dumps({"course_number": "CS 146"}) + "\n"
+    response = client.post(
+        "/ml/score/batch?chunk_size=1",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    lines = _lines(response)
+    assert lines[0]["instructor_name"] == "Prof 0"
+    assert "candidate 2: missing instructor_name" in lines[-1]["error"]
+
+
+@patch("ml.ml_router.score_candidates", side_effect=_fake_score)
+@patch("ml.ml_router.load_svm_artifact", return_value={"artifact_version": "v1"})
+def test_score_batch_ndjson_bad_line_keeps_the_pending_chunk(_mock_load, mock_score):
+    # Default chunk size: the bad line arrives while the first chunk is still filling.
+    body = "\n".join(json.dumps(_candidate(i)) for i in range(3)) + "\n{bad\n" + json.dumps(_candidate(4)) + "\n"
+    response = client.post("/ml/score/batch", content=body, headers={"Content-Type": "application/x-ndjson"})
+    lines = _lines(response)
+    assert [r["instructor_name"] for r in lines[:-1]] == ["Prof 0", "Prof 1", "Prof 2"]
+    assert lines[-1]["error"].startswith("candidate 4: invalid JSON")
+    assert mock_score.call_count == 1
+
+
+@patch("ml.ml_router.load_svm_artifact", return_value={"artifact_version": "v1"})
+def test_score_batch_rejects_invalid_json_body(_mock_load):
+    response = client.post("/ml/score/batch", json={"rows": []})
+    assert response.status_code == 400
+    response = client.post("/ml/score/batch", json=[{"course_number": "CS 146"}])
+    assert response.status_code == 400
+    assert "missing instructor_name" in response.json()["detail"]
+
+
+@patch("ml.ml_router.load_svm_artifact", side_effect=FileNotFoundError("model missing"))
+def test_score_batch_returns_503_without_artifact(_mock_load):
+    response = client.post("/ml/score/batch", json=[_candidate(1)])
+    assert response.status_code == 503
+
+
+def test_score_batch_validates_chunk_size():
+    response = client.post("/ml/score/batch?chunk_size=0", json=[_candidate(1)])
+    assert response.status_code == 422
+
+
+@patch("ml.ml_router.load_svm_artifact", side_effect=UnknownTenantError("No artifacts for tenant 'mars'"))
+def test_score_batch_returns_404_for_unknown_tenant(mock_load):
+    response = client.post("/ml/score/batch?tenant=mars", json=[_candidate(1)])
+    assert response.status_code == 404
+    mock_load.assert_called_once_with("mars")
+
+
+@patch("ml.ml_router.TENANT_REGISTRY")
+def test_model_stats_reports_tenant_registry(mock_tenants):
+    mock_tenants.stats.return_value = {"budget_bytes": 10, "resident_bytes": 0, "evictions": 0, "tenants": {}}
+    response = client.get("/ml/models/stats")
+    assert response.status_code == 200
+    assert response.json()["budget_bytes"] == 10
+
+
+def _course_context(section):
+    return {"section": section, "mode": "In Person", "unit": 3, "type": "LEC",
+            "times": "09:00AM-10:15AM", "year": 2026, "semester": "Fall"}
+
+
+def _scenario_art():
+    pipeline = MagicMock()
+    pipeline.classes_ = np.array(["Prof A", "Prof B", "Prof C"])
+    pipeline.predict_proba.side_effect = lambda X: np.tile([0.2, 0.5, 0.3], (len(X), 1))
+    return {"pipeline": pipeline, "sem_cfg": SemesterIndexConfig(base=4000), "cat": ["CourseCode"], "num": ["SemesterIndex"]}
+
+
+@patch("ml.ml_router._get_scenario")
+def test_predict_instructor_scores_whole_batch_in_one_call(mock_scenario):
+    art = _scenario_art()
+    mock_scenario.return_value = art
+    response = client.post("/ml/predict/instructor?k=2", json=[_course_context("CS 146"), _course_context("CS 151")])
+
+    assert response.status_code == 200
+    predictions = response.json()["predictions"]
+    assert [p["best"]["label"] for p in predictions] == ["Prof B", "Prof B"]
+    assert [t["label"] for t in predictions[0]["topk"]] == ["Prof B", "Prof C"]
+    art["pipeline"].predict_proba.assert_called_once()
+    mock_scenario.assert_called_once_with("A")
+
+
+@patch("ml.ml_router._get_scenario", side_effect=FileNotFoundError("Missing model artifact"))
+def test_predict_course_returns_503_without_artifact(_mock_scenario):
+    context = {"instructor": "Prof A", "mode": "In Person", "type": "LEC", "semester": "Fall",
+               "building": "ENG", "year": 2026}
+    response = client.post("/ml/predict/course", json=[context])
+    assert response.status_code == 503
+
+
+def test_predict_slot_empty_batch_needs_no_artifact():
+    response = client.post("/ml/predict/slot", json=[])
+    assert response.status_code == 200
+    assert response.json() == {"predictions": []}
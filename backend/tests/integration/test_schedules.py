@@ -1,4 +1,5 @@
 from main import app
+from ml.registry import UnknownTenantError
 import json
 import os
 import sys
@@ -85,7 +86,7 @@ def test_generate_v2_no_candidates_returns_empty_sections(mock_candidates, mock_
 # 6
 @patch("schedules.load_svm_artifact")
 @patch("schedules.generate_professor_slot_candidates")
-@patch("schedules.score_candidates")
+@patch("schedules.score_candidates_async")
 def test_generate_v2_filters_by_probability_threshold(mock_score, mock_candidates, mock_load):
     mock_load.return_value = {"model": MagicMock()}
     mock_candidates.return_value = [{"slot_label": "MW 09:00AM-10:15AM"}]
@@ -104,7 +105,7 @@ def test_generate_v2_filters_by_probability_threshold(mock_score, mock_candidate
 # 7
 @patch("schedules.load_svm_artifact")
 @patch("schedules.generate_professor_slot_candidates")
-@patch("schedules.score_candidates")
+@patch("schedules.score_candidates_async")
 def test_generate_v2_fallback_to_top3_when_no_threshold_hits(mock_score, mock_candidates, mock_load):
     mock_load.return_value = {"model": MagicMock()}
     mock_candidates.return_value = [{"slot_label": "MW 09:00AM-10:15AM"}]
@@ -124,20 +125,18 @@ def test_generate_v2_fallback_to_top3_when_no_threshold_hits(mock_score, mock_ca
 # 8
 @patch("schedules.load_svm_artifact")
 @patch("schedules.generate_professor_slot_candidates")
-@patch("schedules.score_candidates")
+@patch("schedules.score_candidates_async")
 def test_generate_v2_conflict_pruning_keeps_conflict_free_options(mock_score, mock_candidates, mock_load):
     mock_load.return_value = {"model": MagicMock()}
-    # two courses in request => called twice
+    # two courses in request => candidates fetched twice, scored in one call
     mock_candidates.side_effect = [
-        [{"slot_label": "MW 09:00AM-10:15AM"}],
+        [{"slot_label": "MW 09:00AM-10:15AM"}, {"slot_label": "TR 01:00PM-02:15PM"}],
         [{"slot_label": "MW 09:30AM-10:45AM"}],
     ]
-    mock_score.side_effect = [
-        [
-            _candidate("A1", "MW 09:00AM-10:15AM", 0.9),
-            _candidate("A2", "TR 01:00PM-02:15PM", 0.8),
-        ],
-        [_candidate("B1", "MW 09:30AM-10:45AM", 0.9)],
+    mock_score.return_value = [
+        _candidate("A1", "MW 09:00AM-10:15AM", 0.9),
+        _candidate("A2", "TR 01:00PM-02:15PM", 0.8),
+        _candidate("B1", "MW 09:30AM-10:45AM", 0.9),
     ]
     with patch.dict(os.environ, {"DEV_BYPASS": "1"}, clear=False):
         response = client.post(
@@ -148,13 +147,14 @@ def test_generate_v2_conflict_pruning_keeps_conflict_free_options(mock_score, mo
     # Should include the non-conflicting choice A2 with B1.
     names = {s["instructor_name"] for s in schedule_sections}
     assert "A2" in names
+    assert mock_score.call_count == 1
     assert "B1" in names
 
 
 # 9
 @patch("schedules.load_svm_artifact")
 @patch("schedules.generate_professor_slot_candidates")
-@patch("schedules.score_candidates")
+@patch("schedules.score_candidates_async")
 def test_generate_v2_dev_bypass_skips_db_save(mock_score, mock_candidates, mock_load):
     mock_load.return_value = {"model": MagicMock()}
     mock_candidates.return_value = [{"slot_label": "MW 09:00AM-10:15AM"}]
@@ -170,7 +170,7 @@ def test_generate_v2_dev_bypass_skips_db_save(mock_score, mock_candidates, mock_
 @patch("schedules.get_current_user_id_cookie", return_value=123)
 @patch("schedules.load_svm_artifact")
 @patch("schedules.generate_professor_slot_candidates")
-@patch("schedules.score_candidates")
+@patch("schedules.score_candidates_async")
 def test_generate_v2_non_bypass_persists_schedule(
     mock_score,
     mock_candidates,
@@ -198,7 +198,7 @@ def test_generate_v2_non_bypass_persists_schedule(
 @patch("schedules.get_current_user_id_cookie", return_value=123)
 @patch("schedules.load_svm_artifact")
 @patch("schedules.generate_professor_slot_candidates")
-@patch("schedules.score_candidates")
+@patch("schedules.score_candidates_async")
 def test_generate_v2_save_failure_returns_500(
     mock_score,
     mock_candidates,
@@ -225,7 +225,7 @@ def test_generate_v2_save_failure_returns_500(
 @patch("schedules.top_instructors_last4_semesters")
 @patch("schedules.load_svm_artifact")
 @patch("schedules.generate_professor_slot_candidates")
-@patch("schedules.score_candidates")
+@patch("schedules.score_candidates_async")
 def test_generate_v2_professor_frequency_failure_is_non_fatal(
     mock_score,
     mock_candidates,
@@ -344,3 +344,259 @@ def test_split_slot_prediction_and_conflict_helpers():
     assert t == "09:00AM-10:15AM"
     assert is_time_conflict("MW", "09:00AM-10:15AM", "W", "09:30AM-10:45AM") is True
     assert is_time_conflict("MW", "09:00AM-10:15AM", "TR", "09:30AM-10:45AM") is False
+
+
+# 21
+@patch("schedules.load_svm_artifact")
+@patch("schedules.generate_professor_slot_candidates")
+@patch("schedules.score_candidates_async")
+@patch("schedules.get_batcher")
+def test_generate_v2_scores_through_micro_batcher_when_enabled(mock_get_batcher, mock_score, mock_candidates, mock_load):
+    from ml.batching import MicroBatcher
+
+    batch_score = MagicMock(return_value=[_candidate("A", "MW 09:00AM-10:15AM", 0.9)])
+    batcher = MicroBatcher(window_ms=1, score_fn=batch_score)
+    mock_get_batcher.return_value = batcher
+    mock_load.return_value = {"model": MagicMock()}
+    mock_candidates.return_value = [{"slot_label": "MW 09:00AM-10:15AM"}]
+    with patch.dict(os.environ, {"DEV_BYPASS": "1"}, clear=False):
+        response = client.post("/schedules/generate_v2", json={"courses": ["CS 146"]})
+    assert response.status_code == 200
+    assert response.json()["schedules"][0]["sections"][0]["instructor_name"] == "A"
+    batch_score.assert_called_once()
+    mock_score.assert_not_called()
+    assert batcher.stats()["batches"] == 1
+
+
+# 22
+@patch("schedules.schedule_flat_data_version", return_value="100")
+@patch("schedules.top_instructors_last4_semesters")
+@patch("schedules.load_svm_artifact")
+@patch("schedules.generate_professor_slot_candidates")
+@patch("schedules.score_candidates_async")
+def test_generate_v2_repeat_course_hits_cache(mock_score, mock_candidates, mock_load, mock_top, _mock_version):
+    mock_load.return_value = {"model": MagicMock(), "artifact_version": "v1"}
+    mock_top.return_value = [{"instructor_name": "A", "teach_count": 3, "probability": 1.0}]
+    mock_candidates.return_value = [{"slot_label": "MW 09:00AM-10:15AM"}]
+    mock_score.return_value = [_candidate("A", "MW 09:00AM-10:15AM", 0.9)]
+    with patch.dict(os.environ, {"DEV_BYPASS": "1"}, clear=False):
+        first = client.post("/schedules/generate_v2", json={"courses": ["CS 146"]})
+        second = client.post("/schedules/generate_v2", json={"courses": ["CS 146"]})
+
+    assert first.json() == second.json()
+    assert second.json()["professor_frequencies"]["CS 146"][0]["instructor_name"] == "A"
+    assert mock_candidates.call_count == 1
+    assert mock_score.call_count == 1
+    assert mock_top.call_count == 1
+
+    stats = client.get("/schedules/cache/stats").json()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+# 23
+@patch("schedules.schedule_flat_data_version")
+@patch("schedules.top_instructors_last4_semesters", return_value=[])
+@patch("schedules.load_svm_artifact")
+@patch("schedules.generate_professor_slot_candidates")
+@patch("schedules.score_candidates_async")
+def test_generate_v2_new_data_version_misses_cache(mock_score, mock_candidates, mock_load, _mock_top, mock_version):
+    mock_load.return_value = {"model": MagicMock(), "artifact_version": "v1"}
+    mock_candidates.return_value = [{"slot_label": "MW 09:00AM-10:15AM"}]
+    mock_score.return_value = [_candidate("A", "MW 09:00AM-10:15AM", 0.9)]
+    mock_version.side_effect = ["100", "150"]
+    with patch.dict(os.environ, {"DEV_BYPASS": "1"}, clear=False):
+        client.post("/schedules/generate_v2", json={"courses": ["CS 146"]})
+        client.post("/schedules/generate_v2", json={"courses": ["CS 146"]})
+
+    assert mock_candidates.call_count == 2
+    assert mock_score.call_count == 2
+
+
+# 24
+@patch("schedules.schedule_flat_data_version", side_effect=RuntimeError("db down"))
+@patch("schedules.top_instructors_last4_semesters", return_value=[])
+@patch("schedules.load_svm_artifact")
+@patch("schedules.generate_professor_slot_candidates")
+@patch("schedules.score_candidates_async")
+def test_generate_v2_bypasses_cache_without_data_version(mock_score, mock_candidates, mock_load, _mock_top, _mock_version):
+    mock_load.return_value = {"model": MagicMock(), "artifact_version": "v1"}
+    mock_candidates.return_value = [{"slot_label": "MW 09:00AM-10:15AM"}]
+    mock_score.return_value = [_candidate("A", "MW 09:00AM-10:15AM", 0.9)]
+    with patch.dict(os.environ, {"DEV_BYPASS": "1"}, clear=False):
+        client.post("/schedules/generate_v2", json={"courses": ["CS 146"]})
+        response = client.post("/schedules/generate_v2", json={"courses": ["CS 146"]})
+
+    assert response.status_code == 200
+    assert mock_score.call_count == 2
+
+
+# 25
+@patch("schedules.load_svm_artifact")
+@patch("schedules.generate_professor_slot_candidates")
+@patch("schedules.get_batcher")
+def test_generate_v2_submits_all_courses_in_one_batcher_window(mock_get_batcher, mock_candidates, mock_load):
+    from ml.batching import MicroBatcher
+
+    batch_score = MagicMock(side_effect=lambda rows, art: [
+        _candidate(r["name"], r["slot_label"], 0.9) for r in rows
+    ])
+    batcher = MicroBatcher(window_ms=1, score_fn=batch_score)
+    mock_get_batcher.return_value = batcher
+    mock_load.return_value = {"model": MagicMock()}
+    mock_candidates.side_effect = [
+        [{"name": "A", "slot_label": "MW 09:00AM-10:15AM"}],
+        [{"name": "B", "slot_label": "TR 09:00AM-10:15AM"}],
+    ]
+    with patch.dict(os.environ, {"DEV_BYPASS": "1"}, clear=False):
+        response = client.post("/schedules/generate_v2", json={"courses": ["CS 146", "CS 151"]})
+    assert response.status_code == 200
+    names = [s["instructor_name"] for s in response.json()["schedules"][0]["sections"]]
+    assert names == ["A", "B"]
+    batch_score.assert_called_once()
+    assert batcher.stats()["calls"] == 2
+
+
+# 26
+@patch("schedules.load_svm_artifact")
+def test_generate_v2_unknown_tenant_returns_404(mock_load):
+    mock_load.side_effect = UnknownTenantError("No artifacts for tenant 'mars'")
+    with patch.dict(os.environ, {"DEV_BYPASS": "1"}, clear=False):
+        response = client.post("/schedules/generate_v2", json={"courses": ["CS 146"], "tenant": "mars"})
+    assert response.status_code == 404
+    mock_load.assert_called_once_with("mars")
+
+
+# 27
+@patch("schedules.load_svm_artifact")
+@patch("schedules.generate_professor_slot_candidates")
+@patch("schedules.score_candidates_async")
+def test_generate_v2_top_k_returns_best_schedules_only(mock_score, mock_candidates, mock_load):
+    mock_load.return_value = {"model": MagicMock()}
+    mock_candidates.side_effect = [
+        [{"slot_label": "MW 09:00AM-10:15AM"}, {"slot_label": "TR 01:00PM-02:15PM"}],
+        [{"slot_label": "F 09:30AM-10:45AM"}, {"slot_label": "TR 01:30PM-02:45PM"}],
+    ]
+    mock_score.return_value = [
+        _candidate("A1", "MW 09:00AM-10:15AM", 0.9),
+        _candidate("A2", "TR 01:00PM-02:15PM", 0.8),
+        _candidate("B1", "F 09:30AM-10:45AM", 0.7),
+        _candidate("B2", "TR 01:30PM-02:45PM", 0.95),
+    ]
+    with patch.dict(os.environ, {"DEV_BYPASS": "1"}, clear=False):
+        response = client.post("/schedules/generate_v2", json={"courses": ["CS 146", "CS 151"], "top_k": 2})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_schedules"] == 2
+    assert [[s["instructor_name"] for s in sch["sections"]] for sch in body["schedules"]] == [["A1", "B2"], ["A1", "B1"]]
+
+
+# 28
+def test_generate_v2_rejects_invalid_top_k():
+    with patch.dict(os.environ, {"DEV_BYPASS": "1"}, clear=False):
+        for bad in (0, -3, "5", True):
+            response = client.post("/schedules/generate_v2", json={"courses": ["CS 146"], "top_k": bad})
+            assert response.status_code == 400
+
+
+# 29
+@patch("schedules.load_svm_artifact")
+@patch("schedules.generate_professor_slot_candidates")
+@patch("schedules.score_candidates_async")
+def test_generate_v2_can_return_slot_level_schedules(mock_score, mock_candidates, mock_load):
+    mock_load.return_value = {"model": MagicMock()}
+    mock_candidates.side_effect = [
+        [{"slot_label": "MW 09:00AM-10:15AM"}] * 2 + [{"slot_label": "TR 01:00PM-02:15PM"}],
+        [{"slot_label": "F 09:30AM-10:45AM"}],
+    ]
+    mock_score.return_value = [
+        _candidate("A1", "MW 09:00AM-10:15AM", 0.8),
+        _candidate("A2", "MW 09:00AM-10:15AM", 0.9),
+        _candidate("A3", "TR 01:00PM-02:15PM", 0.85),
+        _candidate("B1", "F 09:30AM-10:45AM", 0.9),
+    ]
+    with patch.dict(os.environ, {"DEV_BYPASS": "1"}, clear=False):
+        response = client.post("/schedules/generate_v2",
+                               json={"courses": ["CS 146", "CS 151"], "expand_instructors": False})
+    assert response.status_code == 200
+    schedules = response.json()["schedules"]
+    assert len(schedules) == 2
+    first = schedules[0]["sections"][0]
+    assert first["instructor_name"] == "A2"
+    assert first["instructor_alternatives"] == [{"instructor_name": "A1", "prob_scheduled": 0.8}]
+
+
+def _stream_bundle(mock_candidates, mock_score):
+    mock_candidates.side_effect = [
+        [{"slot_label": "MW 09:00AM-10:15AM"}] * 3,
+        [{"slot_label": "M 09:30AM-10:00AM"}] * 2,
+    ] * 2
+    mock_score.return_value = [
+        _candidate("A1", "MW 09:00AM-10:15AM", 0.8),
+        _candidate("A2", "TR 09:00AM-10:15AM", 0.9),
+        _candidate("A3", "F 09:00AM-10:15AM", 0.75),
+        _candidate("B1", "M 09:30AM-10:00AM", 0.95),
+        _candidate("B2", "W 01:00PM-02:15PM", 0.7),
+    ]
+
+
+# 30
+@patch("schedules.top_instructors_last4_semesters", return_value=[])
+@patch("schedules.load_svm_artifact")
+@patch("schedules.generate_professor_slot_candidates")
+@patch("schedules.score_candidates_async")
+def test_generate_v2_stream_sends_frequencies_schedules_then_summary(mock_score, mock_candidates, mock_load, _mock_top):
+    mock_load.return_value = {"model": MagicMock()}
+    _stream_bundle(mock_candidates, mock_score)
+    body = {"courses": ["CS 146", "CS 151"], "top_k": 50}
+    with patch.dict(os.environ, {"DEV_BYPASS": "1"}, clear=False):
+        expected = client.post("/schedules/generate_v2", json=body).json()
+        response = client.post("/schedules/generate_v2/stream", json=body)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[0] == {"type": "professor_frequencies", "professor_frequencies": expected["professor_frequencies"]}
+    schedules = events[1:-1]
+    assert [s["rank"] for s in schedules] == list(range(1, len(schedules) + 1))
+    assert [{"sections": s["sections"], "schedule_score": s["schedule_score"]} for s in schedules] == expected["schedules"]
+    assert events[-1] == {"type": "summary", "schedule_id": None, "total_schedules": expected["total_schedules"]}
+
+
+# 31
+@patch("schedules.get_db_connection")
+@patch("schedules.get_current_user_id_cookie", return_value=123)
+@patch("schedules.top_instructors_last4_semesters", return_value=[])
+@patch("schedules.load_svm_artifact")
+@patch("schedules.generate_professor_slot_candidates")
+@patch("schedules.score_candidates_async")
+def test_generate_v2_stream_sse_persists_the_same_row(mock_score, mock_candidates, mock_load, _mock_top, _mock_user, mock_get_db):
+    conn, cursor = _mock_db()
+    cursor.lastrowid = 777
+    mock_get_db.return_value = conn
+    mock_load.return_value = {"model": MagicMock()}
+    _stream_bundle(mock_candidates, mock_score)
+    body = {"courses": ["CS 146", "CS 151"], "top_k": 2, "term_id": 1}
+    with patch.dict(os.environ, {"DEV_BYPASS": "0"}, clear=False):
+        client.post("/schedules/generate_v2", json=body)
+        response = client.post("/schedules/generate_v2/stream", json=body, headers={"Accept": "text/event-stream"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    messages = [m for m in response.text.split("\n\n") if m]
+    names = [m.split("\n")[0] for m in messages]
+    assert names == ["event: professor_frequencies", "event: schedule", "event: schedule", "event: summary"]
+    summary = json.loads(messages[-1].split("\n")[1][len("data: "):])
+    assert summary == {"type": "summary", "schedule_id": 777, "total_schedules": 2}
+    saved = [c.args[1] for c in cursor.execute.call_args_list]
+    assert len(saved) == 2 and saved[0] == saved[1]
+
+
+# 32
+def test_generate_v2_stream_rejects_bad_payload_before_streaming():
+    with patch.dict(os.environ, {"DEV_BYPASS": "1"}, clear=False):
+        assert client.post("/schedules/generate_v2/stream", json={"courses": [], "top_k": 5}).status_code == 400
+        assert client.post("/schedules/generate_v2/stream", json={"courses": ["CS 146"], "top_k": 0}).status_code == 400
+        response = client.post("/schedules/generate_v2/stream", json={"courses": ["CS 146"]})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "top_k is required"
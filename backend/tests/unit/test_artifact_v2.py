@@ -0,0 +1,164 @@
+from ml import inference
+from ml.artifact_v2 import (
+    CodedLookupIndex,
+    StringDictionary,
+    encode_lookup_tables,
+    read_svm_artifact_v2,
+    write_svm_artifact_v2,
+)
+import os
+import sys
+from unittest.mock import patch
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure backend directory is importable.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+def test_coded_index_matches_lookup_index(make_svm_artifact):
+    lookups = make_svm_artifact()["lookups"]
+    strings, tables = encode_lookup_tables(lookups)
+    coded = CodedLookupIndex(strings, tables)
+    plain = inference.LookupIndex(lookups)
+
+    for target in (-1, 0, 1, 2, 3, 50):
+        for instr in ("Prof A", "Prof B", "Nobody"):
+            group = {"Instructor": instr}
+            assert coded.get("instr_prior_count", group, target) == plain.get("instr_prior_count", group, target)
+
+    combo = {"CourseCode": "CS 146", "Instructor": "Prof A", "Slot": "TR_540_615", "Type": "LEC"}
+    assert coded.get("combo_last_term", combo, 1) is None      # stored NaN reads as missing
+    assert coded.get("combo_last_term", combo, 3) == 0.0
+    assert coded.get("missing", combo, 3) is None
+
+
+def test_coded_index_get_many_returns_nan_for_unknown_groups(make_svm_artifact):
+    coded = CodedLookupIndex(*encode_lookup_tables(make_svm_artifact()["lookups"]))
+    values = coded.get_many("instr_prior_count", {"Instructor": np.array(["Prof A", "Zed", "Prof B"])}, 3)
+    assert values[0] == 3.0
+    assert np.isnan(values[1])
+    assert values[2] == 2.0
+
+
+def test_encoded_groups_match_string_lookups(make_svm_artifact):
+    coded = CodedLookupIndex(*encode_lookup_tables(make_svm_artifact()["lookups"]))
+    groups = {"Instructor": np.array(["Prof A", "Zed", "Prof B"], dtype=object)}
+    encoded = coded.encode_groups(groups)
+
+    assert encoded["Instructor"][1] == -1
+    np.testing.assert_array_equal(
+        coded.get_many("instr_prior_count", encoded, 3),
+        coded.get_many("instr_prior_count", groups, 3),
+    )
+
+
+def test_tables_use_narrow_dtypes(make_svm_artifact):
+    strings, tables = encode_lookup_tables(make_svm_artifact()["lookups"])
+    _, _, _, keys, values = tables["instr_prior_count"]
+    assert keys.dtype == np.uint32
+    assert values.dtype == np.uint8
+    assert tables["combo_last_term"][4].dtype == np.float32     # NaN-bearing term column
+    assert strings.tolist() == sorted(strings.tolist())
+    assert strings.decode(strings.encode(["Prof B", "CS 146"])).tolist() == ["Prof B", "CS 146"]
+
+
+def test_string_dictionary_stores_utf8():
+    strings = StringDictionary.from_strings(["Zoë", "Ann", "Ann", ""])
+    assert len(strings) == 3
+    assert strings.tolist() == ["", "Ann", "Zoë"]
+    assert strings.data.nbytes == len("AnnZoë".encode("utf-8"))
+    assert strings.code("Zoë") == 2
+    assert strings.code("Nobody") == -1
+
+
+def test_write_and_read_round_trip_memory_maps_arrays(tmp_path, make_svm_artifact):
+    out = write_svm_artifact_v2(make_svm_artifact(), tmp_path / "svm_v2")
+    art = read_svm_artifact_v2(out)
+
+    assert art["format_version"] == 2
+    assert art["max_train_term"] == 2
+    assert art["serving_max_deviation"] == pytest.approx(0.01)
+    assert isinstance(art["serving_model"].coef, np.memmap)
+    assert isinstance(art["lookup_index"].strings.data, np.memmap)
+    assert art["lookup_index"].get("instr_prior_count", {"Instructor": "Prof A"}, 3) == 3.0
+    assert np.load(out / "model_categories_0.npy").dtype == np.int32
+    assert art["serving_model"].categories[0].tolist() == ["CS 146", "CS 151"]
+
+    candidates = [
+        {"course_number": "CS 146", "instructor_name": "Prof A", "days_text": "TR",
+         "start_time": "09:00AM", "end_time": "10:15AM"},
+    ]
+    X = inference.build_svm_matrix(candidates, art)
+    np.testing.assert_allclose(
+        art["serving_model"].predict_proba(X), make_svm_artifact()["serving_model"].predict_proba(X)
+    )
+
+
+def test_write_replaces_existing_directory(tmp_path, make_svm_artifact):
+    out = tmp_path / "svm_v2"
+    write_svm_artifact_v2(make_svm_artifact(), out)
+    art = make_svm_artifact()
+    art["max_train_term"] = 5
+    write_svm_artifact_v2(art, out)
+    assert read_svm_artifact_v2(out)["max_train_term"] == 5
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["svm_v2"]
+
+
+def test_open_svm_artifact_prefers_v2_and_falls_back_to_v1(tmp_path, make_svm_artifact):
+    joblib.dump(make_svm_artifact(), tmp_path / inference.SVM_ARTIFACT_V1)
+    with patch("ml.inference.ART_DIR", tmp_path):
+        v1 = inference.open_svm_artifact()
+        assert "lookups" in v1
+        assert v1["format_version"] == 1
+        assert v1["artifact_path"] == str(tmp_path / inference.SVM_ARTIFACT_V1)
+        assert isinstance(v1["lookup_index"], inference.LookupIndex)
+
+        write_svm_artifact_v2(make_svm_artifact(), tmp_path / inference.SVM_ARTIFACT_V2)
+        v2 = inference.open_svm_artifact()
+        assert v2["format_version"] == 2
+        assert v2["artifact_path"] == str(tmp_path / inference.SVM_ARTIFACT_V2)
+        assert isinstance(v2["lookup_index"], CodedLookupIndex)
+
+
+def test_score_table_round_trips_through_v2(tmp_path, make_svm_artifact):
+    art = make_svm_artifact()
+    art["score_table"] = pd.DataFrame(
+        {"CourseCode": ["CS 146"], "Instructor": ["Prof A"], "Slot": ["TR_540_615"], "Type": ["LEC"],
+         "SemesterIndex": [3], "prob_scheduled": [0.875]}
+    )
+    v2 = read_svm_artifact_v2(write_svm_artifact_v2(art, tmp_path / "svm_v2"))
+
+    groups = inference.candidate_groups([
+        {"course_number": "CS 146", "instructor_name": "Prof A", "days_text": "TR",
+         "start_time": "09:00AM", "end_time": "10:15AM"},
+        {"course_number": "CS 146", "instructor_name": "Prof B", "days_text": "TR",
+         "start_time": "09:00AM", "end_time": "10:15AM"},
+    ])
+    for loaded in (art, v2):
+        scores = inference.lookup_table_scores(groups, loaded)
+        assert scores[0] == 0.875
+        assert np.isnan(scores[1])
+
+
+def test_dept_models_round_trip_through_v2(tmp_path, make_svm_artifact):
+    art = make_svm_artifact()
+    cs_model = make_svm_artifact()["serving_model"]
+    object.__setattr__(cs_model, "intercept", np.array([2.0]))
+    art["dept_models"] = {"CS": cs_model}
+
+    out = write_svm_artifact_v2(art, tmp_path / "svm_v2")
+    v2 = read_svm_artifact_v2(out)
+
+    assert list(v2["dept_models"]) == ["CS"]
+    assert v2["dept_models"]["CS"].intercept.tolist() == [2.0]
+    assert v2["serving_model"].intercept.tolist() == [0.1]
+    candidates = [{"course_number": "CS 146", "instructor_name": "Prof A", "days_text": "TR",
+                   "start_time": "09:00AM", "end_time": "10:15AM"}]
+    np.testing.assert_allclose(
+        inference.score_probabilities(candidates, v2), inference.score_probabilities(candidates, art)
+    )
+    assert read_svm_artifact_v2(write_svm_artifact_v2(make_svm_artifact(), tmp_path / "plain"))["dept_models"] == {}
@@ -0,0 +1,134 @@
+from ml import batching
+import asyncio
+import os
+import sys
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+# Ensure backend directory is importable.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+def _fake_score(rows, art):
+    return [{**r, "prob_scheduled": r["p"], "artifact_version": art["artifact_version"]} for r in rows]
+
+
+def _rows(*ps):
+    return [{"p": p} for p in ps]
+
+
+def test_concurrent_calls_share_one_model_call():
+    score_fn = MagicMock(side_effect=_fake_score)
+    batcher = batching.MicroBatcher(window_ms=5, max_batch=100, score_fn=score_fn)
+    art = {"artifact_version": "v1"}
+
+    async def run():
+        return await asyncio.gather(
+            batcher.score(_rows(0.1, 0.2), art),
+            batcher.score(_rows(0.3), art),
+            batcher.score(_rows(0.4, 0.5, 0.6), art),
+        )
+
+    first, second, third = asyncio.run(run())
+
+    assert score_fn.call_count == 1
+    assert [r["prob_scheduled"] for r in first] == [0.1, 0.2]
+    assert [r["prob_scheduled"] for r in second] == [0.3]
+    assert [r["prob_scheduled"] for r in third] == [0.4, 0.5, 0.6]
+    stats = batcher.stats()
+    assert stats["batches"] == 1
+    assert stats["calls"] == 3
+    assert stats["rows"] == 6
+    assert stats["window_flushes"] == 1
+    assert stats["mean_fill"] == 0.06
+
+
+def test_full_batch_flushes_without_waiting_for_window():
+    score_fn = MagicMock(side_effect=_fake_score)
+    batcher = batching.MicroBatcher(window_ms=60_000, max_batch=3, score_fn=score_fn)
+    art = {"artifact_version": "v1"}
+
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(batcher.score(_rows(0.1), art), batcher.score(_rows(0.2, 0.3), art)),
+            timeout=1,
+        )
+
+    first, second = asyncio.run(run())
+
+    assert score_fn.call_count == 1
+    assert [r["prob_scheduled"] for r in second] == [0.2, 0.3]
+    assert batcher.stats()["size_flushes"] == 1
+
+
+def test_rows_for_different_artifacts_are_scored_separately():
+    score_fn = MagicMock(side_effect=_fake_score)
+    batcher = batching.MicroBatcher(window_ms=5, score_fn=score_fn)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.score(_rows(0.1), {"artifact_version": "old"}),
+            batcher.score(_rows(0.2), {"artifact_version": "new"}),
+        )
+
+    old, new = asyncio.run(run())
+
+    assert score_fn.call_count == 2
+    assert old[0]["artifact_version"] == "old"
+    assert new[0]["artifact_version"] == "new"
+
+
+def test_scoring_error_reaches_every_caller():
+    batcher = batching.MicroBatcher(window_ms=5, score_fn=MagicMock(side_effect=ValueError("boom")))
+    art = {"artifact_version": "v1"}
+
+    async def run():
+        return await asyncio.gather(batcher.score(_rows(0.1), art), batcher.score(_rows(0.2), art), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_scoring_runs_off_the_event_loop():
+    loop_thread = []
+
+    def score_fn(rows, art):
+        # The batch must not be scored on the event loop's thread.
+        assert threading.get_ident() != loop_thread[0]
+        return _fake_score(rows, art)
+
+    batcher = batching.MicroBatcher(window_ms=1, score_fn=score_fn)
+
+    async def run():
+        loop_thread.append(threading.get_ident())
+        return await batcher.score(_rows(0.1), {"artifact_version": "v1"})
+
+    assert asyncio.run(run())[0]["prob_scheduled"] == 0.1
+
+
+def test_empty_candidates_skip_the_batcher():
+    score_fn = MagicMock()
+    batcher = batching.MicroBatcher(window_ms=5, score_fn=score_fn)
+    assert asyncio.run(batcher.score([], {})) == []
+    score_fn.assert_not_called()
+
+
+@pytest.mark.parametrize("value", [None, "0", ""])
+def test_get_batcher_is_opt_in(monkeypatch, value):
+    if value is None:
+        monkeypatch.delenv("SCORING_BATCH_WINDOW_MS", raising=False)
+    else:
+        monkeypatch.setenv("SCORING_BATCH_WINDOW_MS", value)
+    assert batching.get_batcher() is None
+
+
+def test_get_batcher_reads_window_and_max_batch(monkeypatch):
+    monkeypatch.setattr(batching, "_BATCHER", None)
+    monkeypatch.setenv("SCORING_BATCH_WINDOW_MS", "3")
+    monkeypatch.setenv("SCORING_MAX_BATCH", "512")
+    batcher = batching.get_batcher()
+    assert batcher.window == 0.003
+    assert batcher.max_batch == 512
+    assert batching.get_batcher() is batcher
@@ -0,0 +1,54 @@
+from ml.bench_models import FrequencyScorer, format_table, make_logreg_pipeline, serving_cost
+from ml.train_ant import temporal_split
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Ensure backend directory is importable.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+def _labeled(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        "CourseCode": rng.choice(["CS 146", "CS 151", "MATH 42"], n),
+        "Instructor": rng.choice(["A", "B", "C", "D"], n),
+        "Slot": rng.choice(["MW_540_615", "TR_540_615"], n),
+        "count_log1p": rng.random(n),
+    })
+    # Instructor A is always scheduled, the rest rarely.
+    y = ((X["Instructor"] == "A") | (rng.random(n) < 0.1)).astype(int)
+    return X, y
+
+
+def test_temporal_split_holds_out_last_two_terms():
+    df = pd.DataFrame({"SemesterIndex": [0, 1, 2, 3, 3, 2], "Scheduled": [1, 0, 1, 1, 0, 1]})
+    all_terms, train_mask, test_mask = temporal_split(df)
+    assert list(all_terms) == [0, 1, 2, 3]
+    assert train_mask.tolist() == [True, True, False, False, False, False]
+    assert (train_mask ^ test_mask).all()
+
+
+def test_frequency_scorer_returns_binary_probabilities():
+    X, y = _labeled()
+    proba = FrequencyScorer(["CourseCode", "Instructor", "Slot"]).fit(X, y).predict_proba(X)
+
+    assert proba.shape == (len(X), 2)
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+    by_instr = pd.Series(proba[:, 1]).groupby(X["Instructor"]).mean()
+    assert by_instr.idxmax() == "A"
+
+
+def test_serving_cost_reports_size_load_time_and_latency_per_batch():
+    X, y = _labeled()
+    model = make_logreg_pipeline(["CourseCode", "Instructor", "Slot"], ["count_log1p"]).fit(X, y)
+    cost = serving_cost(model, X, batch_sizes=[1, 500])
+
+    assert cost["artifact_kib"] > 0 and cost["load_ms"] > 0
+    assert set(cost["latency"]) == {"1", "500"}
+    assert cost["latency"]["500"]["p50_us"] > 0
+
+    table = format_table({"models": {"logreg": {"roc_auc": 0.9, "pr_auc": 0.8, **cost}}})
+    assert "logreg" in table and "p50us@500" in table
@@ -0,0 +1,41 @@
+from benchmarks import inference_bench
+from benchmarks.synthetic import Scale, make_artifact, make_candidates
+from ml import inference
+import json
+import os
+import sys
+
+# Ensure backend directory is importable.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+SMALL = Scale(courses=6, instructors=12, terms=3, candidates_per_course=4, departments=2)
+
+
+def test_synthetic_artifact_scores_synthetic_candidates():
+    art = make_artifact(SMALL)
+    by_course = make_candidates(SMALL)
+
+    assert set(art["lookups"]) == {c for c, _ in inference.COUNT_DEFS + inference.RECENCY_DEFS}
+    assert len(by_course) == 6
+    scored = inference.score_candidates(by_course["D00 100"], art)
+    assert len(scored) == 4
+    assert all(0.0 <= c["prob_scheduled"] <= 1.0 for c in scored)
+
+
+def test_run_reports_percentiles_for_every_stage():
+    report = inference_bench.run(SMALL, iterations=3, warmup=1, request_courses=2)
+
+    assert set(report["stages"]) == set(inference_bench.STAGES)
+    assert report["scale"]["request_candidates"] == 8
+    for stats in report["stages"].values():
+        assert stats["p50_us"] <= stats["p95_us"] <= stats["p99_us"]
+        assert "peak_alloc_kib" in stats
+    json.dumps(report)
+
+
+def test_regressions_flag_only_stages_slower_than_allowed():
+    baseline = {"stages": {"a": {"p50_us": 100.0}, "b": {"p50_us": 100.0}}}
+    report = {"stages": {"a": {"p50_us": 120.0}, "b": {"p50_us": 180.0}, "c": {"p50_us": 5.0}}}
+    slower = inference_bench.regressions(report, baseline, 0.25)
+    assert len(slower) == 1 and slower[0].startswith("b:")
@@ -0,0 +1,45 @@
+from candidate_cache import CourseCandidateCache
+import os
+import sys
+
+# Ensure backend directory is importable.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+def test_get_counts_hits_and_misses():
+    cache = CourseCandidateCache(maxsize=4)
+    assert cache.get(("CS 146", "v1", "10:10")) is None
+    cache.put(("CS 146", "v1", "10:10"), (["a"], []))
+    assert cache.get(("CS 146", "v1", "10:10")) == (["a"], [])
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_new_artifact_or_data_version_is_a_different_key():
+    cache = CourseCandidateCache()
+    cache.put(("CS 146", "v1", "10:10"), (["a"], []))
+    assert cache.get(("CS 146", "v2", "10:10")) is None
+    assert cache.get(("CS 146", "v1", "11:11")) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = CourseCandidateCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_zero_size_disables_caching():
+    cache = CourseCandidateCache(maxsize=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
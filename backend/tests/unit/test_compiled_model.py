@@ -0,0 +1,132 @@
+from ml.compiled_model import (
+    CompiledLinearModel,
+    compile_svm_pipeline,
+    fold_calibrated_ensemble,
+    max_probability_deviation,
+)
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.svm import LinearSVC
+
+# Ensure backend directory is importable.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+CAT_COLS = ["CourseCode", "Instructor"]
+NUM_COLS = ["count_log1p", "terms_since"]
+
+
+def _training_frame(n=120, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(
+        {
+            "CourseCode": rng.choice(["CS 146", "CS 151", "CS 166"], n),
+            "Instructor": rng.choice(["Prof A", "Prof B", "Prof C", "Prof D"], n),
+            "count_log1p": rng.random(n) * 3,
+            "terms_since": rng.integers(0, 6, n),
+        }
+    )
+    y = ((X["count_log1p"] > 1.5) ^ (X["Instructor"] == "Prof B")).astype(int)
+    return X, y
+
+
+def _fit_pipeline(cv=3):
+    X, y = _training_frame()
+    prep = ColumnTransformer(
+        transformers=[
+            ("cat", OneHotEncoder(handle_unknown="ignore"), CAT_COLS),
+            ("num", StandardScaler(with_mean=False), NUM_COLS),
+        ],
+        remainder="drop",
+    )
+    clf = CalibratedClassifierCV(estimator=LinearSVC(class_weight="balanced"), method="sigmoid", cv=cv)
+    return Pipeline(steps=[("prep", prep), ("clf", clf)]).fit(X, y)
+
+
+def test_compiled_model_matches_pipeline_probabilities():
+    pipe = _fit_pipeline()
+    compiled = compile_svm_pipeline(pipe)
+    X, _ = _training_frame(n=40, seed=1)
+
+    assert isinstance(compiled, CompiledLinearModel)
+    assert compiled.n_models == 3
+    np.testing.assert_allclose(compiled.predict_proba(X), pipe.predict_proba(X), atol=1e-12)
+
+
+def test_compiled_model_ignores_unseen_categories_like_one_hot_encoder():
+    pipe = _fit_pipeline()
+    compiled = compile_svm_pipeline(pipe)
+    X = pd.DataFrame(
+        {
+            "CourseCode": ["CS 999", "CS 146"],
+            "Instructor": ["Nobody", "Zed Unknown"],
+            "count_log1p": [0.5, 2.0],
+            "terms_since": [1, 7],
+        }
+    )
+    np.testing.assert_allclose(compiled.predict_proba(X), pipe.predict_proba(X), atol=1e-12)
+
+
+def test_compiled_model_accepts_dict_of_columns():
+    pipe = _fit_pipeline()
+    compiled = compile_svm_pipeline(pipe)
+    X, _ = _training_frame(n=5, seed=2)
+    as_dict = {c: X[c].to_numpy() for c in X.columns}
+    np.testing.assert_allclose(compiled.predict_proba(as_dict), pipe.predict_proba(X), atol=1e-12)
+
+
+def test_compiled_model_pickles_categories_as_plain_strings():
+    pipe = _fit_pipeline()
+    compiled = compile_svm_pipeline(pipe)
+    state = compiled.__getstate__()
+    assert all(isinstance(cats, list) for cats in state["categories"])
+
+    restored = pickle.loads(pickle.dumps(compiled))
+    assert restored.categories[1].dtype.kind == "U"
+    X, _ = _training_frame(n=20, seed=3)
+    np.testing.assert_array_equal(restored.predict_proba(X), compiled.predict_proba(X))
+
+
+def test_compile_rejects_unsupported_models():
+    X, y = _training_frame()
+    with pytest.raises(ValueError):
+        compile_svm_pipeline(object())
+    plain = Pipeline(
+        steps=[
+            ("prep", ColumnTransformer([("num", StandardScaler(with_mean=False), NUM_COLS)])),
+            ("clf", LogisticRegression()),
+        ]
+    ).fit(X, y)
+    with pytest.raises(ValueError):
+        compile_svm_pipeline(plain)
+
+
+def test_fold_calibrated_ensemble_produces_single_close_model():
+    pipe = _fit_pipeline()
+    compiled = compile_svm_pipeline(pipe)
+    X_fit, _ = _training_frame()
+    X_holdout, _ = _training_frame(n=60, seed=3)
+
+    folded = fold_calibrated_ensemble(compiled, X_fit)
+
+    assert folded.n_models == 1
+    assert folded.coef.shape == (1, compiled.coef.shape[1])
+    assert max_probability_deviation(compiled, folded, X_holdout) < 0.1
+    proba = folded.predict_proba(X_holdout)
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+
+
+def test_fold_single_model_is_identity():
+    compiled = compile_svm_pipeline(_fit_pipeline(cv=2))
+    folded = fold_calibrated_ensemble(compiled, _training_frame()[0])
+    assert fold_calibrated_ensemble(folded, _training_frame()[0]) is folded
@@ -0,0 +1,141 @@
+from ml import executor, inference
+from ml.artifact_v2 import write_svm_artifact_v2
+import os
+import sys
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+import asyncio
+
+import numpy as np
+
+# Ensure backend directory is importable.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+def _candidates(n):
+    return [
+        {"course_number": "CS 146", "instructor_name": "Prof A" if i % 2 else "Prof B", "days_text": "TR",
+         "start_time": "09:00AM", "end_time": "10:15AM"}
+        for i in range(n)
+    ]
+
+
+def test_small_batches_and_unsaved_artifacts_stay_in_process():
+    ex = executor.ScoringExecutor(workers=2, min_batch=10)
+    assert ex.score(_candidates(5), {"artifact_path": "/x"}) is None
+    assert ex.score(_candidates(20), {}) is None
+    assert ex._pool is None
+
+
+def test_pool_results_match_in_process_scoring(tmp_path, make_svm_artifact):
+    path = write_svm_artifact_v2(make_svm_artifact(), tmp_path / "svm_v2")
+    art = inference.open_svm_artifact_path(path)
+    candidates = _candidates(7)
+    ex = executor.ScoringExecutor(workers=1, min_batch=2, chunk_size=3)
+    try:
+        proba = ex.score(candidates, art)
+    finally:
+        ex.shutdown()
+
+    np.testing.assert_array_equal(proba, inference.score_probabilities(candidates, art))
+    assert ex.stats()["chunks"] == 1      # one worker: no point splitting
+    assert ex.stats()["rows"] == 7
+
+
+def test_stale_artifact_version_falls_back_to_in_process(tmp_path, make_svm_artifact):
+    path = write_svm_artifact_v2(make_svm_artifact(), tmp_path / "svm_v2")
+    art = inference.open_svm_artifact_path(path)
+    art["artifact_version"] = "not-the-checksum"
+    ex = executor.ScoringExecutor(workers=1, min_batch=1)
+    try:
+        assert ex.score(_candidates(3), art) is None
+    finally:
+        ex.shutdown()
+    assert ex.stats()["fallbacks"] == 1
+
+
+def test_score_candidates_uses_executor_results_when_available():
+    art = {"artifact_version": "v1"}
+    pool = MagicMock()
+    pool.score.return_value = np.array([0.12345, 0.9])
+    with patch("ml.inference.get_scoring_executor", return_value=pool):
+        result = inference.score_candidates(_candidates(2), art)
+    assert [r["prob_scheduled"] for r in result] == [0.1235, 0.9]
+    assert result[0]["artifact_version"] == "v1"
+
+
+def test_get_scoring_executor_is_opt_in(monkeypatch):
+    monkeypatch.setattr(executor, "_EXECUTOR", None)
+    monkeypatch.delenv("SCORING_WORKERS", raising=False)
+    assert executor.get_scoring_executor() is None
+
+    monkeypatch.setenv("SCORING_WORKERS", "3")
+    monkeypatch.setenv("SCORING_MIN_POOL_BATCH", "100")
+    ex = executor.get_scoring_executor()
+    assert ex.workers == 3
+    assert ex.min_batch == 100
+    assert executor.get_scoring_executor() is ex
+    monkeypatch.setattr(executor, "_EXECUTOR", None)
+
+
+def test_batches_split_into_one_chunk_per_worker_above_chunk_size():
+    ex = executor.ScoringExecutor(workers=4, min_batch=1, chunk_size=100)
+    pool = MagicMock()
+    pool.submit.side_effect = lambda fn, path, version, chunk: MagicMock(result=MagicMock(return_value=np.zeros(len(chunk))))
+    with patch.object(ex, "_get_pool", return_value=pool):
+        proba = ex.score(_candidates(1000), {"artifact_path": "/x", "artifact_version": "v1"})
+        ex.score(_candidates(150), {"artifact_path": "/x", "artifact_version": "v1"})
+    assert len(proba) == 1000
+    sizes = [len(c.args[3]) for c in pool.submit.call_args_list]
+    assert sizes == [250, 250, 250, 250, 100, 50]
+
+
+def _done_future(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def test_score_async_awaits_worker_futures():
+    ex = executor.ScoringExecutor(workers=2, min_batch=4, chunk_size=2)
+    pool = MagicMock()
+    pool.submit.side_effect = lambda fn, path, version, chunk: _done_future(np.full(len(chunk), 0.5))
+    with patch.object(ex, "_get_pool", return_value=pool):
+        proba = asyncio.run(ex.score_async(_candidates(6), {"artifact_path": "/x", "artifact_version": "v1"}))
+        small = asyncio.run(ex.score_async(_candidates(3), {"artifact_path": "/x"}))
+    assert proba.tolist() == [0.5] * 6
+    assert small is None
+    assert ex.stats()["chunks"] == 2
+
+
+def test_score_async_falls_back_when_the_pool_breaks():
+    ex = executor.ScoringExecutor(workers=1, min_batch=1)
+    failed = Future()
+    failed.set_exception(executor.BrokenProcessPool("worker died"))
+    pool = MagicMock()
+    pool.submit.return_value = failed
+    with patch.object(ex, "_get_pool", return_value=pool):
+        assert asyncio.run(ex.score_async(_candidates(2), {"artifact_path": "/x"})) is None
+    assert ex.stats()["fallbacks"] == 1
+
+
+def test_score_candidates_async_scores_in_process_without_executor():
+    art = {"artifact_version": "v1"}
+    with patch("ml.inference.get_scoring_executor", return_value=None), \
+            patch("ml.inference.score_probabilities", return_value=np.array([0.25, 0.75])) as mock_proba:
+        result = asyncio.run(inference.score_candidates_async(_candidates(2), art))
+    mock_proba.assert_called_once()
+    assert [r["prob_scheduled"] for r in result] == [0.25, 0.75]
+
+
+def test_worker_keeps_one_artifact_per_path_up_to_the_limit(tmp_path, make_svm_artifact, monkeypatch):
+    monkeypatch.setenv("SCORING_WORKER_ARTIFACTS", "2")
+    monkeypatch.setattr(executor, "_WORKER_ARTS", executor.OrderedDict())
+    paths = [str(write_svm_artifact_v2(make_svm_artifact(), tmp_path / name)) for name in ("a", "b", "c")]
+
+    first = executor._worker_artifact(paths[0], None)
+    executor._worker_artifact(paths[1], None)
+    assert executor._worker_artifact(paths[0], None) is first
+    executor._worker_artifact(paths[2], None)
+
+    assert list(executor._WORKER_ARTS) == [paths[0], paths[2]]
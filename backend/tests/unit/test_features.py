@@ -0,0 +1,80 @@
+from ml import features
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure backend directory is importable.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+@pytest.mark.parametrize(
+    "times, expected",
+    [
+        ("09:00AM-10:15AM", (540, 615, 75)),
+        ("12:00PM-01:15PM", (720, 795, 75)),
+        ("12:30AM-01:00AM", (30, 60, 30)),
+        ("9:05PM-10:00PM", (1265, 1320, 55)),
+        (" 01:30PM-02:45PM ", (810, 885, 75)),
+        ("TBA", (-1, -1, -1)),
+        ("", (-1, -1, -1)),
+        ("09:00AM-later", (-1, -1, -1)),
+        ("13:00PM-14:00PM", (-1, -1, -1)),
+        (float("nan"), (-1, -1, -1)),
+    ],
+)
+def test_parse_time_range_scalar(times, expected):
+    assert features.parse_time_range(times) == expected
+
+
+def test_clock_to_minutes_accepts_space_before_meridiem():
+    assert features.clock_to_minutes("09:00 AM") == 540
+    assert features.clock_to_minutes("TBA") == -1
+
+
+@pytest.mark.parametrize(
+    "section, expected",
+    [
+        ("CS 146 (Section 01)", ("CS", "CS 146")),
+        ("  MATH 42 ", ("MATH", "MATH 42")),
+        ("CS", ("Unknown", "Unknown Unknown")),
+        ("", ("Unknown", "Unknown Unknown")),
+    ],
+)
+def test_section_to_course_code_scalar(section, expected):
+    assert features.section_to_course_code(section) == expected
+
+
+def test_batch_helpers_match_scalar_helpers():
+    times = ["09:00AM-10:15AM", "TBA", "09:00AM-10:15AM", float("nan"), "12:00PM-01:15PM"]
+    sections = ["CS 146 (Section 01)", "MATH 42", "bogus", None]
+    locations = ["ENG325", "ONLINE", "Unknown", "123", float("nan"), "ENG325"]
+    satisfies = ["GE: B4", "MajorOnly", None]
+
+    np.testing.assert_array_equal(
+        features.parse_time_range_batch(pd.Series(times)),
+        np.array([features.parse_time_range(t) for t in times]),
+    )
+    dept, code = features.section_to_course_code_batch(sections)
+    assert list(zip(dept, code)) == [features.section_to_course_code(s) for s in sections]
+    assert features.get_building_batch(locations).tolist() == [features.get_building(x) for x in locations]
+    assert features.has_ge_batch(satisfies).tolist() == [features.has_ge(x) for x in satisfies]
+    assert features.make_slot_batch(["MW ", "TR"], [540, -1]).tolist() == [
+        features.make_slot("MW ", 540), features.make_slot("TR", -1)
+    ]
+
+
+def test_batch_helpers_accept_empty_columns():
+    assert features.parse_time_range_batch([]).shape == (0, 3)
+    assert features.get_building_batch([]).shape == (0,)
+
+
+def test_module_imports_without_pandas():
+    code = "import sys; import ml.features; print('pandas' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
@@ -0,0 +1,99 @@
+from ml.freq_topk import FrequencyTopK
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure backend directory is importable.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+def _toy():
+    X = pd.DataFrame({
+        "Dept": ["x"] * 7 + ["y"],
+        "Level": ["1", "1", "1", "1", "2", "2", "2", "1"],
+    })
+    y = ["A", "A", "A", "B", "B", "B", "B", "C"]
+    return X, y
+
+
+def test_smoothed_probabilities_back_off_through_parents():
+    X, y = _toy()
+    model = FrequencyTopK(["Dept", "Level"], k=3, alpha=1.0).fit(X, y)
+
+    # global: A 3/8, B 4/8, C 1/8; (x): (n + p_global) / (7 + 1); (x,1): (n + p_x) / (4 + 1)
+    p_x = {"A": (3 + 3 / 8) / 8, "B": (4 + 4 / 8) / 8, "C": (1 / 8) / 8}
+    expected = {label: (n + p_x[label]) / 5 for label, n in {"A": 3, "B": 1, "C": 0}.items()}
+    [[(l1, p1), (l2, p2), (l3, p3)]] = model.predict_topk(pd.DataFrame({"Dept": ["x"], "Level": ["1"]}))
+    assert (l1, l2, l3) == ("A", "B", "C")
+    assert [p1, p2, p3] == pytest.approx([expected["A"], expected["B"], expected["C"]], rel=1e-6)
+
+
+def test_unseen_contexts_use_the_longest_seen_prefix():
+    X, y = _toy()
+    model = FrequencyTopK(["Dept", "Level"], k=3).fit(X, y)
+    queries = pd.DataFrame({"Dept": ["x", "zzz"], "Level": ["9", "1"]})
+    labels, probs = model.predict_topk_arrays(queries)
+
+    # (x, 9) unseen -> (x); (zzz) unseen -> global prior
+    assert labels[0].tolist() == ["B", "A", "C"]
+    assert probs[0] == pytest.approx([4.5 / 8, 3.375 / 8, 0.125 / 8])
+    assert labels[1].tolist() == ["B", "A", "C"]
+    assert probs[1] == pytest.approx([0.5, 0.375, 0.125])
+
+
+def test_topk_matches_brute_force_distribution():
+    rng = np.random.default_rng(0)
+    n = 600
+    X = pd.DataFrame({"a": rng.integers(0, 4, n).astype(str), "b": rng.integers(0, 6, n).astype(str)})
+    y = rng.choice([f"L{i}" for i in range(25)], size=n, p=np.r_[np.full(5, 0.16), np.full(20, 0.01)])
+    alpha, k = 2.0, 5
+    model = FrequencyTopK(["a", "b"], k=k, alpha=alpha).fit(X, y)
+
+    classes = np.unique(y)
+    onehot = (y[:, None] == classes[None, :]).astype(float)
+    p_global = onehot.mean(axis=0)
+    for a in X["a"].unique()[:2]:
+        in_a = (X["a"] == a).to_numpy()
+        p_a = (onehot[in_a].sum(axis=0) + alpha * p_global) / (in_a.sum() + alpha)
+        for b in X["b"].unique()[:3]:
+            in_ab = in_a & (X["b"] == b).to_numpy()
+            p_ab = (onehot[in_ab].sum(axis=0) + alpha * p_a) / (in_ab.sum() + alpha)
+            [labels], [probs] = model.predict_topk_arrays(pd.DataFrame({"a": [a], "b": [b]}))
+            assert probs == pytest.approx(np.sort(p_ab)[::-1][:k], rel=1e-5)
+            assert set(labels) <= set(classes[p_ab >= np.sort(p_ab)[::-1][k - 1] - 1e-9])
+
+
+def test_predict_shapes_and_short_lists():
+    X, y = _toy()
+    model = FrequencyTopK(["Dept"], k=5).fit(X, y)
+    queries = pd.DataFrame({"Dept": ["x", "y", "x"]})
+
+    labels, probs = model.predict_topk_arrays(queries)
+    assert labels.shape == probs.shape == (3, 5)
+    assert labels[0, 3:].tolist() == ["", ""]                  # only 3 classes exist
+    assert model.predict(queries).tolist() == ["B", "C", "B"]
+    assert [len(row) for row in model.predict_topk(queries, k=2)] == [2, 2, 2]
+
+
+def test_term_decay_favours_recent_terms():
+    X = pd.DataFrame({"Dept": ["x"] * 4})
+    y = ["old", "old", "old", "new"]
+    terms = [0, 0, 0, 5]
+    assert FrequencyTopK(["Dept"]).fit(X, y, terms=terms).predict(X[:1])[0] == "old"
+    assert FrequencyTopK(["Dept"], decay=0.5).fit(X, y, terms=terms).predict(X[:1])[0] == "new"
+
+
+def test_pickled_predictor_stays_small():
+    rng = np.random.default_rng(1)
+    n = 5000
+    X = pd.DataFrame({"a": rng.integers(0, 50, n).astype(str), "b": rng.integers(0, 20, n).astype(str)})
+    y = rng.integers(0, 500, n).astype(str)
+    model = FrequencyTopK(["a", "b"], k=10).fit(X, y)
+    # ~1000 contexts x 10 (int32 + float32) plus the class names and dict keys.
+    assert len(pickle.dumps(model)) < 300_000
+    restored = pickle.loads(pickle.dumps(model))
+    np.testing.assert_array_equal(restored.predict(X[:50]), model.predict(X[:50]))
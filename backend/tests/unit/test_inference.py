@@ -173,15 +173,38 @@ def test_load_artifact_missing_file_raises():
                 assert "Missing model artifact" in str(exc)
 
 
-@patch("ml.inference.load_artifact")
-def test_load_svm_artifact_uses_cache(mock_load):
-    inference._SVM_CACHE = None
-    mock_load.return_value = {"model": "m"}
-    first = inference.load_svm_artifact()
-    second = inference.load_svm_artifact()
-    assert first == second
-    assert mock_load.call_count == 1
-    inference._SVM_CACHE = None
+def test_get_lookup_index_builds_once_and_caches_on_artifact():
+    art = _sample_artifact()
+    first = inference.get_lookup_index(art)
+    assert isinstance(first, inference.LookupIndex)
+    assert inference.get_lookup_index(art) is first
+    assert art["lookup_index"] is first
+
+
+def test_lookup_index_returns_latest_value_strictly_before_target():
+    lookups = {
+        "instr_prior_count": pd.DataFrame(
+            [
+                {"Instructor": "Prof A", "SemesterIndex": 3, "instr_prior_count": 5},
+                {"Instructor": "Prof A", "SemesterIndex": 0, "instr_prior_count": 1},
+                {"Instructor": "Prof B", "SemesterIndex": 1, "instr_prior_count": 7},
+            ]
+        )
+    }
+    index = inference.LookupIndex(lookups)
+    group = {"Instructor": "Prof A"}
+    assert index.get("instr_prior_count", group, 0) is None
+    assert index.get("instr_prior_count", group, 3) == 1
+    assert index.get("instr_prior_count", group, 4) == 5
+    assert index.get("instr_prior_count", {"Instructor": "Prof C"}, 4) is None
+    assert index.get("instr_prior_count", {"Dept": "CS"}, 4) is None
+    assert index.get("missing", group, 4) is None
+
+
+def test_lookup_last_term_unknown_group_returns_default():
+    index = inference.LookupIndex(_sample_lookups())
+    value = inference._lookup_last_term(index, "instr_last_term", {"Instructor": "Nobody"}, 2)
+    assert value == 3
 
 
 def test_parse_time_to_minutes_valid_and_invalid():
@@ -209,6 +232,36 @@ def test_build_svm_row_with_tba_slot():
     assert row["Slot"].endswith("_TBA")
 
 
+def test_build_svm_matrix_matches_build_svm_row():
+    art = _sample_artifact()
+    tba = {**_candidate(), "start_time": "TBA", "end_time": "TBA"}
+    unknown = {"course_number": "", "instructor_name": "Nobody", "days_text": "MW"}
+    candidates = [_candidate(), tba, unknown, {**_candidate(), "type": "LAB"}]
+
+    matrix = inference.build_svm_matrix(candidates, art)
+    expected = pd.DataFrame([inference.build_svm_row(c, art) for c in candidates])
+
+    assert list(matrix.columns) == art["cat_cols"] + art["num_cols"]
+    for col in art["cat_cols"]:
+        assert matrix[col].tolist() == expected[col].tolist()
+    for col in art["num_cols"]:
+        np.testing.assert_allclose(matrix[col].to_numpy(dtype=float), expected[col].to_numpy(dtype=float))
+
+
+def test_get_serving_model_falls_back_to_raw_model_and_caches():
+    art = _sample_artifact()
+    model = inference.get_serving_model(art)
+    assert model is art["model"]
+    assert art["compiled_model"] is model
+
+
+def test_get_serving_model_prefers_folded_serving_model():
+    art = _sample_artifact()
+    folded = MagicMock()
+    art["serving_model"] = folded
+    assert inference.get_serving_model(art) is folded
+
+
 def test_score_candidates_empty_input_returns_empty_list():
     art = _sample_artifact()
     assert inference.score_candidates([], art) == []
@@ -222,3 +275,96 @@ def test_score_candidates_adds_probabilities():
     assert "prob_scheduled" in result[0]
     assert result[0]["prob_scheduled"] == 0.8
     assert result[1]["prob_scheduled"] == 0.3
+
+
+def test_score_candidates_reports_artifact_version():
+    art = _sample_artifact()
+    art["artifact_version"] = "abc123"
+    art["model"].predict_proba.return_value = np.array([[0.2, 0.8]])
+    result = inference.score_candidates([_candidate()], art)
+    assert result[0]["artifact_version"] == "abc123"
+
+
+def _score_table(prob):
+    return pd.DataFrame(
+        [{"CourseCode": "CS 146", "Instructor": "Prof A", "Slot": "TR_540_615", "Type": "LEC",
+          "SemesterIndex": 3, "prob_scheduled": prob}]
+    )
+
+
+def test_score_candidates_serves_score_table_hits_without_the_model():
+    art = _sample_artifact()
+    art["score_table"] = _score_table(0.91234)
+    result = inference.score_candidates([_candidate()], art)
+    assert result[0]["prob_scheduled"] == 0.9123
+    art["model"].predict_proba.assert_not_called()
+
+
+def test_score_candidates_sends_only_score_table_misses_to_the_model():
+    art = _sample_artifact()
+    art["score_table"] = _score_table(0.5)
+    art["model"].predict_proba.return_value = np.array([[0.8, 0.2]])
+    candidates = [_candidate(), {**_candidate(), "instructor_name": "Prof B"}]
+
+    result = inference.score_candidates(candidates, art)
+
+    assert [r["prob_scheduled"] for r in result] == [0.5, 0.2]
+    X = art["model"].predict_proba.call_args[0][0]
+    assert X["Instructor"].tolist() == ["Prof B"]
+
+
+def _constant_model(p):
+    model = MagicMock()
+    model.predict_proba.side_effect = lambda X: np.tile([1.0 - p, p], (len(X["CourseCode"]), 1))
+    return model
+
+
+def test_routed_predict_proba_uses_department_models_with_global_fallback():
+    X = pd.DataFrame({"CourseCode": ["CS 146", "MATH 42", "CS 151", "ART 1"], "x": [0.0] * 4})
+    depts = ["CS", "MATH", "CS", "ART"]
+    global_model, cs_model, math_model = _constant_model(0.1), _constant_model(0.7), _constant_model(0.4)
+
+    proba = inference.routed_predict_proba(X, depts, global_model, {"CS": cs_model, "MATH": math_model})
+
+    np.testing.assert_allclose(proba, [0.7, 0.4, 0.7, 0.1])
+    assert cs_model.predict_proba.call_count == 1
+    assert global_model.predict_proba.call_args[0][0]["CourseCode"].tolist() == ["ART 1"]
+    np.testing.assert_allclose(inference.routed_predict_proba(X, depts, global_model, {}), [0.1] * 4)
+
+
+def test_score_candidates_routes_model_misses_by_department():
+    art = _sample_artifact()
+    art["dept_models"] = {"CS": _constant_model(0.65)}
+    result = inference.score_candidates([_candidate()], art)
+    assert result[0]["prob_scheduled"] == 0.65
+    art["model"].predict_proba.assert_not_called()
+
+
+def test_topk_from_proba_matches_full_sort():
+    rng = np.random.default_rng(0)
+    proba = rng.random((50, 40))
+    classes = np.array([f"c{i}" for i in range(40)])
+    labels, probs = inference.topk_from_proba(proba, classes, 5)
+
+    order = np.argsort(-proba, axis=1)[:, :5]
+    np.testing.assert_array_equal(labels, classes[order])
+    np.testing.assert_allclose(probs, np.take_along_axis(proba, order, axis=1))
+
+
+def test_topk_from_proba_caps_k_at_class_count():
+    labels, probs = inference.topk_from_proba(np.array([[0.2, 0.8]]), np.array(["a", "b"]), 5)
+    assert labels.tolist() == [["b", "a"]]
+    assert probs.tolist() == [[0.8, 0.2]]
+
+
+def test_predict_topk_uses_pipeline_or_frequency_predictor():
+    pipeline = MagicMock()
+    pipeline.classes_ = np.array(["x", "y", "z"])
+    pipeline.predict_proba.return_value = np.array([[0.1, 0.3, 0.6]])
+    labels, _ = inference.predict_topk({"pipeline": pipeline}, pd.DataFrame({"a": [1]}), 2)
+    assert labels.tolist() == [["z", "y"]]
+
+    predictor = MagicMock()
+    predictor.predict_topk_arrays.return_value = ("labels", "probs")
+    assert inference.predict_topk({"predictor": predictor}, "X", 2) == ("labels", "probs")
+    predictor.predict_topk_arrays.assert_called_once_with("X", 2)
@@ -3,10 +3,14 @@ from ml.ml_router import (
     ScheduledCandidateContext,
     _lookup_count,
     _lookup_last_term,
+    InstructorContext,
     build_features_AB,
+    build_features_AB_batch,
+    build_features_C_batch,
     build_features_svm,
 )
 from ml.features import SemesterIndexConfig
+from ml.inference import LookupIndex
 from ml import ml_router
 import os
 import sys
@@ -131,35 +135,51 @@ def _sample_lookups():
 
 
 def test_lookup_count_missing_table_returns_zero():
-    lookups = {}
-    value = _lookup_count(lookups, "missing_col", {"Instructor": "A"}, 10)
+    index = LookupIndex({})
+    value = _lookup_count(index, "missing_col", {"Instructor": "A"}, 10)
     assert value == 0.0
 
 
 def test_lookup_count_no_matching_rows_returns_zero():
-    lookups = _sample_lookups()
-    value = _lookup_count(lookups, "instr_prior_count", {"Instructor": "Z"}, 10)
+    index = LookupIndex(_sample_lookups())
+    value = _lookup_count(index, "instr_prior_count", {"Instructor": "Z"}, 10)
     assert value == 0.0
 
 
 def test_lookup_count_uses_latest_row_before_target_term():
-    lookups = _sample_lookups()
-    value = _lookup_count(lookups, "instr_prior_count", {"Instructor": "A"}, 10)
+    index = LookupIndex(_sample_lookups())
+    value = _lookup_count(index, "instr_prior_count", {"Instructor": "A"}, 10)
     assert value == 4.0
 
 
 def test_lookup_last_term_missing_table_returns_negative_one():
-    lookups = {}
-    value = _lookup_last_term(lookups, "missing_col", {"Instructor": "A"}, 10)
+    index = LookupIndex({})
+    value = _lookup_last_term(index, "missing_col", {"Instructor": "A"}, 10)
     assert value == -1
 
 
 def test_lookup_last_term_returns_latest_term():
-    lookups = _sample_lookups()
-    value = _lookup_last_term(lookups, "instr_last_term", {"Instructor": "A"}, 10)
+    index = LookupIndex(_sample_lookups())
+    value = _lookup_last_term(index, "instr_last_term", {"Instructor": "A"}, 10)
     assert value == 3
 
 
+def test_lookup_count_is_strictly_before_target_term():
+    index = LookupIndex(_sample_lookups())
+    assert _lookup_count(index, "instr_prior_count", {"Instructor": "A"}, 3) == 2.0
+    assert _lookup_count(index, "instr_prior_count", {"Instructor": "A"}, 1) == 0.0
+
+
+def test_lookup_last_term_nan_value_returns_negative_one():
+    lookups = {
+        "instr_last_term": pd.DataFrame(
+            [{"Instructor": "A", "SemesterIndex": 0, "instr_last_term": float("nan")}]
+        )
+    }
+    value = _lookup_last_term(LookupIndex(lookups), "instr_last_term", {"Instructor": "A"}, 5)
+    assert value == -1
+
+
 def test_build_features_ab_generates_expected_keys():
     payload = CourseContext(
         section="CS 146 (Section 01)",
@@ -183,6 +203,26 @@ def test_build_features_ab_generates_expected_keys():
     assert "SemesterIndex" in row
 
 
+def test_build_features_ab_batch_matches_scalar_builder():
+    contexts = [
+        CourseContext(section="CS 146 (Section 01)", mode="In Person", unit=3, type="LEC", times="09:00AM-10:15AM",
+                      satifies="GE: B2", location="ENG305", year=2026, semester="Fall"),
+        CourseContext(section="MATH 42", mode="Online", unit=4, type="SEM", times=None, satifies=None,
+                      location=None, year=2025, semester="Spring"),
+    ]
+    sem_cfg = SemesterIndexConfig(base=4000)
+    batch = build_features_AB_batch(contexts, sem_cfg)
+
+    assert batch.to_dict("records") == [build_features_AB(c, sem_cfg) for c in contexts]
+
+
+def test_build_features_c_batch_computes_semester_index():
+    contexts = [InstructorContext(instructor="A", mode="In Person", type="LEC", semester="Fall", building="ENG", year=2024)]
+    batch = build_features_C_batch(contexts, SemesterIndexConfig(base=4040))
+    assert batch.loc[0, "SemesterIndex"] == 2024 * 2 + 1 - 4040
+    assert batch.loc[0, "Instructor"] == "A"
+
+
 @patch("ml.ml_router._get_svm")
 def test_build_features_svm_happy_path(mock_get_svm):
     cat_cols = ["CourseCode", "Instructor", "Slot", "Type"]
@@ -263,13 +303,10 @@ def test_build_features_svm_handles_missing_times(mock_get_svm):
     assert isinstance(df.iloc[0]["Slot"], str)
 
 
-@patch("ml.ml_router.load_artifact")
-def test_get_svm_caches_artifact(mock_load_artifact):
-    mock_load_artifact.return_value = {"model": object()}
-    ml_router._SVM = None
-
-    first = ml_router._get_svm()
-    second = ml_router._get_svm()
+@patch("ml.ml_router.load_svm_artifact")
+def test_get_svm_uses_shared_registry(mock_load_svm):
+    art = {"model": object()}
+    mock_load_svm.return_value = art
 
-    assert first == second
-    assert mock_load_artifact.call_count == 1
+    assert ml_router._get_svm() is art
+    assert mock_load_svm.call_count == 1
@@ -0,0 +1,307 @@
+from ml import registry
+from ml.artifact_v2 import write_svm_artifact_v2
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# Ensure backend directory is importable.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+@patch("ml.registry.score_candidates")
+def test_get_loads_once_warms_and_caches(mock_score):
+    opener = MagicMock(return_value={"model": "m"})
+    reg = registry.ModelRegistry(opener)
+
+    first = reg.get()
+    second = reg.get()
+
+    assert first is second
+    assert opener.call_count == 1
+    mock_score.assert_called_once_with(registry.WARMUP_CANDIDATES, first)
+    assert reg.status()["ready"] is True
+
+    reg.warmup()
+    assert mock_score.call_count == 1
+
+
+def test_load_stamps_checksum_version(tmp_path):
+    path = tmp_path / "svm.joblib"
+    path.write_bytes(b"artifact-bytes")
+    reg = registry.ModelRegistry(lambda: {"artifact_path": str(path), "format_version": 1})
+
+    art = reg.load()
+
+    assert art["artifact_version"] == registry.artifact_checksum(path)
+    assert reg.status()["artifact_version"] == art["artifact_version"]
+    assert reg.status()["format_version"] == 1
+    assert reg.status()["load_seconds"] >= 0
+
+
+def test_v2_checksum_is_written_once_and_read_from_the_manifest(tmp_path, make_svm_artifact):
+    art = make_svm_artifact()
+    path = write_svm_artifact_v2(art, tmp_path / "svm_v2")
+    before = registry.artifact_checksum(path)
+
+    # Opening never re-hashes the blobs...
+    with patch("ml.registry.files_checksum") as mock_hash:
+        assert registry.artifact_checksum(path) == before
+    mock_hash.assert_not_called()
+
+    # ...and a rewrite with different contents gets a new checksum.
+    art["max_train_term"] += 1
+    assert registry.artifact_checksum(write_svm_artifact_v2(art, path)) != before
+
+
+def test_v2_directory_without_checksum_is_rejected(tmp_path):
+    (tmp_path / "manifest.json").write_text('{"format_version": 2}')
+    with pytest.raises(ValueError, match="no checksum"):
+        registry.artifact_checksum(tmp_path)
+
+
+@patch("ml.registry.score_candidates")
+def test_warmup_scores_synthetic_candidates_and_marks_ready(mock_score):
+    art = {"model": "m"}
+    reg = registry.ModelRegistry(lambda: art)
+    reg.warmup()
+
+    mock_score.assert_called_once_with(registry.WARMUP_CANDIDATES, art)
+    status = reg.status()
+    assert status["ready"] is True
+    assert status["warm"] is True
+
+
+def test_load_failure_is_reported_in_status():
+    reg = registry.ModelRegistry(MagicMock(side_effect=FileNotFoundError("Missing model artifact")))
+    with pytest.raises(FileNotFoundError):
+        reg.get()
+    status = reg.status()
+    assert status["ready"] is False
+    assert "Missing model artifact" in status["error"]
+
+
+@patch.object(registry.SVM_REGISTRY, "get")
+def test_load_svm_artifact_delegates_to_shared_registry(mock_get):
+    mock_get.return_value = {"model": "m"}
+    assert registry.load_svm_artifact() == {"model": "m"}
+
+
+def _versioned_opener(path):
+    """Opener returning a fresh artifact dict pointing at `path` on each call."""
+    return MagicMock(side_effect=lambda: {"artifact_path": str(path)})
+
+
+@patch("ml.registry.score_candidates")
+def test_reload_swaps_warm_artifact_and_keeps_old_reference(mock_score, tmp_path):
+    path = tmp_path / "svm.joblib"
+    path.write_bytes(b"v1")
+    reg = registry.ModelRegistry(_versioned_opener(path), watch_paths=[path])
+    old = reg.get()
+
+    path.write_bytes(b"v2")
+    assert reg.reload() is True
+
+    new = reg.get()
+    assert new is not old
+    assert new["artifact_version"] == registry.artifact_checksum(path)
+    assert new["artifact_version"] != old["artifact_version"]
+    assert reg.status()["warm"] is True
+    assert reg.status()["reloads"] == 1
+    assert mock_score.call_args_list[-1].args == (registry.WARMUP_CANDIDATES, new)
+
+
+@patch("ml.registry.score_candidates")
+def test_reload_skips_unchanged_checksum_unless_forced(mock_score, tmp_path):
+    path = tmp_path / "svm.joblib"
+    path.write_bytes(b"v1")
+    reg = registry.ModelRegistry(_versioned_opener(path), watch_paths=[path])
+    old = reg.get()
+
+    assert reg.reload() is False
+    assert reg.get() is old
+    assert reg.reload(force=True) is True
+    assert reg.get() is not old
+
+
+@patch("ml.registry.score_candidates")
+def test_failed_reload_keeps_serving_previous_artifact(mock_score, tmp_path):
+    path = tmp_path / "svm.joblib"
+    path.write_bytes(b"v1")
+    opener = _versioned_opener(path)
+    reg = registry.ModelRegistry(opener, watch_paths=[path])
+    old = reg.get()
+
+    opener.side_effect = ValueError("corrupt artifact")
+    with pytest.raises(ValueError):
+        reg.reload(force=True)
+
+    assert reg.get() is old
+    assert "corrupt artifact" in reg.status()["error"]
+
+
+@patch("ml.registry.score_candidates")
+def test_check_for_update_reloads_only_when_files_change(mock_score, tmp_path):
+    path = tmp_path / "svm.joblib"
+    path.write_bytes(b"v1")
+    reg = registry.ModelRegistry(_versioned_opener(path), watch_paths=[path])
+    old = reg.get()
+
+    assert reg.check_for_update() is False
+
+    path.write_bytes(b"v2-longer")
+    assert reg.check_for_update() is False   # first sighting: wait for it to settle
+    assert reg.check_for_update() is True
+    assert reg.get() is not old
+    assert reg.check_for_update() is False
+
+
+@patch("ml.registry.score_candidates")
+def test_check_for_update_ignores_change_that_does_not_settle(mock_score, tmp_path):
+    path = tmp_path / "svm.joblib"
+    path.write_bytes(b"v1")
+    reg = registry.ModelRegistry(_versioned_opener(path), watch_paths=[path])
+    reg.get()
+
+    path.write_bytes(b"partial")
+    assert reg.check_for_update() is False
+    path.write_bytes(b"v2-complete")
+    assert reg.check_for_update() is False
+    assert reg.check_for_update() is True
+    assert reg.status()["reloads"] == 1
+
+
+def test_default_watch_paths_follow_the_artifact_that_would_be_opened(tmp_path):
+    with patch.object(registry, "ART_DIR", tmp_path):
+        assert registry.default_watch_paths() == [tmp_path / registry.SVM_ARTIFACT_V1]
+        (tmp_path / registry.SVM_ARTIFACT_V2).mkdir()
+        (tmp_path / registry.SVM_ARTIFACT_V2 / registry.MANIFEST).write_text("{}")
+        assert registry.default_watch_paths() == [tmp_path / registry.SVM_ARTIFACT_V2 / registry.MANIFEST]
+
+
+@patch("ml.registry.score_candidates")
+def test_check_for_update_retries_after_failed_reload(mock_score, tmp_path):
+    path = tmp_path / "svm.joblib"
+    path.write_bytes(b"v1")
+    opener = _versioned_opener(path)
+    reg = registry.ModelRegistry(opener, watch_paths=[path])
+    reg.get()
+
+    path.write_bytes(b"v2-longer")
+    opener.side_effect = ValueError("half written")
+    assert reg.check_for_update() is False
+    assert reg.check_for_update() is False
+
+    opener.side_effect = lambda: {"artifact_path": str(path)}
+    assert reg.check_for_update() is True
+
+
+def test_watcher_starts_and_stops(tmp_path):
+    reg = registry.ModelRegistry(MagicMock(), watch_paths=[tmp_path / "svm.joblib"])
+    reg.start_watcher(60)
+    assert reg.status()["watching"] is True
+    reg.stop_watcher()
+    assert reg.status()["watching"] is False
+
+
+# ---- tenants ----
+
+def _tenant_registry(tmp_path, budget_bytes, names=("east", "west", "north")):
+    for name in names:
+        (tmp_path / name).mkdir()
+    opened = []
+
+    def opener(path):
+        opened.append(path.name)
+        return {"tenant": path.name, "payload": bytearray(1000)}
+
+    return registry.TenantRegistry(tmp_path, budget_bytes=budget_bytes, opener=opener), opened
+
+
+@patch("ml.registry.score_candidates")
+def test_tenants_load_on_demand_and_count_hits(_mock_score, tmp_path):
+    tenants, opened = _tenant_registry(tmp_path, budget_bytes=1 << 20)
+
+    assert tenants.get("east")["tenant"] == "east"
+    assert tenants.get("east") is tenants.get("east")
+    assert opened == ["east"]
+
+    stats = tenants.stats()
+    assert stats["tenants"]["east"]["hits"] == 2
+    assert stats["tenants"]["east"]["misses"] == 1
+    assert stats["tenants"]["east"]["memory_bytes"] >= 1000
+    assert stats["resident_bytes"] == stats["tenants"]["east"]["memory_bytes"]
+
+
+@patch("ml.registry.score_candidates")
+def test_least_recently_used_tenant_is_evicted_over_budget(_mock_score, tmp_path):
+    tenants, opened = _tenant_registry(tmp_path, budget_bytes=1 << 20)
+    one = tenants.get("east")
+    tenants._budget_bytes = int(registry.artifact_memory_bytes(one) * 2.5)
+
+    tenants.get("west")
+    tenants.get("east")          # west is now least recently used
+    tenants.get("north")
+
+    stats = tenants.stats()
+    assert [t for t, s in stats["tenants"].items() if s["resident"]] == ["east", "north"]
+    assert stats["evictions"] == 1
+    assert stats["resident_bytes"] <= tenants.budget_bytes
+
+    tenants.get("west")
+    assert opened == ["east", "west", "north", "west"]
+    assert tenants.stats()["tenants"]["west"]["misses"] == 2
+
+
+@patch("ml.registry.score_candidates")
+def test_tenant_over_budget_on_its_own_is_still_served(_mock_score, tmp_path):
+    tenants, _ = _tenant_registry(tmp_path, budget_bytes=10)
+    tenants.get("east")
+    assert tenants.get("west")["tenant"] == "west"
+    assert [t for t, s in tenants.stats()["tenants"].items() if s["resident"]] == ["west"]
+
+
+def test_unknown_and_invalid_tenants_are_rejected(tmp_path):
+    tenants, opened = _tenant_registry(tmp_path, budget_bytes=1 << 20)
+    for tenant in ("south", "../east", "", ".hidden"):
+        with pytest.raises(registry.UnknownTenantError):
+            tenants.get(tenant)
+    assert opened == []
+    assert tenants.stats()["tenants"] == {}
+
+
+@patch("ml.registry.score_candidates")
+def test_failed_tenant_load_is_not_kept(_mock_score, tmp_path):
+    (tmp_path / "east").mkdir()
+    opener = MagicMock(side_effect=[FileNotFoundError("Missing model artifact"), {"tenant": "east"}])
+    tenants = registry.TenantRegistry(tmp_path, budget_bytes=1 << 20, opener=opener)
+
+    with pytest.raises(FileNotFoundError):
+        tenants.get("east")
+    assert tenants.stats()["tenants"]["east"]["resident"] is False
+    assert tenants.get("east")["tenant"] == "east"
+
+
+@patch.object(registry.SVM_REGISTRY, "get")
+@patch.object(registry.TENANT_REGISTRY, "get")
+def test_load_svm_artifact_routes_tenants(mock_tenant_get, mock_default_get):
+    mock_tenant_get.return_value = {"tenant": "east"}
+    mock_default_get.return_value = {"tenant": None}
+
+    assert registry.load_svm_artifact("east") == {"tenant": "east"}
+    assert registry.load_svm_artifact(registry.DEFAULT_TENANT) == {"tenant": None}
+    assert registry.load_svm_artifact() == {"tenant": None}
+    mock_tenant_get.assert_called_once_with("east")
+
+
+def test_artifact_memory_bytes_counts_arrays_and_frames():
+    import numpy as np
+    import pandas as pd
+
+    arrays = registry.artifact_memory_bytes({"a": np.zeros(1000)})
+    assert arrays >= 8000
+    frame = registry.artifact_memory_bytes({"t": pd.DataFrame({"x": np.zeros(1000)})})
+    assert frame >= 8000
+    shared = np.zeros(1000)
+    assert registry.artifact_memory_bytes({"a": shared, "b": shared}) < 2 * arrays
@@ -0,0 +1,199 @@
+from schedule_search import (
+    FREE, CompatibilityGraph, Partial, clique_schedules, compile_slot_masks, enumerate_schedules, schedule_score, slot_section, split_slot_prediction,
+    top_schedules, top_slot_schedules,
+)
+from schedules import is_time_conflict
+import os
+import random
+import sys
+
+import pytest
+
+# Ensure backend directory is importable.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+LABELS = [
+    "MW 09:00AM-10:15AM", "W 09:30AM-10:45AM", "TR 09:30AM-10:45AM", "MW 10:15AM-11:30AM",
+    "MWF 08:00AM-08:50AM", "F 08:30AM-09:45AM", "mw 10:00AM-10:20AM", "TR 01:30PM-02:45PM",
+    "R 02:45PM-04:00PM", "M 11:00PM-01:00AM",   # ends before it starts
+    "T 12:00AM-01:00AM",                        # 12:00AM start reads as a parse failure
+    "TBA TBA", "TBD TBD", "MW TBA", "SA 09:00 AM-10:00 AM", "MW 9:00xx-10:00AM", "bogus",
+]
+
+
+def _reference(per_course):
+    """The product loop generate_v2 used before schedule_search."""
+    partials = [[]]
+    for course_candidates in per_course:
+        if not course_candidates:
+            continue
+        next_partials = []
+        for partial in partials:
+            for cand in course_candidates:
+                c_days, c_times = split_slot_prediction(cand.get("slot_label", "TBD TBD"))
+                conflict = any(
+                    is_time_conflict(c_days, c_times, *split_slot_prediction(a.get("slot_label", "TBD TBD")))
+                    for a in partial
+                )
+                if not conflict:
+                    next_partials.append(partial + [cand])
+        partials = next_partials if next_partials else partials
+    return partials
+
+
+def test_masks_agree_with_is_time_conflict_for_every_pair():
+    masks = compile_slot_masks(LABELS)
+    for a in LABELS:
+        for b in LABELS:
+            expected = is_time_conflict(*split_slot_prediction(a), *split_slot_prediction(b))
+            assert (not Partial().extend({}, masks[a]).fits(masks[b])) == expected, (a, b)
+
+
+def test_unschedulable_labels_compile_to_free():
+    masks = compile_slot_masks(["TBA TBA", "bogus", "T 12:00AM-01:00AM"])
+    assert set(masks.values()) == {FREE}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_enumerate_schedules_matches_reference_loop(seed):
+    rng = random.Random(seed)
+    per_course = []
+    for course in range(rng.randint(2, 5)):
+        n = rng.choice([0, 2, 4, 6])
+        per_course.append([{"course_number": f"C{course}", "n": i, "slot_label": rng.choice(LABELS)} for i in range(n)])
+    per_course[0].append({"course_number": "C0", "n": 99})     # no slot_label at all
+
+    assert enumerate_schedules(per_course) == _reference(per_course)
+
+
+def test_enumerate_schedules_keeps_partials_when_a_course_always_conflicts():
+    per_course = [
+        [{"id": "a", "slot_label": "MW 09:00AM-10:15AM"}],
+        [{"id": "b", "slot_label": "M 09:30AM-10:00AM"}],
+        [{"id": "c", "slot_label": "TR 09:00AM-10:15AM"}],
+    ]
+    assert [[s["id"] for s in p] for p in enumerate_schedules(per_course)] == [["a", "c"]]
+
+
+def _random_bundle(seed, courses=(2, 5), probs=(0.7, 0.8, 0.9, 0.95)):
+    rng = random.Random(seed)
+    per_course = []
+    for course in range(rng.randint(*courses)):
+        n = rng.choice([0, 2, 4, 6])
+        per_course.append([
+            {"course_number": f"C{course}", "n": i, "slot_label": rng.choice(LABELS), "prob_scheduled": rng.choice(probs)}
+            for i in range(n)
+        ])
+    return per_course
+
+
+def _ranked(per_course):
+    """enumerate + stable sort on the rounded score, as generate_v2 does without top_k."""
+    ranked = [(sections, round(schedule_score(sections), 4)) for sections in enumerate_schedules(per_course)]
+    ranked.sort(key=lambda item: item[1], reverse=True)
+    return ranked
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_top_schedules_returns_the_ranked_prefix(seed):
+    # Few distinct probabilities, so rounded-score ties are common.
+    per_course = _random_bundle(seed)
+    expected = _ranked(per_course)
+    for k in (1, 3, len(expected), None):
+        got = [(sections, round(score, 4)) for sections, score in top_schedules(per_course, k)]
+        assert got == expected[:k]
+
+
+def test_top_schedules_skips_courses_that_conflict_with_everything():
+    per_course = [
+        [{"id": "a", "slot_label": "MW 09:00AM-10:15AM", "prob_scheduled": 0.9}],
+        [{"id": "b", "slot_label": "M 09:30AM-10:00AM", "prob_scheduled": 0.9}],
+        [],
+        [{"id": "c", "slot_label": "TR 09:00AM-10:15AM", "prob_scheduled": 0.5},
+         {"id": "d", "slot_label": "F 09:00AM-10:15AM", "prob_scheduled": 0.8}],
+    ]
+    assert [[s["id"] for s in sections] for sections, _ in top_schedules(per_course, 5)] == [["a", "d"], ["a", "c"]]
+
+
+def test_top_schedules_with_no_courses_yields_one_empty_schedule():
+    assert list(top_schedules([[], []], 3)) == [([], 0)]
+
+
+def _instructor_bundle(seed):
+    """Every slot offered by up to three instructors, in shuffled candidate order."""
+    rng = random.Random(seed)
+    per_course = []
+    for course in range(rng.randint(2, 5)):
+        cands = [
+            {"course_number": f"C{course}", "instructor_name": f"P{course}{slot}{i}", "slot_label": label,
+             "prob_scheduled": rng.choice((0.5, 0.75, 0.9, 0.9))}
+            for slot, label in enumerate(rng.sample(LABELS, rng.randint(1, 4)))
+            for i in range(rng.randint(1, 3))
+        ]
+        rng.shuffle(cands)
+        per_course.append(cands)
+    return per_course
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_top_schedules_expands_instructor_variants_in_rank_order(seed):
+    per_course = _instructor_bundle(seed)
+    expected = _ranked(per_course)
+    for k in (1, 5, len(expected) + 1):
+        got = [(sections, round(score, 4)) for sections, score in top_schedules(per_course, k)]
+        assert got == expected[:k]
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_top_slot_schedules_cover_every_schedule_once(seed):
+    per_course = _instructor_bundle(seed)
+    full = enumerate_schedules(per_course)
+    slot_level = list(top_slot_schedules(per_course))
+
+    # One entry per distinct slot combination, scored by its best instructors.
+    combos = {tuple(s["slot_label"] for s in sections) for sections in full}
+    assert len(slot_level) == len(combos)
+    for groups, score in slot_level:
+        assert score == pytest.approx(max(schedule_score(sections) for sections in full
+                                          if tuple(s["slot_label"] for s in sections) == tuple(g.label for g in groups)))
+    scores = [score for _, score in slot_level]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_slot_section_lists_the_other_instructors_best_first():
+    per_course = [[
+        {"instructor_name": "A", "slot_label": "MW 09:00AM-10:15AM", "prob_scheduled": 0.6},
+        {"instructor_name": "B", "slot_label": "MW 09:00AM-10:15AM", "prob_scheduled": 0.9},
+        {"instructor_name": "C", "slot_label": "MW 09:00AM-10:15AM", "prob_scheduled": 0.7},
+    ]]
+    [(groups, _)] = list(top_slot_schedules(per_course))
+    section = slot_section(groups[0])
+    assert section["instructor_name"] == "B"
+    assert [a["instructor_name"] for a in section["instructor_alternatives"]] == ["C", "A"]
+
+
+def test_compatibility_graph_agrees_with_is_time_conflict_for_every_pair():
+    per_course = [[{"slot_label": label}] for label in LABELS]
+    graph = CompatibilityGraph(per_course)
+    for i, a in enumerate(LABELS):
+        for j, b in enumerate(LABELS):
+            if i != j:
+                expected = is_time_conflict(*split_slot_prediction(a), *split_slot_prediction(b))
+                assert (not graph.compatible[i] >> j & 1) == expected, (a, b)
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_clique_schedules_match_the_reference_loop(seed):
+    for per_course in (_random_bundle(seed), _random_bundle(seed, courses=(5, 7)), _instructor_bundle(seed)):
+        assert clique_schedules(per_course) == _reference(per_course)
+
+
+def test_clique_schedules_keep_partials_when_a_course_always_conflicts():
+    per_course = [
+        [{"id": "a", "slot_label": "MW 09:00AM-10:15AM"}],
+        [{"id": "b", "slot_label": "M 09:30AM-10:00AM"}],
+        [],
+        [{"id": "c", "slot_label": "TR 09:00AM-10:15AM"}],
+    ]
+    assert [[s["id"] for s in p] for p in clique_schedules(per_course)] == [["a", "c"]]
+    assert clique_schedules([[], []]) == [[]]
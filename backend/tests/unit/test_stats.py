@@ -2,6 +2,7 @@ from stats import (
     top_instructors_last4_semesters,
     unique_time_slots_last4_semesters,
     generate_professor_slot_candidates,
+    schedule_flat_data_version,
 )
 import os
 import sys
@@ -157,3 +158,30 @@ def test_generate_professor_slot_candidates_probability_cast_to_float(
     assert len(result) == 1
     assert isinstance(result[0]["instructor_probability"], float)
     assert result[0]["instructor_probability"] == 0.75
+
+
+@patch("stats.get_db_connection")
+def test_schedule_flat_data_version_is_max_id(mock_get_db):
+    conn, cur = _mock_conn_with_rows([])
+    cur.fetchone.return_value = {"max_id": 1250}
+    mock_get_db.return_value = conn
+
+    assert schedule_flat_data_version() == "1250"
+    assert "COUNT" not in cur.execute.call_args.args[0]
+    conn.close.assert_called_once()
+
+
+@patch("stats.get_db_connection")
+def test_schedule_flat_data_version_is_reused_within_ttl(mock_get_db):
+    conn, cur = _mock_conn_with_rows([])
+    cur.fetchone.side_effect = [{"max_id": 1250}, {"max_id": 1300}]
+    mock_get_db.return_value = conn
+
+    with patch.dict(os.environ, {"DATA_VERSION_TTL_SECONDS": "60"}):
+        assert schedule_flat_data_version() == "1250"
+        assert schedule_flat_data_version() == "1250"
+    assert mock_get_db.call_count == 1
+
+    with patch.dict(os.environ, {"DATA_VERSION_TTL_SECONDS": "0"}):
+        assert schedule_flat_data_version() == "1300"
+    assert mock_get_db.call_count == 2
@@ -0,0 +1,81 @@
+from ml.inference import LookupIndex
+from ml.train_ant import _build_lookup_tables, build_score_universe, train_dept_models
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Ensure backend directory is importable.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+def _row(year, semester, instructor, days, slot, course="CS 146"):
+    return {"CourseCode": course, "Year": year, "Semester": semester, "Instructor": instructor,
+            "Days": days, "Slot": slot}
+
+
+def test_build_score_universe_matches_candidate_generation_rules():
+    df = pd.DataFrame([
+        # Oldest term falls outside the last 4 Spring/Fall terms.
+        _row(2020, "Spring", "Old Prof", "F", "F_600_700"),
+        _row(2021, "Spring", "Prof A", "MW", "MW_540_615"),
+        _row(2021, "Summer", "Summer Prof", "MW", "MW_800_900"),
+        _row(2021, "Fall", "Prof A", "TR", "TR_540_615"),
+        _row(2022, "Spring", "Prof B", "TR", "TR_540_615"),
+        _row(2022, "Fall", "Prof C", "MW", "MW_TBA"),
+        _row(2022, "Fall", "Prof D", "", "_TBA"),
+        _row(2022, "Fall", None, "MW", "MW_540_615"),
+    ])
+    universe = build_score_universe(df, n_instructors=2)
+
+    assert set(universe["Instructor"]) == {"Prof A", "Prof B"}
+    assert set(universe["Slot"]) == {"MW_540_615", "TR_540_615", "MW_TBA"}
+    assert len(universe) == 6
+    assert set(universe["Type"]) == {"LEC"}
+
+
+def test_lookup_tables_are_interned_without_changing_served_values():
+    hist = pd.DataFrame({
+        "SemesterIndex": [0, 0, 1, 2, 2],
+        "Instructor":    ["Prof A", "Prof B", "Prof A", "Prof A", "Prof B"],
+        "CourseCode":    ["CS 146", "CS 146", "CS 151", "CS 146", "CS 151"],
+        "Dept":          ["CS"] * 5,
+        "Slot":          ["TR_540_615", "MW_540_615", "TR_540_615", "TR_540_615", "MW_TBA"],
+        "Type":          ["LEC"] * 5,
+    })
+    lookups = _build_lookup_tables(hist)
+
+    dtypes = {str(tbl[c].dtype) for tbl in lookups.values() for c in ("Instructor", "CourseCode") if c in tbl}
+    assert dtypes == {"category"}
+    assert lookups["instr_prior_count"]["Instructor"].cat.categories is lookups["combo_prior_count"]["Slot"].cat.categories
+    assert lookups["instr_prior_count"]["SemesterIndex"].dtype == "int8"
+    assert lookups["instr_prior_count"]["instr_prior_count"].dtype == "int8"
+    assert lookups["instr_last_term"]["instr_last_term"].dtype == "float32"
+
+    index = LookupIndex(lookups)
+    assert index.get("instr_prior_count", {"Instructor": "Prof A"}, 3) == 3
+    assert index.get("instr_last_term", {"Instructor": "Prof A"}, 3) == 1.0
+    assert pd.isna(index.get("instr_last_term", {"Instructor": "Prof A"}, 1))    # first sighting
+    counts = index.get_many("course_prior_count", {"CourseCode": ["CS 151", "CS 999"]}, 3)
+    assert counts[0] == 2.0
+    assert pd.isna(counts[1])
+
+
+def test_train_dept_models_fits_departments_with_enough_rows():
+    rng = np.random.default_rng(0)
+    n = 120
+    X = pd.DataFrame({
+        "CourseCode": rng.choice(["CS 146", "CS 151", "MATH 42"], size=n),
+        "Instructor": rng.choice(["Prof A", "Prof B"], size=n),
+        "count": rng.poisson(2.0, size=n).astype(float),
+    })
+    y = pd.Series((X["count"] > 2).astype(int))
+    depts = X["CourseCode"].str.split().str[0]
+    depts[:5] = "ART"     # too few rows for a model of its own
+
+    models = train_dept_models(X, y, depts, ["CourseCode", "Instructor"], ["count"], workers=1, min_rows=20)
+
+    assert set(models) == {"CS", "MATH"}
+    assert models["MATH"].categories[0].tolist() == ["MATH 42"]
+    assert models["CS"].predict_proba(X[depts == "CS"]).shape == ((depts == "CS").sum(), 2)